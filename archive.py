@@ -0,0 +1,184 @@
+"""
+Archival of old Feeding and AnimalCare records for the Zoo Management System.
+
+Rows older than a cutoff date are moved in small chunks from the main
+database to a cold archive database attached as schema "archive". Every
+chunk is its own short transaction, so writers are never blocked for long,
+and the freed pages are returned to the file system with incremental vacuum.
+
+Moving a row does not change the data, only where it is stored: the change
+log records archived rows with the "A" operation instead of "D", and the
+latest dates in AnimalStatus are kept even when the newest row of an animal
+is archived.
+"""
+import os
+import time
+
+import crud
+from create_database_if_not_exist import attach_archive
+
+
+# Archived tables as (table, primary key, day-number column, copied columns)
+ARCHIVED_TABLES = (
+    ("Feeding", "feedingID", "feeding_day",
+     "feedingID, animalID, foodTypeID, staffID, feeding_date, quantity, notes"),
+    ("AnimalCare", "careID", "care_day",
+     "careID, animalID, staffID, care_date, care_type, notes"),
+)
+
+
+def default_archive_path(db_name):
+    """
+    Get the archive file used for a database when none is configured.
+
+    Args:
+        db_name (str): Name of the main database file
+
+    Returns:
+        str: Archive file name, e.g. "zoo_archive.db" for "zoo.db"
+    """
+    root, ext = os.path.splitext(db_name)
+    return f"{root}_archive{ext or '.db'}"
+
+
+def archive_records(cutoff, database=None, archive_path=None, chunk_size=500, pause=0.0, vacuum_step=256):
+    """
+    Move Feeding and AnimalCare rows dated before a cutoff to the archive database.
+
+    Args:
+        cutoff (str): Rows dated strictly before this day (YYYY-MM-DD) are archived
+        database (crud.ZooDatabase, optional): Database to archive, defaults to the default database
+        archive_path (str, optional): Archive file, defaults to the database's archive_path
+            or default_archive_path()
+        chunk_size (int): Number of rows moved per transaction
+        pause (float): Seconds to sleep between chunks so other writers can run
+        vacuum_step (int): Number of pages released per incremental vacuum step
+
+    Returns:
+        dict: Number of archived rows per table and "pages_reclaimed"
+    """
+    database = database or crud.get_database()
+    archive_path = archive_path or database.archive_path or default_archive_path(database.path)
+
+    conn = database.acquire()
+    attached = False
+    try:
+        attached = attach_archive(conn, archive_path)
+        result = {}
+        for table, key, day_column, columns in ARCHIVED_TABLES:
+            result[table] = 0
+            while True:
+                ids = [row[0] for row in conn.execute(
+                    f"SELECT {key} FROM main.{table} WHERE {day_column} < ? ORDER BY {key} LIMIT ?",
+                    (crud.day_number(cutoff), chunk_size)
+                )]
+                if not ids:
+                    break
+                placeholders = ", ".join("?" for _ in ids)
+                # Copy and delete commit together, so a chunk is never lost or duplicated.
+                # IDs are never reused (AUTOINCREMENT), so a collision is an error, never an update.
+                conn.execute("BEGIN IMMEDIATE")
+                last_seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+                status = conn.execute(
+                    f"""SELECT last_feeding_date, last_care_date, last_care_type, animalID FROM AnimalStatus
+                        WHERE animalID IN (SELECT animalID FROM main.{table} WHERE {key} IN ({placeholders}))""",
+                    ids
+                ).fetchall()
+                conn.execute(
+                    f"""INSERT INTO archive.{table} ({columns})
+                        SELECT {columns} FROM main.{table} WHERE {key} IN ({placeholders})""",
+                    ids
+                )
+                conn.execute(f"DELETE FROM main.{table} WHERE {key} IN ({placeholders})", ids)
+                # The delete triggers only see the main database
+                conn.execute(
+                    "UPDATE ChangeLog SET operation = 'A' WHERE seq > ? AND table_name = ? AND operation = 'D'",
+                    (last_seq, table)
+                )
+                conn.executemany(
+                    """UPDATE AnimalStatus SET last_feeding_date = ?, last_care_date = ?, last_care_type = ?
+                       WHERE animalID = ?""",
+                    status
+                )
+                conn.commit()
+                result[table] += len(ids)
+                if pause:
+                    time.sleep(pause)
+
+        result["pages_reclaimed"] = reclaim_space(conn, vacuum_step, pause)
+        database.invalidate(*(table for table, _, _, _ in ARCHIVED_TABLES))
+        return result
+    finally:
+        # A failed chunk must not go back to the pool with its transaction or the archive
+        if conn.in_transaction:
+            conn.rollback()
+        if attached:
+            conn.execute("DETACH DATABASE archive")
+        database.release(conn)
+
+
+def reclaim_space(conn, step=256, pause=0.0):
+    """
+    Return free pages of the main database to the file system a few at a time.
+
+    Does nothing unless the database uses auto_vacuum = INCREMENTAL (the
+    default for databases created by initialize_database; older files can
+    be converted once with enable_incremental_vacuum()).
+
+    Args:
+        conn (sqlite3.Connection): Connection with no open transaction
+        step (int): Number of pages released per step
+        pause (float): Seconds to sleep between steps
+
+    Returns:
+        int: Number of pages released
+    """
+    if conn.execute("PRAGMA main.auto_vacuum").fetchone()[0] != 2:
+        return 0
+    reclaimed = 0
+    while True:
+        free_pages = conn.execute("PRAGMA main.freelist_count").fetchone()[0]
+        if free_pages == 0:
+            return reclaimed
+        # Each step is a short write transaction of its own
+        conn.execute(f"PRAGMA main.incremental_vacuum({min(step, free_pages)})").fetchall()
+        reclaimed += free_pages - conn.execute("PRAGMA main.freelist_count").fetchone()[0]
+        if pause:
+            time.sleep(pause)
+
+
+def enable_incremental_vacuum(database=None):
+    """
+    Switch an existing database to auto_vacuum = INCREMENTAL.
+
+    This rewrites the whole file with VACUUM and holds the write lock while
+    doing so; run it once during a maintenance window.
+
+    Args:
+        database (crud.ZooDatabase, optional): Database to convert, defaults to the default database
+
+    Returns:
+        bool: True if the database was converted, False if it already used incremental vacuum
+    """
+    database = database or crud.get_database()
+    conn = database.connect()
+    try:
+        if conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2:
+            return False
+        conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+        conn.execute("VACUUM")
+        return True
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Archive old feeding and care records")
+    parser.add_argument("cutoff", help="Archive rows dated before this day (YYYY-MM-DD)")
+    parser.add_argument("--archive", help="Archive database file")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--pause", type=float, default=0.0)
+    args = parser.parse_args()
+    print(archive_records(args.cutoff, archive_path=args.archive, chunk_size=args.chunk_size, pause=args.pause))
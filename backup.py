@@ -0,0 +1,201 @@
+"""
+Online backups of the zoo database using the SQLite backup API.
+
+The copy is made a few pages at a time. The source is only locked while a
+step runs, and the backup sleeps between steps, so writers keep working
+during a backup. Every copy is verified with PRAGMA integrity_check before
+it replaces the destination file.
+"""
+import datetime
+import glob
+import os
+import re
+import sqlite3
+import threading
+import time
+
+import crud
+
+
+def backup_database(destination, database=None, pages=256, pause=0.01, progress=None, verify=True):
+    """
+    Copy a live database to a file.
+
+    Args:
+        destination (str): Backup file to create or replace
+        database (crud.ZooDatabase, optional): Database to copy, defaults to the default database
+        pages (int): Number of pages copied per step
+        pause (float): Seconds to sleep between steps
+        progress (callable, optional): Called after each step with a dict
+            {"copied_pages", "total_pages", "seconds"}
+        verify (bool): Run PRAGMA integrity_check on the copy
+
+    Returns:
+        dict: Report with "destination", "pages", "bytes", "seconds",
+              "pages_per_second", "bytes_per_second" and "integrity"
+    """
+    database = database or crud.get_database()
+    partial = destination + ".partial"
+    if os.path.exists(partial):
+        os.remove(partial)
+
+    start = time.perf_counter()
+
+    def on_step(status, remaining, total):
+        if progress is not None:
+            progress({
+                "copied_pages": total - remaining,
+                "total_pages": total,
+                "seconds": time.perf_counter() - start,
+            })
+        # Sleeping here leaves the source unlocked between steps
+        if remaining and pause:
+            time.sleep(pause)
+
+    source = database.connect()
+    target = sqlite3.connect(partial)
+    try:
+        source.backup(target, pages=pages, progress=on_step)
+        seconds = time.perf_counter() - start
+        page_count = target.execute("PRAGMA page_count").fetchone()[0]
+        page_size = target.execute("PRAGMA page_size").fetchone()[0]
+        integrity = target.execute("PRAGMA integrity_check").fetchone()[0] if verify else None
+    finally:
+        target.close()
+        source.close()
+
+    if verify and integrity != "ok":
+        os.remove(partial)
+        raise sqlite3.DatabaseError(f"Backup failed integrity check: {integrity}")
+    os.replace(partial, destination)
+
+    return {
+        "destination": destination,
+        "pages": page_count,
+        "bytes": page_count * page_size,
+        "seconds": seconds,
+        "pages_per_second": page_count / seconds if seconds else None,
+        "bytes_per_second": page_count * page_size / seconds if seconds else None,
+        "integrity": integrity,
+    }
+
+
+class BackupScheduler:
+    """
+    Background thread taking a backup at a fixed interval.
+
+    A failed backup is kept in last_error and reported through the on_error
+    hook of the database; the next one is still attempted on schedule.
+    """
+
+    def __init__(self, pattern, interval, database=None, keep=7, **backup_options):
+        """
+        Configure scheduled backups.
+
+        Args:
+            pattern (str): strftime pattern of the backup files, e.g. "backups/zoo-%Y%m%d-%H%M%S.db"
+            interval (float): Seconds between two backups
+            database (crud.ZooDatabase, optional): Database to copy, defaults to the default database
+            keep (int): Number of most recent backup files to keep
+            **backup_options: Options passed to backup_database()
+        """
+        self.pattern = pattern
+        self.interval = interval
+        self.database = database
+        self.keep = keep
+        self.backup_options = backup_options
+        self.last_report = None
+        self.last_error = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Start taking backups in a daemon thread; the first one is taken immediately.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="zoo-backup", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """
+        Stop the scheduler, waiting for a running backup to finish.
+
+        Args:
+            timeout (float, optional): Maximum number of seconds to wait
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def run_once(self):
+        """
+        Take one backup now and remove the oldest files beyond keep.
+
+        Returns:
+            dict: Report returned by backup_database()
+        """
+        destination = datetime.datetime.now().strftime(self.pattern)
+        directory = os.path.dirname(destination)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        report = backup_database(destination, self.database, **self.backup_options)
+        self.last_report = report
+        self._prune()
+        return report
+
+    def backups(self):
+        """
+        List the backup files of this scheduler, oldest first.
+
+        Only files whose whole name parses back through the pattern count,
+        so unrelated files next to the backups are never listed.
+
+        Returns:
+            list: Paths of the backup files
+        """
+        # Every strftime code becomes a wildcard and the literal text is escaped
+        parts = re.split(r"(%.)", self.pattern)
+        wildcard = "".join("%" if part == "%%" else "*" if part.startswith("%") and len(part) == 2
+                           else glob.escape(part) for part in parts)
+        backups = []
+        for path in glob.glob(wildcard):
+            try:
+                backups.append((datetime.datetime.strptime(path, self.pattern), path))
+            except ValueError:
+                continue
+        return [path for _, path in sorted(backups)]
+
+    def _prune(self):
+        backups = self.backups()
+        for path in backups[:max(len(backups) - self.keep, 0)]:
+            os.remove(path)
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.run_once()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = e
+                (self.database or crud.get_database()).on_error(e)
+            self._stop.wait(self.interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Back up the zoo database while it is in use")
+    parser.add_argument("destination", help="Backup file to create")
+    parser.add_argument("--pages", type=int, default=256, help="Pages copied per step")
+    parser.add_argument("--pause", type=float, default=0.01, help="Seconds to sleep between steps")
+    args = parser.parse_args()
+
+    def show(step):
+        print(f"\r{step['copied_pages']}/{step['total_pages']} pages", end="", flush=True)
+
+    report = backup_database(args.destination, pages=args.pages, pause=args.pause, progress=show)
+    print(f"\nCopied {report['bytes']} bytes in {report['seconds']:.2f}s "
+          f"({report['bytes_per_second'] / 1e6:.1f} MB/s), integrity: {report['integrity']}")
@@ -0,0 +1,180 @@
+"""
+Benchmark of read throughput under different storage settings.
+
+A sample database is generated for every page size, then Feeding.read_all
+and Animals.read point reads are timed for each combination of page size,
+mmap_size and cache_size. Run it on a copy of the production row counts to
+pick the settings of a deployment:
+
+    python bench.py --animals 20000 --feedings 1000000
+"""
+import os
+import random
+import time
+
+import crud
+from create_database_if_not_exist import initialize_database
+
+
+# Settings compared by default
+PAGE_SIZES = (4096, 16384)
+MMAP_SIZES = (0, 1 << 30)
+CACHE_SIZES = (-2000, -65536)
+
+
+def create_sample_database(db_name, animals=2000, feedings=100000, page_size=4096, seed=0):
+    """
+    Create a database filled with generated animals and feedings.
+
+    Args:
+        db_name (str): Database file to create (replaced if it exists)
+        animals (int): Number of animals
+        feedings (int): Number of feedings
+        page_size (int): Page size of the new database
+        seed (int): Random seed
+
+    Returns:
+        str: Name of the created database
+    """
+    initialize_database(db_name, force_new=True, page_size=page_size)
+    rng = random.Random(seed)
+    database = crud.ZooDatabase(db_name)
+    conn = database.connect()
+    try:
+        conn.executemany(
+            "INSERT INTO Species (name, habitat, diet) VALUES (?, ?, ?)",
+            [(f"Species {i}", "Savanna", "Herbivore") for i in range(50)]
+        )
+        conn.executemany(
+            "INSERT INTO FoodTypes (name, unit) VALUES (?, ?)",
+            [(f"Food {i}", "kg") for i in range(20)]
+        )
+        conn.execute("INSERT INTO Roles (title, department) VALUES ('Zookeeper', 'Animal Care')")
+        conn.executemany(
+            "INSERT INTO Staff (firstName, lastName, roleID, country, hire_date, salary) VALUES (?, ?, 1, ?, ?, ?)",
+            [(f"First {i}", f"Last {i}", "USA", "2020-01-01", 50000) for i in range(100)]
+        )
+        conn.executemany(
+            "INSERT INTO Animals (name, speciesID, gender, birthdate) VALUES (?, ?, ?, ?)",
+            [(f"Animal {i}", rng.randint(1, 50), rng.choice(("Male", "Female")), "2015-01-01")
+             for i in range(animals)]
+        )
+        conn.executemany(
+            """INSERT INTO Feeding (animalID, foodTypeID, staffID, feeding_date, quantity, notes)
+               VALUES (?, ?, ?, ?, ?, ?)""",
+            ((rng.randint(1, animals), rng.randint(1, 20), rng.randint(1, 100),
+              f"2024-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}", rng.uniform(0.5, 50), "Routine feeding")
+             for _ in range(feedings))
+        )
+        conn.commit()
+    finally:
+        conn.close()
+    return db_name
+
+
+def measure(database, animals, point_reads=20000, seed=0):
+    """
+    Time a full Feeding.read_all and a series of Animals.read point reads.
+
+    Args:
+        database (crud.ZooDatabase): Database to read
+        animals (int): Number of animals in the database
+        point_reads (int): Number of point reads
+        seed (int): Random seed for the point read IDs
+
+    Returns:
+        dict: "read_all_rows_per_second" and "point_reads_per_second"
+    """
+    # Warm the connection pool and the page cache like a running service would
+    database.Feeding.read_all()
+
+    start = time.perf_counter()
+    rows = len(database.Feeding.read_all())
+    read_all_seconds = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    ids = [rng.randint(1, animals) for _ in range(point_reads)]
+    start = time.perf_counter()
+    for animal_id in ids:
+        database.Animals.read(animal_id)
+    point_seconds = time.perf_counter() - start
+
+    return {
+        "read_all_rows_per_second": rows / read_all_seconds,
+        "point_reads_per_second": point_reads / point_seconds,
+    }
+
+
+def run_benchmark(animals=2000, feedings=100000, point_reads=20000, page_sizes=PAGE_SIZES,
+                  mmap_sizes=MMAP_SIZES, cache_sizes=CACHE_SIZES, directory="."):
+    """
+    Measure read throughput for every combination of settings.
+
+    Args:
+        animals (int): Number of generated animals
+        feedings (int): Number of generated feedings
+        point_reads (int): Number of point reads per measurement
+        page_sizes (tuple): Page sizes to compare
+        mmap_sizes (tuple): mmap_size values to compare (0 disables memory mapping)
+        cache_sizes (tuple): cache_size values to compare
+        directory (str): Directory for the generated databases
+
+    Returns:
+        list: One dict per combination with the settings and the measurements
+    """
+    results = []
+    for page_size in page_sizes:
+        db_name = os.path.join(directory, f"bench_{page_size}.db")
+        create_sample_database(db_name, animals, feedings, page_size)
+        try:
+            for mmap_size in mmap_sizes:
+                for cache_size in cache_sizes:
+                    database = crud.ZooDatabase(db_name, pragmas={"mmap_size": mmap_size, "cache_size": cache_size})
+                    try:
+                        result = {"page_size": page_size, "mmap_size": mmap_size, "cache_size": cache_size}
+                        result.update(measure(database, animals, point_reads))
+                        results.append(result)
+                    finally:
+                        database.close()
+        finally:
+            os.remove(db_name)
+    return results
+
+
+def print_results(results):
+    """
+    Print benchmark results as a table.
+
+    Args:
+        results (list): Results returned by run_benchmark()
+    """
+    print(f"{'page_size':>9} {'mmap_size':>12} {'cache_size':>10} {'read_all rows/s':>16} {'point reads/s':>14}")
+    for result in results:
+        print(f"{result['page_size']:>9} {result['mmap_size']:>12} {result['cache_size']:>10} "
+              f"{result['read_all_rows_per_second']:>16,.0f} {result['point_reads_per_second']:>14,.0f}")
+
+
+def main(argv=None):
+    """
+    Run the benchmark from the command line.
+
+    Args:
+        argv (list, optional): Command-line arguments, defaults to sys.argv
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare read throughput under different storage settings")
+    parser.add_argument("--animals", type=int, default=2000)
+    parser.add_argument("--feedings", type=int, default=100000)
+    parser.add_argument("--point-reads", type=int, default=20000)
+    parser.add_argument("--page-sizes", type=int, nargs="+", default=PAGE_SIZES)
+    parser.add_argument("--mmap-sizes", type=int, nargs="+", default=MMAP_SIZES)
+    parser.add_argument("--cache-sizes", type=int, nargs="+", default=CACHE_SIZES)
+    parser.add_argument("--directory", default=".", help="Directory for the generated databases")
+    args = parser.parse_args(argv)
+    print_results(run_benchmark(args.animals, args.feedings, args.point_reads, args.page_sizes,
+                                args.mmap_sizes, args.cache_sizes, args.directory))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+"""
+Command-line tool of the Zoo Management System.
+
+    python cli.py import animals.csv species.csv Feeding=feedings_2024.csv
+    python cli.py export --directory dump/ [tables...]
+    python cli.py report
+    python cli.py vacuum [--full]
+    python cli.py compress-notes [--threshold 64]
+    python cli.py bench --animals 20000 --feedings 1000000
+
+CSV files are streamed in batches, one worker process per table. Imports run
+in dependency order (lookup tables, then the tables referencing them, then
+Feeding and AnimalCare); the tables of one level are imported in parallel.
+Progress and rows per second are printed to stderr.
+
+For speed, import and export read and write the tables with plain SQL
+instead of the CRUD classes. Imported rows therefore keep the IDs and
+versions of the CSV file (version 1 when the column is missing) and are
+only checked by the schema's constraints; notes are compressed as
+configured by ZOO_NOTES_THRESHOLD and exported as text. The change log and
+AnimalStatus triggers still fire, but the caches of database handles in
+other running processes are not invalidated: restart them after an import.
+"""
+import argparse
+import concurrent.futures
+import csv
+import multiprocessing
+import os
+import queue
+import sys
+import time
+
+import compression
+import crud
+from create_database_if_not_exist import initialize_database
+
+
+# Tables in import order; tables of the same level only reference earlier levels
+TABLE_LEVELS = (
+    ("Species", "FoodTypes", "Roles"),
+    ("Animals", "FoodInventory", "Staff"),
+    ("Feeding", "AnimalCare"),
+)
+TABLES = tuple(table for level in TABLE_LEVELS for table in level)
+
+
+def table_name(name):
+    """
+    Resolve a table name written in any case, with or without "_" or "-".
+
+    Args:
+        name (str): Table name, e.g. "food_types" or "FoodTypes"
+
+    Returns:
+        str: Table name as in the schema
+
+    Raises:
+        ValueError: If no table has this name
+    """
+    wanted = name.replace("_", "").replace("-", "").lower()
+    for table in TABLES:
+        if table.lower() == wanted:
+            return table
+    raise ValueError(f"Unknown table: {name}")
+
+
+def table_columns(conn, table):
+    """
+    Get the stored (non-generated) columns of a table.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+        table (str): Table name
+
+    Returns:
+        list: Column names in table order
+    """
+    return [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+
+
+def import_table(db_name, table, path, batch_size=5000, progress=None):
+    """
+    Insert the rows of a CSV file into a table, one transaction per batch.
+
+    The header row names the columns; columns unknown to the table are
+    ignored, empty values are stored as NULL and blank lines are skipped.
+
+    Args:
+        db_name (str): Database file
+        table (str): Table name
+        path (str): CSV file to read
+        batch_size (int): Rows inserted per transaction
+        progress (queue, optional): Receives (table, rows done) after every batch
+
+    Returns:
+        tuple: (table, rows, seconds)
+
+    Raises:
+        ValueError: If a line has fewer fields than the header; the batches before it stay imported
+    """
+    start = time.perf_counter()
+    database = crud.ZooDatabase(db_name)
+    conn = database.connect()
+    rows = 0
+    try:
+        with open(path, newline="", encoding="utf-8") as file:
+            reader = csv.reader(file)
+            header = next(reader, [])
+            known = set(table_columns(conn, table))
+            positions = [i for i, column in enumerate(header) if column in known]
+            if not positions:
+                raise ValueError(f"{path}: no column of {table} in the header")
+            query = (f"INSERT INTO {table} ({', '.join(header[i] for i in positions)}) "
+                     f"VALUES ({', '.join('?' for _ in positions)})")
+            # A notes column the table does not have is not imported
+            selected = [header[i] for i in positions]
+            notes = selected.index("notes") if "notes" in selected else None
+
+            def write(batch):
+                try:
+                    conn.executemany(query, batch)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                if progress is not None:
+                    progress.put((table, rows + len(batch)))
+                return len(batch)
+
+            batch = []
+            for record in reader:
+                # Blank lines are skipped; short lines would shift values into the wrong columns
+                if not any(field.strip() for field in record):
+                    continue
+                if len(record) < len(header):
+                    raise ValueError(f"{path}, line {reader.line_num}: {len(record)} fields, "
+                                     f"expected {len(header)}; {rows:,} rows were imported")
+                values = [record[i] if record[i] != "" else None for i in positions]
+                if notes is not None:
+                    values[notes] = compression.compress_notes(values[notes], database.notes_threshold)
+                batch.append(values)
+                if len(batch) == batch_size:
+                    rows += write(batch)
+                    batch = []
+            if batch:
+                rows += write(batch)
+    finally:
+        conn.close()
+        database.invalidate(table)
+        database.close()
+    return table, rows, time.perf_counter() - start
+
+
+def export_table(db_name, table, path, batch_size=5000, progress=None):
+    """
+    Write every row of a table to a CSV file with a header row.
+
+    Args:
+        db_name (str): Database file
+        table (str): Table name
+        path (str): CSV file to create
+        batch_size (int): Rows fetched and written at a time
+        progress (queue, optional): Receives (table, rows done) after every batch
+
+    Returns:
+        tuple: (table, rows, seconds)
+    """
+    start = time.perf_counter()
+    conn = crud.ZooDatabase(db_name).connect()
+    rows = 0
+    try:
+        columns = table_columns(conn, table)
+        # Compressed notes are exported as their text
+        expressions = [f"notes_text({column})" if column == "notes" else column for column in columns]
+        cursor = conn.execute(f"SELECT {', '.join(expressions)} FROM {table} ORDER BY rowid")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            writer = csv.writer(file)
+            writer.writerow(columns)
+            while True:
+                batch = cursor.fetchmany(batch_size)
+                if not batch:
+                    break
+                writer.writerows(batch)
+                rows += len(batch)
+                if progress is not None:
+                    progress.put((table, rows))
+    finally:
+        conn.close()
+    return table, rows, time.perf_counter() - start
+
+
+class Progress:
+    """Single status line with the rows done per table and the overall rate"""
+
+    def __init__(self, stream=sys.stderr):
+        self.stream = stream
+        self.start = time.perf_counter()
+        self.rows = {}
+
+    def update(self, table, rows):
+        self.rows[table] = rows
+        total = sum(self.rows.values())
+        rate = total / max(time.perf_counter() - self.start, 1e-9)
+        tables = " | ".join(f"{name}: {count:,}" for name, count in self.rows.items())
+        self.stream.write(f"\r{tables} | {rate:,.0f} rows/s")
+        self.stream.flush()
+
+    def summary(self, results):
+        if self.rows:
+            self.stream.write("\n")
+        for table, rows, seconds in results:
+            self.stream.write(f"{table}: {rows:,} rows in {seconds:.2f}s ({rows / max(seconds, 1e-9):,.0f} rows/s)\n")
+        self.stream.flush()
+
+
+def run_parallel(function, jobs, workers=None):
+    """
+    Run table jobs in worker processes, showing their combined progress.
+
+    Args:
+        function: import_table or export_table
+        jobs (list): Argument tuples (db_name, table, path, batch_size) of every job
+        workers (int, optional): Number of processes, defaults to one per job (at most the CPU count)
+
+    Returns:
+        list: (table, rows, seconds) of every job in job order
+    """
+    if not jobs:
+        return []
+    progress = Progress()
+    workers = workers or min(len(jobs), os.cpu_count() or 1)
+    with multiprocessing.Manager() as manager, \
+            concurrent.futures.ProcessPoolExecutor(max_workers=workers) as pool:
+        updates = manager.Queue()
+        futures = [pool.submit(function, *job, updates) for job in jobs]
+        pending = set(futures)
+        while pending:
+            _, pending = concurrent.futures.wait(pending, timeout=0.2)
+            while True:
+                try:
+                    progress.update(*updates.get_nowait())
+                except queue.Empty:
+                    break
+        results = [future.result() for future in futures]
+    progress.summary(results)
+    return results
+
+
+def import_files(db_name, files, batch_size=5000, workers=None):
+    """
+    Import CSV files level by level, the tables of a level in parallel.
+
+    Args:
+        db_name (str): Database file, created if needed
+        files (dict): Table name -> CSV file
+        batch_size (int): Rows inserted per transaction
+        workers (int, optional): Maximum number of worker processes
+
+    Returns:
+        list: (table, rows, seconds) of every imported table
+    """
+    initialize_database(db_name)
+    results = []
+    for level in TABLE_LEVELS:
+        jobs = [(db_name, table, files[table], batch_size) for table in level if table in files]
+        results += run_parallel(import_table, jobs, workers)
+    return results
+
+
+def export_tables(db_name, directory, tables=TABLES, batch_size=5000, workers=None):
+    """
+    Export tables to <directory>/<Table>.csv in parallel.
+
+    Args:
+        db_name (str): Database file
+        directory (str): Output directory, created if needed
+        tables (tuple): Tables to export
+        batch_size (int): Rows fetched and written at a time
+        workers (int, optional): Maximum number of worker processes
+
+    Returns:
+        list: (table, rows, seconds) of every exported table
+    """
+    os.makedirs(directory, exist_ok=True)
+    jobs = [(db_name, table, os.path.join(directory, f"{table}.csv"), batch_size) for table in tables]
+    return run_parallel(export_table, jobs, workers)
+
+
+def print_report(database):
+    """
+    Print record counts, payroll by department and the food types running out first.
+
+    The stock outlook is left out when NumPy, needed by forecast.py, is not installed.
+
+    Args:
+        database (crud.ZooDatabase): Database to report on
+    """
+    print("Records")
+    for table in TABLES:
+        print(f"  {table:<14} {getattr(database, table).count():>10,}")
+
+    print("\nPayroll by department")
+    for department, headcount, total, average, median, tenure in database.Staff.payroll():
+        print(f"  {department:<20} {headcount:>5} staff  total {total:>12,.0f}  "
+              f"median {median:>10,.0f}  tenure {tenure:.1f} years")
+
+    try:
+        import forecast
+    except ImportError:
+        print("\nStock outlook requires NumPy (pip install numpy)")
+        return
+
+    forecaster = forecast.StockForecaster(database)
+    try:
+        outlook = forecaster.forecast()[:10]
+    finally:
+        forecaster.close()
+    print("\nStock outlook")
+    for food_type_id, stock, rate, days, limited_by in outlook:
+        days_text = "not consumed" if days is None else f"{days:.1f} days ({limited_by})"
+        print(f"  food type {food_type_id:<6} {stock:>10,.1f} in stock  {rate:>8.2f}/day  {days_text}")
+
+
+def vacuum(database, full=False, step=256):
+    """
+    Release free pages and refresh the query planner statistics.
+
+    Args:
+        database (crud.ZooDatabase): Database to compact
+        full (bool): Rebuild the whole file with VACUUM instead of incremental steps
+        step (int): Pages released per incremental step
+
+    Returns:
+        dict: "pages_before", "pages_after" and "page_size"
+    """
+    import archive
+
+    conn = database.connect()
+    try:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        before = conn.execute("PRAGMA page_count").fetchone()[0]
+        if full:
+            conn.execute("VACUUM")
+        else:
+            archive.reclaim_space(conn, step)
+        conn.execute("PRAGMA optimize")
+        after = conn.execute("PRAGMA page_count").fetchone()[0]
+    finally:
+        conn.close()
+    return {"pages_before": before, "pages_after": after, "page_size": page_size}
+
+
+def print_notes_compression(database, threshold=None, batch_size=1000):
+    """
+    Compress the stored notes and print the space saved per table.
+
+    Args:
+        database (crud.ZooDatabase): Database to compress
+        threshold (int, optional): Minimum note size in bytes, defaults to the
+            database setting or compression.DEFAULT_THRESHOLD
+        batch_size (int): Rows rewritten per transaction
+    """
+    if threshold is None:
+        threshold = database.notes_threshold or compression.DEFAULT_THRESHOLD
+    compressed = compression.compress_existing(database, threshold, batch_size)
+    for table, entry in compression.notes_report(database).items():
+        saved = entry["text_bytes"] - entry["stored_bytes"]
+        print(f"{table}: {compressed[table]['rows']:,} notes compressed now, "
+              f"{entry['compressed']:,} of {entry['rows']:,} compressed in total, "
+              f"{entry['text_bytes']:,} -> {entry['stored_bytes']:,} bytes ({saved:,} saved)")
+    print("Run 'vacuum --full' (or 'vacuum' with incremental auto-vacuum) to release the freed pages")
+
+
+def main(argv=None):
+    """
+    Run the command-line tool.
+
+    Args:
+        argv (list, optional): Command-line arguments, defaults to sys.argv
+    """
+    parser = argparse.ArgumentParser(prog="zoo", description="Zoo Management System tools")
+    parser.add_argument("--db", default=crud.DB_NAME, help="Database file (default: %(default)s)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = commands.add_parser("import", help="Import CSV files into tables")
+    import_parser.add_argument("files", nargs="+",
+                               help="CSV files named after their table (animals.csv) or TABLE=FILE")
+    import_parser.add_argument("--batch-size", type=int, default=5000)
+    import_parser.add_argument("--workers", type=int)
+
+    export_parser = commands.add_parser("export", help="Export tables to CSV files")
+    export_parser.add_argument("tables", nargs="*", help="Tables to export (default: all)")
+    export_parser.add_argument("--directory", default=".")
+    export_parser.add_argument("--batch-size", type=int, default=5000)
+    export_parser.add_argument("--workers", type=int)
+
+    commands.add_parser("report", help="Print counts, payroll and stock outlook")
+
+    vacuum_parser = commands.add_parser("vacuum", help="Release free pages and run PRAGMA optimize")
+    vacuum_parser.add_argument("--full", action="store_true", help="Rebuild the file with VACUUM")
+    vacuum_parser.add_argument("--step", type=int, default=256)
+
+    notes_parser = commands.add_parser("compress-notes", help="Compress the stored Feeding and AnimalCare notes")
+    notes_parser.add_argument("--threshold", type=int, default=None,
+                              help="Minimum note size in bytes (default: the database setting or 64)")
+    notes_parser.add_argument("--batch-size", type=int, default=1000)
+
+    bench_parser = commands.add_parser("bench", help="Run the storage settings benchmark (see bench.py)")
+    bench_parser.add_argument("arguments", nargs=argparse.REMAINDER)
+
+    args = parser.parse_args(argv)
+    try:
+        if args.command == "import":
+            files = {}
+            for item in args.files:
+                name, _, path = item.rpartition("=")
+                name = name or os.path.splitext(os.path.basename(path))[0]
+                files[table_name(name)] = path
+            import_files(args.db, files, args.batch_size, args.workers)
+        elif args.command == "export":
+            tables = tuple(table_name(name) for name in args.tables) or TABLES
+            export_tables(args.db, args.directory, tables, args.batch_size, args.workers)
+        elif args.command == "report":
+            print_report(crud.ZooDatabase(args.db))
+        elif args.command == "vacuum":
+            result = vacuum(crud.ZooDatabase(args.db), args.full, args.step)
+            freed = (result["pages_before"] - result["pages_after"]) * result["page_size"]
+            print(f"{result['pages_before']} -> {result['pages_after']} pages ({freed:,} bytes released)")
+        elif args.command == "compress-notes":
+            print_notes_compression(crud.ZooDatabase(args.db), args.threshold, args.batch_size)
+        else:
+            import bench
+
+            bench.main(args.arguments)
+    except (ValueError, OSError) as e:
+        parser.error(str(e))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+"""
+Transparent compression of the free-text notes of Feeding and AnimalCare.
+
+Notes of at least a threshold size are stored as a BLOB holding MAGIC and
+the raw deflate stream of the UTF-8 text, compressed with a preset
+dictionary of common note phrases (which is what makes short notes worth
+compressing). Shorter notes, and notes that would not shrink, stay TEXT.
+
+Compression is enabled per database handle with
+ZooDatabase(..., notes_threshold=64), or for the default handle with the
+ZOO_NOTES_THRESHOLD environment variable. Reading needs no setting: every
+connection has the notes_text() SQL function, which the CRUD classes apply
+to the notes column, so only the rows a query returns are decompressed and
+queries not selecting notes never are. Existing rows are compressed with
+
+    python cli.py compress-notes --threshold 64
+"""
+import zlib
+
+# Prefix of compressed notes; compressed notes are BLOBs, so it cannot collide with text notes
+MAGIC = b"\x00ZN1"
+
+# Preset dictionary of phrases common in notes; the most frequent come last.
+# Changing it makes existing compressed notes unreadable: use a new MAGIC instead.
+DICTIONARY = (
+    "Blood sample taken for analysis. Hoof trimming. Teeth cleaning. Wound cleaned and dressed. "
+    "Enrichment activity provided. Training session completed. Weight recorded in kg. "
+    "Vaccination administered. Medication given with food. Follow-up examination required. "
+    "Veterinary checkup completed, no issues found. Monitoring continues. Refused food. "
+    "Left some food, appetite reduced. Behavior normal, active and alert. "
+    "Fed by keeper in the morning. Fed in the afternoon. Ate well, normal appetite. "
+).encode("utf-8")
+
+# Default size in bytes from which notes are compressed
+DEFAULT_THRESHOLD = 64
+
+# Tables with a notes column, as (table, primary key)
+NOTES_TABLES = (("Feeding", "feedingID"), ("AnimalCare", "careID"))
+
+
+def compress_notes(text, threshold=DEFAULT_THRESHOLD):
+    """
+    Compress a note if it is long enough and shrinks.
+
+    Args:
+        text (str or None): Note to store
+        threshold (int or None): Minimum size in bytes to compress, None to never compress
+
+    Returns:
+        str, bytes or None: The value to store in the notes column
+    """
+    if threshold is None or not isinstance(text, str):
+        return text
+    data = text.encode("utf-8")
+    if len(data) < threshold:
+        return text
+    compressor = zlib.compressobj(9, zlib.DEFLATED, -15, zdict=DICTIONARY)
+    blob = MAGIC + compressor.compress(data) + compressor.flush()
+    return blob if len(blob) < len(data) else text
+
+
+def decompress_notes(value):
+    """
+    Get the text of a stored note.
+
+    Args:
+        value (str, bytes or None): Value of the notes column
+
+    Returns:
+        str or None: The note; values not compressed by compress_notes() are returned unchanged
+    """
+    if isinstance(value, bytes) and value.startswith(MAGIC):
+        decompressor = zlib.decompressobj(-15, zdict=DICTIONARY)
+        return (decompressor.decompress(value[len(MAGIC):]) + decompressor.flush()).decode("utf-8")
+    return value
+
+
+def register(conn):
+    """
+    Register the notes_text(notes) SQL function on a connection.
+
+    Args:
+        conn (sqlite3.Connection): Connection to configure
+    """
+    conn.create_function("notes_text", 1, decompress_notes, deterministic=True)
+
+
+def notes_report(database=None):
+    """
+    Measure the storage used by notes.
+
+    Args:
+        database (crud.ZooDatabase, optional): Database to measure, defaults to the default database
+
+    Returns:
+        dict: Table -> {"rows": rows with notes, "compressed": compressed rows,
+              "stored_bytes": bytes stored, "text_bytes": bytes of the uncompressed text}
+    """
+    import crud
+
+    database = database or crud.get_database()
+    conn = database.connect()
+    try:
+        report = {}
+        for table, _ in NOTES_TABLES:
+            rows, compressed, stored, text = conn.execute(
+                f"""SELECT COUNT(*), TOTAL(typeof(notes) = 'blob'),
+                           TOTAL(length(CAST(notes AS BLOB))), TOTAL(length(CAST(notes_text(notes) AS BLOB)))
+                    FROM {table} WHERE notes IS NOT NULL"""
+            ).fetchone()
+            report[table] = {"rows": rows, "compressed": int(compressed),
+                             "stored_bytes": int(stored), "text_bytes": int(text)}
+        return report
+    finally:
+        conn.close()
+
+
+def compress_existing(database=None, threshold=DEFAULT_THRESHOLD, batch_size=1000):
+    """
+    Compress the stored text notes of at least threshold bytes.
+
+    Rows are rewritten in short transactions of batch_size rows, so the
+    database stays writable meanwhile. The updates are recorded in the
+    change log like any other. The file only shrinks once the freed pages
+    are released (python cli.py vacuum --full).
+
+    Args:
+        database (crud.ZooDatabase, optional): Database to compress, defaults to the default database
+        threshold (int): Minimum note size in bytes to compress
+        batch_size (int): Rows rewritten per transaction
+
+    Returns:
+        dict: Table -> {"rows": rows compressed, "bytes_before": their text size,
+              "bytes_after": their compressed size}
+    """
+    import crud
+
+    database = database or crud.get_database()
+    conn = database.connect()
+    result = {}
+    try:
+        for table, key in NOTES_TABLES:
+            totals = {"rows": 0, "bytes_before": 0, "bytes_after": 0}
+            last_id = 0
+            while True:
+                rows = conn.execute(
+                    f"""SELECT {key}, notes FROM {table}
+                        WHERE {key} > ? AND typeof(notes) = 'text' AND length(CAST(notes AS BLOB)) >= ?
+                        ORDER BY {key} LIMIT ?""",
+                    (last_id, threshold, batch_size)
+                ).fetchall()
+                if not rows:
+                    break
+                last_id = rows[-1][0]
+                updates = []
+                for record_id, text in rows:
+                    value = compress_notes(text, threshold)
+                    if isinstance(value, bytes):
+                        updates.append((value, record_id))
+                        totals["bytes_before"] += len(text.encode("utf-8"))
+                        totals["bytes_after"] += len(value)
+                try:
+                    conn.executemany(f"UPDATE {table} SET notes = ? WHERE {key} = ?", updates)
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                totals["rows"] += len(updates)
+            result[table] = totals
+    finally:
+        conn.close()
+    database.invalidate(*(table for table, _ in NOTES_TABLES))
+    return result
@@ -1,18 +1,28 @@
 """
 Module for initializing the zoo database with normalized tables.
 This script creates the necessary tables for the Zoo Management System.
+
+The schema is versioned with PRAGMA user_version: every change to the schema
+is an ordered migration step in MIGRATIONS, and a database whose version is
+already current is opened without running any DDL.
 """
 import sqlite3
 import os
+import re
 
 
-def initialize_database(db_name="zoo.db", force_new=False):
+def initialize_database(db_name="zoo.db", force_new=False, page_size=None):
     """
     Initialize the database with the required tables.
 
+    Pending migrations are applied in order; when the database is already at
+    SCHEMA_VERSION only its user_version is read.
+
     Args:
-        db_name (str): Name of the database file
+        db_name (str): Name of the database file, or a "file:" URI
         force_new (bool): If True, removes existing database before creating a new one
+        page_size (int, optional): Page size in bytes (a power of two from 512 to 65536);
+            an existing database with another page size is rebuilt
 
     Returns:
         bool: True if initialization was successful
@@ -21,9 +31,173 @@ def initialize_database(db_name="zoo.db", force_new=False):
     if force_new and os.path.exists(db_name):
         os.remove(db_name)
 
-    conn = sqlite3.connect(db_name)
-    cursor = conn.cursor()
+    conn = sqlite3.connect(db_name, isolation_level=None, uri=db_name.startswith("file:"))
+    try:
+        # Fast path: nothing to do when the schema is current
+        if get_schema_version(conn) != SCHEMA_VERSION:
+            # auto_vacuum and page_size can only be chosen before the first table is created
+            if conn.execute("SELECT COUNT(*) FROM sqlite_master").fetchone()[0] == 0:
+                conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                if page_size is not None:
+                    conn.execute(f"PRAGMA page_size = {int(page_size)}")
+            migrate(conn)
+        if page_size is not None and conn.execute("PRAGMA page_size").fetchone()[0] != page_size:
+            change_page_size(conn, page_size)
+    finally:
+        conn.close()
+
+    return True
+
+
+def attach_archive(conn, archive_name):
+    """
+    Attach the cold archive database as schema "archive", creating its tables if needed.
+
+    The archive holds Feeding and AnimalCare rows moved out of the main
+    database; their parent rows stay in the main database.
+
+    Args:
+        conn (sqlite3.Connection): Connection with no open transaction
+        archive_name (str): Name of the archive database file
+
+    Returns:
+        bool: True if the archive was attached, False if it already was
+    """
+    if any(row[1] == "archive" for row in conn.execute("PRAGMA database_list")):
+        return False
+    conn.execute("ATTACH DATABASE ? AS archive", (archive_name,))
+    if conn.execute("PRAGMA archive.user_version").fetchone()[0] == 0:
+        conn.execute("PRAGMA archive.auto_vacuum = INCREMENTAL")
+        conn.executescript('''
+        BEGIN;
+        CREATE TABLE IF NOT EXISTS archive.Feeding (
+            feedingID INTEGER PRIMARY KEY,
+            animalID INTEGER NOT NULL,
+            foodTypeID INTEGER NOT NULL,
+            staffID INTEGER NOT NULL,
+            feeding_date TEXT NOT NULL,
+            quantity REAL NOT NULL,
+            notes TEXT
+        );
+        CREATE INDEX IF NOT EXISTS archive.idx_feeding_animal_date ON Feeding (animalID, feeding_date);
+        CREATE INDEX IF NOT EXISTS archive.idx_feeding_staff_date ON Feeding (staffID, feeding_date);
+        CREATE TABLE IF NOT EXISTS archive.AnimalCare (
+            careID INTEGER PRIMARY KEY,
+            animalID INTEGER NOT NULL,
+            staffID INTEGER NOT NULL,
+            care_date TEXT NOT NULL,
+            care_type TEXT NOT NULL,
+            notes TEXT
+        );
+        CREATE INDEX IF NOT EXISTS archive.idx_animalcare_animal_date ON AnimalCare (animalID, care_date);
+        CREATE INDEX IF NOT EXISTS archive.idx_animalcare_staff_date ON AnimalCare (staffID, care_date);
+        PRAGMA archive.user_version = 1;
+        COMMIT;
+        ''')
+    if conn.execute("PRAGMA archive.user_version").fetchone()[0] == 1:
+        conn.commit()
+        cursor = conn.cursor()
+        cursor.execute("BEGIN")
+        _add_day_columns(cursor, "archive", ("Feeding", "AnimalCare"))
+        cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_feeding_staff_day ON Feeding (staffID, feeding_day)")
+        cursor.execute("CREATE INDEX IF NOT EXISTS archive.idx_animalcare_staff_day ON AnimalCare (staffID, care_day)")
+        cursor.execute("PRAGMA archive.user_version = 2")
+        cursor.execute("COMMIT")
+    return True
+
+
+def change_page_size(conn, page_size):
+    """
+    Rebuild a database with a new page size.
+
+    The whole file is rewritten with VACUUM while holding the write lock.
+    A WAL database is switched to rollback journal for the rebuild, since
+    the page size of a WAL database cannot change, and switched back after.
+
+    Args:
+        conn (sqlite3.Connection): Connection with no open transaction
+        page_size (int): New page size in bytes (a power of two from 512 to 65536)
+
+    Returns:
+        int: Page size of the rebuilt database
+    """
+    page_size = int(page_size)
+    if page_size < 512 or page_size > 65536 or page_size & (page_size - 1):
+        raise ValueError(f"Invalid page size: {page_size}")
+    journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+    if journal_mode == "wal":
+        conn.execute("PRAGMA journal_mode = DELETE")
+    conn.execute(f"PRAGMA page_size = {page_size}")
+    conn.execute("VACUUM")
+    if journal_mode == "wal":
+        conn.execute("PRAGMA journal_mode = WAL")
+    return conn.execute("PRAGMA page_size").fetchone()[0]
+
+
+def get_schema_version(conn):
+    """
+    Read the schema version stored in the database header.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Returns:
+        int: Schema version, 0 for a database that was never migrated
+    """
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target_version=None):
+    """
+    Apply the pending migrations up to a target version.
+
+    Every step runs in its own IMMEDIATE transaction together with the
+    user_version bump, so a failed step leaves the database at the previous
+    version and concurrent processes never apply the same step twice.
+
+    Args:
+        conn (sqlite3.Connection): Connection opened with isolation_level=None
+        target_version (int, optional): Version to migrate to, defaults to SCHEMA_VERSION
+
+    Returns:
+        list: Versions that were applied
+    """
+    if target_version is None:
+        target_version = SCHEMA_VERSION
+    if get_schema_version(conn) > SCHEMA_VERSION:
+        raise RuntimeError(
+            f"Database schema version {get_schema_version(conn)} is newer than "
+            f"the supported version {SCHEMA_VERSION}"
+        )
+
+    applied = []
+    for version, step in MIGRATIONS:
+        if version > target_version:
+            break
+        cursor = conn.cursor()
+        cursor.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read inside the lock in case another process migrated meanwhile
+            if version <= get_schema_version(conn):
+                cursor.execute("COMMIT")
+                continue
+            step(cursor)
+            cursor.execute(f"PRAGMA user_version = {version}")
+            cursor.execute("COMMIT")
+        except Exception:
+            cursor.execute("ROLLBACK")
+            raise
+        applied.append(version)
+    return applied
+
 
+def _create_base_tables(cursor):
+    """
+    Migration 1: create the normalized zoo tables.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
     # Create Species table (Lookup table for animal species)
     cursor.execute('''
     CREATE TABLE IF NOT EXISTS Species (
@@ -123,10 +297,534 @@ def initialize_database(db_name="zoo.db", force_new=False):
     )
     ''')
 
-    conn.commit()
-    conn.close()
 
-    return True
+def _create_change_log(cursor):
+    """
+    Migration 2: create the change-data-capture log and its triggers.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    # Create ChangeLog table recording which rows changed, for incremental sync
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ChangeLog (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        operation TEXT NOT NULL CHECK(operation IN ('I', 'U', 'D')),
+        changed_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Create ChangeLogConsumers table storing the last acknowledged change per consumer
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS ChangeLogConsumers (
+        consumer TEXT PRIMARY KEY,
+        last_seq INTEGER NOT NULL DEFAULT 0
+    )
+    ''')
+
+    create_change_log_triggers(cursor)
+
+
+def _create_animal_status(cursor):
+    """
+    Migration 3: create the materialized AnimalStatus table and fill it.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    # Create AnimalStatus table, a materialized dashboard row per animal kept current by triggers
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS AnimalStatus (
+        animalID INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        speciesID INTEGER NOT NULL,
+        species_name TEXT,
+        health_status TEXT,
+        last_feeding_date TEXT,
+        last_care_date TEXT,
+        last_care_type TEXT
+    )
+    ''')
+
+    # Indexes used to find the latest feeding and care event of an animal
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feeding_animal_date ON Feeding (animalID, feeding_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_animalcare_animal_date ON AnimalCare (animalID, care_date)")
+
+    create_animal_status_triggers(cursor)
+    rebuild_animal_status(cursor)
+
+
+def _create_workload_indexes(cursor):
+    """
+    Migration 4: create the indexes used by Staff.workload.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    # Indexes used to aggregate staff workload over a date range
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feeding_staff_date ON Feeding (staffID, feeding_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_animalcare_staff_date ON AnimalCare (staffID, care_date)")
+
+
+def _create_filter_indexes(cursor):
+    """
+    Migration 5: create the indexes used by the filtered find() queries.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_animals_species ON Animals (speciesID, health_status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_animals_health ON Animals (health_status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feeding_date ON Feeding (feeding_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feeding_food_type_date ON Feeding (foodTypeID, feeding_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_staff_role ON Staff (roleID)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_staff_country ON Staff (country)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_food_type ON FoodInventory (foodTypeID, expiration_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_expiration ON FoodInventory (expiration_date)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_animalcare_date ON AnimalCare (care_date)")
+
+
+# SQL expression turning an ISO date or timestamp into its integer Julian day number
+DAY_NUMBER_SQL = "CAST(julianday({}) + 0.5 AS INTEGER)"
+
+# Date columns with a generated day-number column, as (table, date column, day column)
+DAY_COLUMNS = (
+    ("Feeding", "feeding_date", "feeding_day"),
+    ("AnimalCare", "care_date", "care_day"),
+    ("FoodInventory", "expiration_date", "expiration_day"),
+    ("Staff", "hire_date", "hire_day"),
+)
+
+
+def _add_day_columns(cursor, schema="main", tables=None):
+    """
+    Add the generated integer day-number columns of DAY_COLUMNS.
+
+    The columns are VIRTUAL, so existing rows need no rewrite; building
+    their indexes computes the value of every existing row.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+        schema (str): Schema holding the tables
+        tables (tuple, optional): Restrict to these tables
+    """
+    for table, date_column, day_column in DAY_COLUMNS:
+        if tables is not None and table not in tables:
+            continue
+        cursor.execute(f"PRAGMA {schema}.table_xinfo({table})")
+        if any(row[1] == day_column for row in cursor.fetchall()):
+            continue
+        cursor.execute(
+            f"""ALTER TABLE {schema}.{table} ADD COLUMN {day_column} INTEGER
+                GENERATED ALWAYS AS ({DAY_NUMBER_SQL.format(date_column)}) VIRTUAL"""
+        )
+
+
+def _create_day_columns(cursor):
+    """
+    Migration 6: index dates by integer day number instead of text.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    _add_day_columns(cursor)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feeding_day ON Feeding (feeding_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feeding_staff_day ON Feeding (staffID, feeding_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_feeding_food_type_day ON Feeding (foodTypeID, feeding_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_animalcare_day ON AnimalCare (care_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_animalcare_staff_day ON AnimalCare (staffID, care_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_inventory_expiration_day ON FoodInventory (expiration_day)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_staff_hire_day ON Staff (hire_day)")
+
+    # Text date indexes replaced by the day-number ones above
+    for index in ("idx_feeding_date", "idx_feeding_food_type_date", "idx_feeding_staff_date",
+                  "idx_animalcare_date", "idx_animalcare_staff_date", "idx_inventory_expiration"):
+        cursor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+def _create_nutrition_plan(cursor):
+    """
+    Migration 7: create the NutritionPlan table written by the nutrition planner.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS NutritionPlan (
+        plan_date TEXT NOT NULL,
+        animalID INTEGER NOT NULL,
+        foodTypeID INTEGER NOT NULL,
+        daily_quantity REAL NOT NULL CHECK(daily_quantity >= 0),
+        PRIMARY KEY (plan_date, animalID, foodTypeID),
+        FOREIGN KEY (animalID) REFERENCES Animals(animalID),
+        FOREIGN KEY (foodTypeID) REFERENCES FoodTypes(foodTypeID)
+    ) WITHOUT ROWID
+    ''')
+
+
+# Tables updated with optimistic concurrency checks (see crud.ConflictError)
+VERSIONED_TABLES = ("Animals", "Staff", "FoodInventory")
+
+
+def _add_row_versions(cursor):
+    """
+    Migration 8: add the row version column checked by update(expected_version=...).
+
+    Existing rows start at version 1; every update through the CRUD classes
+    increments it.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    for table in VERSIONED_TABLES:
+        cursor.execute(f"PRAGMA table_info({table})")
+        if not any(row[1] == "version" for row in cursor.fetchall()):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN version INTEGER NOT NULL DEFAULT 1")
+
+
+# Health statuses needing no attention, and the condition selecting every other animal
+NORMAL_HEALTH_STATUSES = ("Good", "Healthy")
+ATTENTION_CONDITION = f"health_status NOT IN ({', '.join(repr(status) for status in NORMAL_HEALTH_STATUSES)})"
+
+
+def _create_attention_index(cursor):
+    """
+    Migration 9: create the partial index of the animals needing attention.
+
+    Only animals with a non-normal health status are indexed, so the index
+    stays small and the vet dashboard reads it instead of scanning Animals.
+    Queries must use ATTENTION_CONDITION verbatim for the planner to pick it.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    cursor.execute(
+        f"""CREATE INDEX IF NOT EXISTS idx_animals_attention
+            ON Animals (health_status, speciesID, name, version) WHERE {ATTENTION_CONDITION}"""
+    )
+
+
+# Tables whose row IDs must never be reused, because rows are moved to the archive by ID
+NEVER_REUSED_IDS = (("Feeding", "feedingID"), ("AnimalCare", "careID"))
+
+
+def _never_reuse_ids(cursor):
+    """
+    Migration 10: rebuild Feeding and AnimalCare with AUTOINCREMENT keys.
+
+    Without AUTOINCREMENT, the ID of the newest row is handed out again once
+    that row is deleted or archived, so a later archival run would collide
+    with the archived row. SQLite cannot add AUTOINCREMENT to an existing
+    key, so each table is copied into a new one and its indexes and triggers
+    are recreated from their stored definitions.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    for table, key in NEVER_REUSED_IDS:
+        table_sql = cursor.execute(
+            "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone()[0]
+        if "AUTOINCREMENT" in table_sql.upper():
+            continue
+        _rebuild_table(cursor, table, table_sql.replace(
+            f"{key} INTEGER PRIMARY KEY", f"{key} INTEGER PRIMARY KEY AUTOINCREMENT", 1))
+
+
+def _rebuild_table(cursor, table, table_sql):
+    """
+    Replace a table by a new definition, keeping its rows, indexes, triggers and AUTOINCREMENT position.
+
+    SQLite cannot change constraints in place, so the rows are copied into a
+    table created from table_sql, which replaces the old one; its indexes
+    and triggers are recreated from their stored definitions.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+        table (str): Table to rebuild
+        table_sql (str): CREATE TABLE statement of the new definition, named like the table
+    """
+    dependents = [row[0] for row in cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') AND sql IS NOT NULL",
+        (table,)
+    )]
+    # Deleted rows may have taken higher IDs than the copied ones
+    sequence = None
+    if cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_sequence'").fetchone():
+        sequence = cursor.execute("SELECT seq FROM sqlite_sequence WHERE name = ?", (table,)).fetchone()
+    # Generated columns are recomputed by the new table, so only stored columns are copied
+    columns = ", ".join(row[1] for row in cursor.execute(f"PRAGMA table_xinfo({table})") if row[6] == 0)
+    cursor.execute(re.sub(rf'^CREATE TABLE\s+"?{table}"?', f"CREATE TABLE {table}_rebuild", table_sql, count=1))
+    cursor.execute(f"INSERT INTO {table}_rebuild ({columns}) SELECT {columns} FROM {table}")
+    cursor.execute(f"DROP TABLE {table}")
+    # Legacy renaming leaves the triggers of other tables that mention the table untouched
+    cursor.execute("PRAGMA legacy_alter_table = ON")
+    try:
+        cursor.execute(f"ALTER TABLE {table}_rebuild RENAME TO {table}")
+    finally:
+        cursor.execute("PRAGMA legacy_alter_table = OFF")
+    if sequence is not None:
+        cursor.execute("DELETE FROM sqlite_sequence WHERE name = ?", (table,))
+        cursor.execute("INSERT INTO sqlite_sequence (name, seq) VALUES (?, ?)", (table, sequence[0]))
+    for sql in dependents:
+        cursor.execute(sql)
+
+
+def _create_attention_version(cursor):
+    """
+    Migration 11: create the AttentionVersion counter read by Animals.attention_signature().
+
+    Triggers bump the counter whenever a write can change the result of
+    Animals.needing_attention(), whichever code path made it.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS AttentionVersion (
+        id INTEGER PRIMARY KEY CHECK(id = 1),
+        version INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute("INSERT OR IGNORE INTO AttentionVersion (id, version) VALUES (1, 1)")
+    create_attention_triggers(cursor)
+
+
+def _allow_archive_operation(cursor):
+    """
+    Migration 12: allow the 'A' operation in ChangeLog for rows moved to the archive.
+
+    Archival deletes rows from the main database without the data changing,
+    so they are logged as 'A' instead of 'D'. The sequence position is kept,
+    so consumers never see a sequence number twice.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    table_sql = cursor.execute(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'ChangeLog'"
+    ).fetchone()[0]
+    _rebuild_table(cursor, "ChangeLog", table_sql.replace(
+        "CHECK(operation IN ('I', 'U', 'D'))", "CHECK(operation IN ('I', 'U', 'D', 'A'))", 1))
+
+
+# Ordered schema migrations as (version, step); append new steps, never edit applied ones
+MIGRATIONS = [
+    (1, _create_base_tables),
+    (2, _create_change_log),
+    (3, _create_animal_status),
+    (4, _create_workload_indexes),
+    (5, _create_filter_indexes),
+    (6, _create_day_columns),
+    (7, _create_nutrition_plan),
+    (8, _add_row_versions),
+    (9, _create_attention_index),
+    (10, _never_reuse_ids),
+    (11, _create_attention_version),
+    (12, _allow_archive_operation),
+]
+
+# Schema version of a fully migrated database
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+# Tables tracked by the change log and their primary key columns
+CHANGE_LOG_TABLES = {
+    "Animals": "animalID",
+    "Feeding": "feedingID",
+    "FoodInventory": "inventoryID",
+    "Staff": "staffID",
+    "AnimalCare": "careID",
+}
+
+
+def create_change_log_triggers(cursor):
+    """
+    Create the triggers that record inserts, updates and deletes in ChangeLog.
+
+    Only the table name, row ID and operation are logged; consumers re-read
+    the current row when they process a change.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    for table, key in CHANGE_LOG_TABLES.items():
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cdc_{table}_insert AFTER INSERT ON {table}
+        BEGIN
+            INSERT INTO ChangeLog (table_name, row_id, operation) VALUES ('{table}', NEW.{key}, 'I');
+        END
+        ''')
+
+        # A changed primary key is logged as a delete of the old ID plus an update of the new one
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cdc_{table}_update AFTER UPDATE ON {table}
+        BEGIN
+            INSERT INTO ChangeLog (table_name, row_id, operation)
+            SELECT '{table}', OLD.{key}, 'D' WHERE OLD.{key} <> NEW.{key};
+            INSERT INTO ChangeLog (table_name, row_id, operation) VALUES ('{table}', NEW.{key}, 'U');
+        END
+        ''')
+
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS cdc_{table}_delete AFTER DELETE ON {table}
+        BEGIN
+            INSERT INTO ChangeLog (table_name, row_id, operation) VALUES ('{table}', OLD.{key}, 'D');
+        END
+        ''')
+
+
+# Expression computing the full AnimalStatus row of the animal aliased as "a"
+ANIMAL_STATUS_SELECT = '''
+    SELECT a.animalID, a.name, a.speciesID,
+           (SELECT s.name FROM Species s WHERE s.speciesID = a.speciesID),
+           a.health_status,
+           (SELECT MAX(f.feeding_date) FROM Feeding f WHERE f.animalID = a.animalID),
+           c.care_date, c.care_type
+    FROM Animals a
+    LEFT JOIN AnimalCare c ON c.careID = (
+        SELECT careID FROM AnimalCare
+        WHERE animalID = a.animalID
+        ORDER BY care_date DESC, careID DESC LIMIT 1
+    )
+'''
+
+
+def create_animal_status_triggers(cursor):
+    """
+    Create the triggers that keep AnimalStatus in step with Animals, Species, Feeding and AnimalCare.
+
+    Inserts only compare against the stored maximum; updates and deletes
+    recompute the affected animal through the (animalID, date) indexes.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS status_Animals_insert AFTER INSERT ON Animals
+    BEGIN
+        INSERT OR REPLACE INTO AnimalStatus {ANIMAL_STATUS_SELECT} WHERE a.animalID = NEW.animalID;
+    END
+    ''')
+    cursor.execute(f'''
+    CREATE TRIGGER IF NOT EXISTS status_Animals_update AFTER UPDATE ON Animals
+    BEGIN
+        DELETE FROM AnimalStatus WHERE animalID = OLD.animalID;
+        INSERT OR REPLACE INTO AnimalStatus {ANIMAL_STATUS_SELECT} WHERE a.animalID = NEW.animalID;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS status_Animals_delete AFTER DELETE ON Animals
+    BEGIN
+        DELETE FROM AnimalStatus WHERE animalID = OLD.animalID;
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS status_Species_update AFTER UPDATE OF name ON Species
+    BEGIN
+        UPDATE AnimalStatus SET species_name = NEW.name WHERE speciesID = NEW.speciesID;
+    END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS status_Feeding_insert AFTER INSERT ON Feeding
+    BEGIN
+        UPDATE AnimalStatus SET last_feeding_date = NEW.feeding_date
+        WHERE animalID = NEW.animalID
+          AND (last_feeding_date IS NULL OR last_feeding_date < NEW.feeding_date);
+    END
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS status_Feeding_update AFTER UPDATE OF animalID, feeding_date ON Feeding
+    BEGIN
+        UPDATE AnimalStatus
+        SET last_feeding_date = (SELECT MAX(feeding_date) FROM Feeding WHERE animalID = AnimalStatus.animalID)
+        WHERE animalID IN (OLD.animalID, NEW.animalID);
+    END
+    ''')
+    # Deleting an older feeding cannot change the maximum, so only the latest one triggers a recompute
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS status_Feeding_delete AFTER DELETE ON Feeding
+    BEGIN
+        UPDATE AnimalStatus
+        SET last_feeding_date = (SELECT MAX(feeding_date) FROM Feeding WHERE animalID = OLD.animalID)
+        WHERE animalID = OLD.animalID AND last_feeding_date = OLD.feeding_date;
+    END
+    ''')
+
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS status_AnimalCare_insert AFTER INSERT ON AnimalCare
+    BEGIN
+        UPDATE AnimalStatus SET last_care_date = NEW.care_date, last_care_type = NEW.care_type
+        WHERE animalID = NEW.animalID
+          AND (last_care_date IS NULL OR last_care_date <= NEW.care_date);
+    END
+    ''')
+    for event, animal_ids in (("UPDATE", "OLD.animalID, NEW.animalID"), ("DELETE", "OLD.animalID")):
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS status_AnimalCare_{event.lower()} AFTER {event} ON AnimalCare
+        BEGIN
+            UPDATE AnimalStatus
+            SET (last_care_date, last_care_type) = (
+                SELECT care_date, care_type FROM AnimalCare
+                WHERE animalID = AnimalStatus.animalID
+                ORDER BY care_date DESC, careID DESC LIMIT 1
+            )
+            WHERE animalID IN ({animal_ids});
+        END
+        ''')
+
+
+def create_attention_triggers(cursor):
+    """
+    Create the triggers that bump AttentionVersion.
+
+    They fire when an animal enters, leaves or changes within the
+    ATTENTION_CONDITION set, when a care event of such an animal is written,
+    and when the species of such an animal is renamed.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+    """
+    bump = "UPDATE AttentionVersion SET version = version + 1 WHERE id = 1;"
+    listed = f"EXISTS (SELECT 1 FROM Animals a WHERE a.animalID = {{}}.animalID AND a.{ATTENTION_CONDITION})"
+    triggers = (
+        ("attention_Animals_insert", "AFTER INSERT ON Animals", f"NEW.{ATTENTION_CONDITION}"),
+        ("attention_Animals_update", "AFTER UPDATE ON Animals",
+         f"OLD.{ATTENTION_CONDITION} OR NEW.{ATTENTION_CONDITION}"),
+        ("attention_Animals_delete", "AFTER DELETE ON Animals", f"OLD.{ATTENTION_CONDITION}"),
+        ("attention_AnimalCare_insert", "AFTER INSERT ON AnimalCare", listed.format("NEW")),
+        ("attention_AnimalCare_update", "AFTER UPDATE OF animalID, care_date ON AnimalCare",
+         f"{listed.format('OLD')} OR {listed.format('NEW')}"),
+        ("attention_AnimalCare_delete", "AFTER DELETE ON AnimalCare", listed.format("OLD")),
+        ("attention_Species_update", "AFTER UPDATE OF name ON Species",
+         f"EXISTS (SELECT 1 FROM Animals a WHERE a.speciesID = NEW.speciesID AND a.{ATTENTION_CONDITION})"),
+    )
+    for name, event, condition in triggers:
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS {name} {event}
+        WHEN {condition}
+        BEGIN
+            {bump}
+        END
+        ''')
+
+
+def rebuild_animal_status(cursor):
+    """
+    Recompute every AnimalStatus row from the source tables.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor on the database to modify
+
+    Returns:
+        int: Number of animals in the rebuilt table
+    """
+    cursor.execute("DELETE FROM AnimalStatus")
+    cursor.execute(f"INSERT INTO AnimalStatus {ANIMAL_STATUS_SELECT}")
+    return cursor.rowcount
 
 
 if __name__ == "__main__":
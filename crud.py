@@ -3,23 +3,521 @@ CRUD (Create, Read, Update, Delete) operations for the Zoo Management System.
 
 This module provides classes for interacting with the zoo database,
 allowing management of animals, food inventory, and staff records.
+
+Every database is represented by a ZooDatabase handle owning its connection
+pool, caches and statistics. The static classes (Species, Animals, ...) act on
+a default handle for DB_NAME; the same classes are available bound to any
+other handle as attributes, e.g. ZooDatabase("other.db").Animals.read(1).
 """
 import sqlite3
 import datetime
+import os
+import time
+import threading
+import functools
+import json
+import contextvars
+
+import compression
+import profiling
+from create_database_if_not_exist import (
+    ATTENTION_CONDITION, attach_archive, initialize_database, rebuild_animal_status
+)
+
+
+# Database name, overridable with the DB_NAME environment variable
+DB_NAME = os.environ.get("DB_NAME", "zoo.db")
+
+# Default size in bytes from which notes are stored compressed (see compression.py), None to never compress
+NOTES_THRESHOLD = int(os.environ["ZOO_NOTES_THRESHOLD"]) if os.environ.get("ZOO_NOTES_THRESHOLD") else None
+
+# SQL expressions mapping a date column to the first day of its workload period
+WORKLOAD_PERIODS = {
+    "day": "date({})",
+    "week": "date({}, 'weekday 0', '-6 days')",
+    "month": "date({}, 'start of month')",
+}
+
+# Columns Staff.payroll() can group by
+PAYROLL_GROUPS = {
+    "department": "r.department",
+    "role": "r.title",
+    "country": "s.country",
+}
+
+# URI of a named in-memory database shared by every connection of the process
+MEMORY_DB_URI = "file:{}?mode=memory&cache=shared"
+
+# PRAGMA settings applied to every connection opened under each profile.
+# cache_size is in pages when positive and in KiB when negative.
+PROFILES = {
+    "default": {},
+    "fast": {"journal_mode": "WAL", "synchronous": "NORMAL"},
+    "safe": {"journal_mode": "WAL", "synchronous": "FULL"},
+    "read_heavy": {"journal_mode": "WAL", "mmap_size": 1 << 30, "cache_size": -65536},
+}
+
+# Connection-level PRAGMAs that can be set per handle or per connection
+CONNECTION_PRAGMAS = ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+
+
+def print_transaction_error(error):
+    """
+    Report a failed transaction on stdout (the default ZooDatabase on_error).
 
+    Args:
+        error (Exception): Exception raised inside the transaction
+    """
+    print(f"Transaction error: {error}")
 
-# Database name
-DB_NAME = "zoo.db"
 
+class ZooDatabase:
+    """
+    Handle on one zoo database owning its connection pool, caches and statistics.
 
-def get_connection():
+    The CRUD classes are exposed as attributes bound to this database,
+    e.g. db.Animals.create("Leo", species_id).
+    """
+
+    def __init__(self, path=None, profile="default", pool_size=5, archive_path=None, pragmas=None,
+                 notes_threshold=None, on_error=None):
+        """
+        Open a handle on a database.
+
+        Args:
+            path (str, optional): Database file or "file:" URI, defaults to DB_NAME
+            profile (str): Name of the connection profile in PROFILES
+            pool_size (int): Maximum number of idle connections kept for reuse
+            archive_path (str, optional): Cold archive database attached to every
+                connection as schema "archive"
+            pragmas (dict, optional): Settings overriding the profile, e.g.
+                {"mmap_size": 268435456, "cache_size": -32768}
+            notes_threshold (int, optional): Store Feeding and AnimalCare notes of at least
+                this many bytes compressed, defaults to NOTES_THRESHOLD
+            on_error (callable, optional): Called with the exception of every failed
+                transaction before it is raised, defaults to print_transaction_error
+        """
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile: {profile}")
+        self.path = path if path is not None else DB_NAME
+        self.profile = profile
+        self.pragmas = _check_pragmas({**PROFILES[profile], **(pragmas or {})})
+        self.pool_size = pool_size
+        self.archive_path = archive_path
+        self.notes_threshold = notes_threshold if notes_threshold is not None else NOTES_THRESHOLD
+        self.on_error = on_error or print_transaction_error
+        self._idle = []
+        self._lock = threading.Lock()
+        self._cache = {}
+        self._generations = {}
+        self._stats = {}
+        self._anchor = None
+
+        # An in-memory database disappears with its last connection
+        if "mode=memory" in self.path:
+            self._anchor = self.connect()
+
+        for repository in REPOSITORIES:
+            setattr(self, repository.__name__, _Repository(self, repository))
+
+    def __repr__(self):
+        return f"ZooDatabase({self.path!r}, profile={self.profile!r})"
+
+    def connect(self, **pragmas):
+        """
+        Open a new connection configured with the profile settings.
+
+        Args:
+            **pragmas: Settings overriding those of the handle for this connection
+
+        Returns:
+            sqlite3.Connection: A connection to the database
+        """
+        conn = sqlite3.connect(self.path, uri=self.path.startswith("file:"), check_same_thread=False)
+        for pragma, value in {**self.pragmas, **_check_pragmas(pragmas)}.items():
+            conn.execute(f"PRAGMA {pragma} = {value}")
+        compression.register(conn)
+        if self.archive_path is not None:
+            attach_archive(conn, self.archive_path)
+        return conn
+
+    def acquire(self):
+        """
+        Take a connection from the pool, opening one if none is idle.
+
+        Returns:
+            sqlite3.Connection: A connection to the database
+        """
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return self.connect()
+
+    def release(self, conn):
+        """
+        Return a connection to the pool, closing it if the pool is full.
+
+        Args:
+            conn (sqlite3.Connection): Connection obtained from acquire()
+        """
+        with self._lock:
+            if len(self._idle) < self.pool_size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    def close(self):
+        """
+        Close every pooled connection; an in-memory database is discarded.
+        """
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+        if self._anchor is not None:
+            self._anchor.close()
+            self._anchor = None
+
+    def run(self, func, *args, **kwargs):
+        """
+        Run a function in a transaction on a pooled connection.
+        Commits if successful, rolls back on error.
+
+        Args:
+            func: Function called as func(connection, *args, **kwargs)
+
+        Returns:
+            The return value of func
+        """
+        conn = self.acquire()
+        changes = conn.total_changes
+        start = time.perf_counter()
+        failed = False
+        try:
+            result = func(conn, *args, **kwargs)
+            # Commit if everything went well
+            conn.commit()
+            if conn.total_changes != changes:
+                self.invalidate(func.__qualname__.split(".")[0])
+            return result
+        except Exception as e:
+            # Roll back on error
+            failed = True
+            conn.rollback()
+            self.on_error(e)
+            raise
+        finally:
+            self._record(func.__qualname__, time.perf_counter() - start, failed)
+            self.release(conn)
+
+    def stream(self, query, params=(), batch_size=500, name="stream"):
+        """
+        Run a read query and yield its rows in batches from a pooled connection.
+
+        The connection is returned to the pool when the generator is exhausted or closed.
+
+        Args:
+            query (str): SELECT statement
+            params (sequence): Statement parameters
+            batch_size (int): Number of rows fetched from SQLite at a time
+            name (str): Name under which the call is recorded in statistics()
+
+        Yields:
+            tuple: Result rows
+        """
+        conn = self.acquire()
+        start = time.perf_counter()
+        failed = False
+        try:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(name, time.perf_counter() - start, failed)
+            self.release(conn)
+
+    def scalar(self, query, params=(), name="scalar"):
+        """
+        Run a read query returning a single value on a pooled connection.
+
+        Args:
+            query (str): SELECT statement producing one row with one column
+            params (sequence): Statement parameters
+            name (str): Name under which the call is recorded in statistics()
+
+        Returns:
+            The value of the first column of the first row, or None if there is no row
+        """
+        conn = self.acquire()
+        start = time.perf_counter()
+        failed = False
+        try:
+            row = conn.execute(query, params).fetchone()
+            return row[0] if row else None
+        except Exception:
+            failed = True
+            raise
+        finally:
+            self._record(name, time.perf_counter() - start, failed)
+            self.release(conn)
+
+    def _record(self, name, seconds, failed):
+        with self._lock:
+            entry = self._stats.setdefault(name, {"calls": 0, "errors": 0, "seconds": 0.0})
+            entry["calls"] += 1
+            entry["errors"] += failed
+            entry["seconds"] += seconds
+
+    def statistics(self):
+        """
+        Get call statistics for every function run on this database.
+
+        Returns:
+            dict: Function name -> {"calls", "errors", "seconds"}
+        """
+        with self._lock:
+            return {name: dict(entry) for name, entry in self._stats.items()}
+
+    def cached(self, key, tables, compute):
+        """
+        Return a cached value, recomputing it after writes to the tables it depends on.
+
+        Only writes made through this handle invalidate the cache.
+
+        Args:
+            key: Cache key
+            tables (tuple): Names of the tables the value is computed from
+            compute: Function without arguments computing the value
+
+        Returns:
+            The cached or freshly computed value
+        """
+        with self._lock:
+            stamp = tuple(self._generations.get(table, 0) for table in tables)
+            entry = self._cache.get(key)
+        if entry is not None and entry[0] == stamp:
+            return entry[1]
+        value = compute()
+        with self._lock:
+            self._cache[key] = (stamp, value)
+        return value
+
+    def invalidate(self, *tables):
+        """
+        Mark cached values computed from the given tables as stale.
+
+        Args:
+            *tables (str): Names of the modified tables
+        """
+        with self._lock:
+            for table in tables:
+                self._generations[table] = self._generations.get(table, 0) + 1
+
+    def initialize(self):
+        """
+        Create or migrate the schema of this database.
+
+        Returns:
+            bool: True if initialization was successful
+        """
+        return initialize_database(self.path)
+
+    def snapshot(self):
+        """
+        Copy the database into a private in-memory snapshot.
+
+        Returns:
+            sqlite3.Connection: Connection holding the snapshot, to be passed to restore()
+        """
+        source = self.acquire()
+        try:
+            copy = sqlite3.connect(":memory:")
+            source.backup(copy)
+            return copy
+        finally:
+            self.release(source)
+
+    def restore(self, saved):
+        """
+        Replace the content of the database with a snapshot.
+
+        Args:
+            saved (sqlite3.Connection): Snapshot returned by snapshot()
+        """
+        target = self.acquire()
+        try:
+            saved.backup(target)
+        finally:
+            self.release(target)
+        with self._lock:
+            self._cache.clear()
+
+
+class _Repository:
+    """CRUD class bound to a ZooDatabase; every call runs against that database"""
+
+    def __init__(self, database, cls):
+        self._database = database
+        self._cls = cls
+
+    def __repr__(self):
+        return f"<{self._cls.__name__} of {self._database!r}>"
+
+    def __getattr__(self, name):
+        attribute = getattr(self._cls, name)
+        if not callable(attribute):
+            return attribute
+
+        @functools.wraps(attribute)
+        def bound(*args, **kwargs):
+            token = _active_database.set(self._database)
+            try:
+                return attribute(*args, **kwargs)
+            finally:
+                _active_database.reset(token)
+
+        return bound
+
+
+# Database bound by a _Repository call in progress, if any
+_active_database = contextvars.ContextVar("zoo_database", default=None)
+
+# Default database behind the static CRUD classes, and the database name
+# that was in use before use_memory_database()
+_default_database = None
+_default_lock = threading.Lock()
+_file_db_name = None
+
+
+def get_database():
+    """
+    Get the default database handle used by the static CRUD classes.
+
+    The handle is replaced when DB_NAME is changed.
+
+    Returns:
+        ZooDatabase: Handle on DB_NAME
+    """
+    global _default_database
+    with _default_lock:
+        if _default_database is None or _default_database.path != DB_NAME:
+            if _default_database is not None:
+                _default_database.close()
+            _default_database = ZooDatabase(DB_NAME)
+        return _default_database
+
+
+def current_database():
+    """
+    Get the database the current CRUD call runs against.
+
+    Returns:
+        ZooDatabase: The bound database inside a ZooDatabase call, the default one otherwise
+    """
+    database = _active_database.get()
+    return database if database is not None else get_database()
+
+
+def _require_archive(conn):
+    """
+    Check that the archive database is attached to a connection.
+
+    Args:
+        conn (sqlite3.Connection): Database connection
+
+    Raises:
+        ValueError: If the database was opened without archive_path
+    """
+    if not any(row[1] == "archive" for row in conn.execute("PRAGMA database_list")):
+        raise ValueError("No archive database attached; open the ZooDatabase with archive_path")
+
+
+def _check_pragmas(pragmas):
+    """
+    Validate connection settings before they are formatted into PRAGMA statements.
+
+    Args:
+        pragmas (dict): PRAGMA name -> value
+
+    Returns:
+        dict: The same settings
+    """
+    for pragma, value in pragmas.items():
+        if pragma not in CONNECTION_PRAGMAS:
+            raise ValueError(f"Unsupported connection setting: {pragma}")
+        if not isinstance(value, int) and not str(value).isalpha():
+            raise ValueError(f"Invalid value for {pragma}: {value!r}")
+    return pragmas
+
+
+def get_connection(**pragmas):
     """
     Get a connection to the SQLite database.
 
+    Args:
+        **pragmas: Connection settings such as mmap_size or cache_size
+
     Returns:
         sqlite3.Connection: A connection to the database
     """
-    return sqlite3.connect(DB_NAME)
+    return current_database().connect(**pragmas)
+
+
+def use_memory_database(name="zoo"):
+    """
+    Point the CRUD classes at a shared in-memory database with the full schema.
+
+    The database lives until close_memory_database() is called.
+
+    Args:
+        name (str): Name of the in-memory database
+
+    Returns:
+        str: URI of the in-memory database
+    """
+    global DB_NAME, _file_db_name
+    close_memory_database()
+    _file_db_name = DB_NAME
+    DB_NAME = MEMORY_DB_URI.format(name)
+    get_database().initialize()
+    return DB_NAME
+
+
+def close_memory_database():
+    """
+    Discard the shared in-memory database and point the CRUD classes back at
+    the database used before use_memory_database().
+    """
+    global DB_NAME
+    if _file_db_name is not None and "mode=memory" in DB_NAME:
+        get_database().close()
+        DB_NAME = _file_db_name
+
+
+def snapshot():
+    """
+    Copy the current database into a private in-memory snapshot.
+
+    Returns:
+        sqlite3.Connection: Connection holding the snapshot, to be passed to restore()
+    """
+    return current_database().snapshot()
+
+
+def restore(saved):
+    """
+    Replace the content of the current database with a snapshot.
+
+    Args:
+        saved (sqlite3.Connection): Snapshot returned by snapshot()
+    """
+    current_database().restore(saved)
 
 
 def transaction(func):
@@ -27,6 +525,10 @@ def transaction(func):
     Decorator to handle database transactions.
     Commits if successful, rolls back on error.
 
+    The wrapped function receives a pooled connection of the current database
+    as its first argument. While profiling is enabled (see profiling.py), a
+    sample of the calls is profiled and attributed to the method's qualname.
+
     Args:
         func: The function to wrap with transaction handling
 
@@ -34,36 +536,482 @@ def transaction(func):
         wrapper: The wrapped function with transaction support
     """
 
+    @functools.wraps(func)
     def wrapper(*args, **kwargs):
-        connection = None
-        try:
-            # Get connection and pass it to the function
-            connection = get_connection()
-            # Replace the first arg (self) with connection if the function has args
-            if args and hasattr(args[0], '__call__'):
-                result = func(connection, *args[1:], **kwargs)
-            else:
-                result = func(connection, *args, **kwargs)
-            # Commit if everything went well
-            connection.commit()
-            return result
-        except Exception as e:
-            # Roll back on error
-            if connection:
-                connection.rollback()
-            print(f"Transaction error: {e}")
-            raise
-        finally:
-            # Always close the connection
-            if connection:
-                connection.close()
+        # Drop a leading callable (the class) if the function was called with one
+        if args and hasattr(args[0], '__call__'):
+            args = args[1:]
+        profiler = profiling.current
+        if profiler is not None and profiler.should_sample():
+            return profiler.call(func.__qualname__, current_database().run, func, *args, **kwargs)
+        return current_database().run(func, *args, **kwargs)
 
     return wrapper
 
 
-class Species:
+# Operators accepted as "column__operator" filter suffixes and their SQL form
+FILTER_OPERATORS = {
+    "eq": "=",
+    "ne": "<>",
+    "lt": "<",
+    "lte": "<=",
+    "gt": ">",
+    "gte": ">=",
+    "like": "LIKE",
+    "in": "IN",
+    "not_in": "NOT IN",
+    "between": "BETWEEN",
+    "isnull": "IS NULL",
+}
+
+
+# Operators that compare a date column through its day-number column
+RANGE_OPERATORS = ("lt", "lte", "gt", "gte", "between")
+
+# Larger read_many() requests join a json_each() table instead of binding an IN list
+READ_MANY_IN_LIMIT = 500
+
+
+def day_number(value):
+    """
+    Convert a date to the integer Julian day number stored in the *_day columns.
+
+    Args:
+        value (str, datetime.date or int): ISO date or timestamp, date object or day number
+
+    Returns:
+        int: Julian day number
+    """
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str):
+        value = datetime.date.fromisoformat(value[:10])
+    if isinstance(value, datetime.datetime):
+        value = value.date()
+    return value.toordinal() + 1721425
+
+
+class ConflictError(Exception):
+    """Raised when an update expects another version of the record than the stored one"""
+
+    def __init__(self, table, record_id, expected_version, actual_version):
+        super().__init__(
+            f"{table} record {record_id} is at version {actual_version}, not {expected_version}"
+        )
+        self.table = table
+        self.record_id = record_id
+        self.expected_version = expected_version
+        self.actual_version = actual_version
+
+
+def _check_version(cursor, table, key, record_id, expected_version):
+    """
+    Explain an optimistic update that changed no row.
+
+    Args:
+        cursor (sqlite3.Cursor): Cursor of the update's transaction
+        table (str): Updated table
+        key (str): Primary key column
+        record_id (int): Updated record ID
+        expected_version (int or None): Version the update expected
+
+    Raises:
+        ConflictError: If the record exists with another version
+    """
+    if expected_version is None:
+        return
+    cursor.execute(f"SELECT version FROM {table} WHERE {key} = ?", (record_id,))
+    current = cursor.fetchone()
+    if current is not None:
+        raise ConflictError(table, record_id, expected_version, current[0])
+
+
+class _TableQueries:
+    """
+    Filtered queries shared by the CRUD classes.
+
+    Subclasses describe their read projection with _from (table and alias),
+    _columns (name, SQL expression, join alias or None; the primary key
+    first) and _joins (join alias -> JOIN clause). Lookup tables set
+    _cache_counts so their counts are served from the database cache.
+    _day_columns maps date columns to their indexed integer day-number
+    column, which range filters on those dates use instead of the text.
+    _dimensions maps joined name columns to (foreign key column, table,
+    key, SQL expression), so reads can resolve them from a cached
+    dictionary instead of joining.
+    """
+    _from = None
+    _columns = ()
+    _joins = {}
+    _cache_counts = False
+    _day_columns = {}
+    _dimensions = {}
+
+    @classmethod
+    def _column(cls, name):
+        for column, expression, join in cls._columns:
+            if column == name:
+                return expression, join
+        raise ValueError(f"Unknown column for {cls.__name__}: {name}")
+
+    @classmethod
+    def _where(cls, filters):
+        """
+        Translate keyword filters into a parameterized WHERE clause.
+
+        Args:
+            filters (dict): "column" or "column__operator" -> value
+
+        Returns:
+            tuple: (WHERE clause or "", parameters, join aliases required by the filters)
+        """
+        clauses = []
+        params = []
+        joins = set()
+        for key, value in filters.items():
+            name, _, operator = key.partition("__")
+            operator = operator or "eq"
+            if operator not in FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator: {operator}")
+            expression, join = cls._column(name)
+            if join:
+                joins.add(join)
+            if operator in RANGE_OPERATORS and name in cls._day_columns and value is not None:
+                expression = cls._day_columns[name]
+                value = tuple(map(day_number, value)) if operator == "between" else day_number(value)
+
+            if operator == "isnull":
+                clauses.append(f"{expression} {'IS NULL' if value else 'IS NOT NULL'}")
+            elif value is None and operator in ("eq", "ne"):
+                clauses.append(f"{expression} {'IS NULL' if operator == 'eq' else 'IS NOT NULL'}")
+            elif operator in ("in", "not_in"):
+                values = list(value)
+                if not values:
+                    # An empty IN list matches nothing, an empty NOT IN list everything
+                    clauses.append("0" if operator == "in" else "1")
+                    continue
+                clauses.append(f"{expression} {FILTER_OPERATORS[operator]} ({', '.join('?' for _ in values)})")
+                params.extend(values)
+            elif operator == "between":
+                low, high = value
+                clauses.append(f"{expression} BETWEEN ? AND ?")
+                params.extend((low, high))
+            else:
+                clauses.append(f"{expression} {FILTER_OPERATORS[operator]} ?")
+                params.append(value)
+
+        where = f" WHERE {' AND '.join(clauses)}" if clauses else ""
+        return where, params, joins
+
+    @classmethod
+    def _order_by(cls, order_by):
+        if order_by is None:
+            return "", set()
+        if isinstance(order_by, str):
+            order_by = [order_by]
+        terms = []
+        joins = set()
+        for name in order_by:
+            descending = name.startswith("-")
+            expression, join = cls._column(name.lstrip("-"))
+            if join:
+                joins.add(join)
+            terms.append(f"{expression} DESC" if descending else expression)
+        return f" ORDER BY {', '.join(terms)}", joins
+
+    @classmethod
+    def _select(cls, where_joins=(), columns=None):
+        """
+        Build the SELECT ... FROM ... JOIN part of the read projection.
+
+        Only the joins needed by the selected columns and by where_joins are added.
+
+        Args:
+            where_joins (iterable): Additional join aliases needed outside the projection
+            columns (list, optional): Names of the selected columns, defaults to every column
+
+        Returns:
+            str: SQL without WHERE clause
+        """
+        if columns is None:
+            columns = [name for name, _, _ in cls._columns]
+        expressions = []
+        needed = set(where_joins)
+        for name in columns:
+            expression, join = cls._column(name)
+            expressions.append(expression)
+            if join:
+                needed.add(join)
+        return f"SELECT {', '.join(expressions)} FROM {cls._from}{cls._join_clauses(needed)}"
+
+    @classmethod
+    def _projection(cls, columns=None, include=(), extra=()):
+        """
+        Plan which columns a read selects in SQL and which it returns.
+
+        Args:
+            columns (iterable, optional): Returned column names, defaults to every column
+            include (iterable): Joined name columns resolved from the dimension cache
+                instead of a join; added to the returned columns if missing
+            extra (iterable): Columns selected for internal use only
+
+        Returns:
+            tuple: (selected column names, returned column names)
+        """
+        include = list(include)
+        for name in include:
+            if name not in cls._dimensions:
+                raise ValueError(f"Column of {cls.__name__} cannot be resolved from a dimension cache: {name}")
+        output = [name for name, _, _ in cls._columns] if columns is None else list(columns)
+        output += [name for name in include if name not in output]
+        selected = [name for name in output if name not in include]
+        for name in [cls._dimensions[name][0] for name in include] + list(extra):
+            if name not in selected:
+                selected.append(name)
+        return selected, output
+
+    @classmethod
+    def _dimension(cls, database, name):
+        """
+        Get the cached key -> value dictionary resolving a joined name column.
+
+        Args:
+            database (ZooDatabase): Database the dictionary is read from
+            name (str): Column name in _dimensions
+
+        Returns:
+            dict: Foreign key value -> name
+        """
+        _, table, key, expression = cls._dimensions[name]
+
+        def compute():
+            return dict(database.stream(f"SELECT {key}, {expression} FROM {table}", name=f"{table}.dimension"))
+
+        return database.cached(("dimension", table, expression), (table,), compute)
+
+    @classmethod
+    def _shape(cls, database, rows, selected, output):
+        """
+        Turn selected rows into returned rows, resolving included columns from the dimension cache.
+
+        Args:
+            database (ZooDatabase): Database of the dimension caches
+            rows (iterable): Rows of the selected columns
+            selected (list): Selected column names
+            output (list): Returned column names
+
+        Returns:
+            iterable: Returned rows
+        """
+        if selected == output:
+            return rows
+        positions = {name: i for i, name in enumerate(selected)}
+        getters = []
+        for name in output:
+            if name in positions:
+                getters.append((positions[name], None))
+            else:
+                getters.append((positions[cls._dimensions[name][0]], cls._dimension(database, name)))
+        return (
+            tuple(row[position] if names is None else names.get(row[position]) for position, names in getters)
+            for row in rows
+        )
+
+    @classmethod
+    def _join_clauses(cls, needed):
+        return "".join(f" {clause}" for alias, clause in cls._joins.items() if alias in needed)
+
+    @classmethod
+    def find(cls, order_by=None, limit=None, batch_size=500, columns=None, include=(), **filters):
+        """
+        Find records matching filters, streaming them from the database.
+
+        Filters are keyword arguments "column=value" or "column__operator=value"
+        with operator one of eq, ne, lt, lte, gt, gte, like, in, not_in,
+        between (a (low, high) pair) and isnull (a bool). They are combined
+        with AND and run as parameterized SQL, so indexed columns are searched
+        through their index.
+
+        Args:
+            order_by (str or list, optional): Column name(s), prefixed with "-" for descending order
+            limit (int, optional): Maximum number of records
+            batch_size (int): Number of rows fetched from SQLite at a time
+            columns (list, optional): Names of the returned columns; only the joins
+                they need are performed
+            include (list): Joined name columns (e.g. "species_name") resolved from an
+                in-memory dimension cache instead of a SQL join
+            **filters: Column filters
+
+        Returns:
+            generator: Records in the same layout as read_all(), or with the requested columns
+        """
+        selected, output = cls._projection(columns, include)
+        where, params, joins = cls._where(filters)
+        order, order_joins = cls._order_by(order_by)
+        query = cls._select(joins | order_joins, selected) + where + order
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        database = current_database()
+        rows = database.stream(query, params, batch_size, f"{cls.__name__}.find")
+        return cls._shape(database, rows, selected, output)
+
+    @classmethod
+    def count(cls, **filters):
+        """
+        Count the records matching filters without reading them.
+
+        Args:
+            **filters: Column filters as accepted by find()
+
+        Returns:
+            int: Number of matching records
+        """
+        where, params, joins = cls._where(filters)
+        query = f"SELECT COUNT(*) FROM {cls._from}{cls._join_clauses(joins)}{where}"
+        database = current_database()
+
+        def compute():
+            return database.scalar(query, params, f"{cls.__name__}.count")
+
+        if cls._cache_counts:
+            key = (cls.__name__, "count", repr(sorted(filters.items())))
+            return database.cached(key, (cls.__name__,), compute)
+        return compute()
+
+    @classmethod
+    def read_many(cls, record_ids, columns=None, include=()):
+        """
+        Read several records by ID with a single query.
+
+        Up to READ_MANY_IN_LIMIT distinct IDs are bound as an IN list; larger
+        requests pass the IDs as one JSON array joined through json_each(),
+        so the statement never exceeds SQLite's parameter limit.
+
+        Args:
+            record_ids (iterable): Primary keys of the records
+            columns (list, optional): Names of the returned columns, as in find()
+            include (list): Joined name columns resolved from the dimension cache, as in find()
+
+        Returns:
+            tuple: (records in the order of record_ids and in the same layout as read()
+                    or with the requested columns, list of the requested IDs that do not exist)
+        """
+        record_ids = list(record_ids)
+        unique_ids = list(dict.fromkeys(record_ids))
+        key_name, key, _ = cls._columns[0]
+        selected, output = cls._projection(columns, include, extra=(key_name,))
+        if len(unique_ids) <= READ_MANY_IN_LIMIT:
+            where, params, _ = cls._where({f"{key_name}__in": unique_ids})
+            query = cls._select((), selected) + where
+        else:
+            query = f"{cls._select((), selected)} JOIN json_each(?) ids ON {key} = ids.value"
+            params = [json.dumps(unique_ids)]
+
+        database = current_database()
+        found = list(database.stream(query, params, name=f"{cls.__name__}.read_many"))
+        position = selected.index(key_name)
+        rows = dict(zip((row[position] for row in found), cls._shape(database, found, selected, output)))
+        records = [rows[record_id] for record_id in record_ids if record_id in rows]
+        missing = [record_id for record_id in unique_ids if record_id not in rows]
+        return records, missing
+
+    @classmethod
+    def exists(cls, record_id):
+        """
+        Check whether a record exists.
+
+        Args:
+            record_id (int): Primary key of the record
+
+        Returns:
+            bool: True if the record exists, False otherwise
+        """
+        table, alias = cls._from.split()
+        key = cls._columns[0][1]
+        query = f"SELECT EXISTS (SELECT 1 FROM {table} {alias} WHERE {key} = ?)"
+        return bool(current_database().scalar(query, (record_id,), f"{cls.__name__}.exists"))
+
+    @classmethod
+    def aggregate(cls, function, column, **filters):
+        """
+        Compute an aggregate of a column over the records matching filters.
+
+        Args:
+            function (str): One of SUM, MIN, MAX, AVG or COUNT
+            column (str): Column name
+            **filters: Column filters as accepted by find()
+
+        Returns:
+            The aggregate value, or None when no record matches (0 for SUM and COUNT)
+        """
+        function = function.upper()
+        if function not in ("SUM", "MIN", "MAX", "AVG", "COUNT"):
+            raise ValueError(f"Unknown aggregate function: {function}")
+        expression, join = cls._column(column)
+        where, params, joins = cls._where(filters)
+        if join:
+            joins.add(join)
+        # TOTAL() is SUM() returning 0.0 instead of NULL for no rows
+        sql_function = "TOTAL" if function == "SUM" else function
+        query = f"SELECT {sql_function}({expression}) FROM {cls._from}{cls._join_clauses(joins)}{where}"
+        return current_database().scalar(query, params, f"{cls.__name__}.{function.lower()}")
+
+    @classmethod
+    def sum(cls, column, **filters):
+        """
+        Sum a column over the records matching filters.
+
+        Args:
+            column (str): Column name
+            **filters: Column filters as accepted by find()
+
+        Returns:
+            float: Sum of the column, 0.0 when no record matches
+        """
+        return cls.aggregate("SUM", column, **filters)
+
+    @classmethod
+    def min(cls, column, **filters):
+        """
+        Get the smallest value of a column over the records matching filters.
+
+        Args:
+            column (str): Column name
+            **filters: Column filters as accepted by find()
+
+        Returns:
+            Smallest value, or None when no record matches
+        """
+        return cls.aggregate("MIN", column, **filters)
+
+    @classmethod
+    def max(cls, column, **filters):
+        """
+        Get the largest value of a column over the records matching filters.
+
+        Args:
+            column (str): Column name
+            **filters: Column filters as accepted by find()
+
+        Returns:
+            Largest value, or None when no record matches
+        """
+        return cls.aggregate("MAX", column, **filters)
+
+
+class Species(_TableQueries):
     """Class for managing species records in the database"""
 
+    _from = "Species sp"
+    _columns = (
+        ("speciesID", "sp.speciesID", None),
+        ("name", "sp.name", None),
+        ("habitat", "sp.habitat", None),
+        ("diet", "sp.diet", None),
+    )
+    _cache_counts = True
+
     @staticmethod
     @transaction
     def create(conn, name, habitat, diet):
@@ -163,9 +1111,23 @@ class Species:
         return cursor.rowcount > 0
 
 
-class Animals:
+class Animals(_TableQueries):
     """Class for managing animal records in the database"""
 
+    _from = "Animals a"
+    _columns = (
+        ("animalID", "a.animalID", None),
+        ("name", "a.name", None),
+        ("speciesID", "a.speciesID", None),
+        ("gender", "a.gender", None),
+        ("birthdate", "a.birthdate", None),
+        ("health_status", "a.health_status", None),
+        ("species_name", "s.name", "s"),
+        ("version", "a.version", None),
+    )
+    _joins = {"s": "JOIN Species s ON a.speciesID = s.speciesID"}
+    _dimensions = {"species_name": ("speciesID", "Species", "speciesID", "name")}
+
     @staticmethod
     @transaction
     def create(conn, name, species_id, gender=None, birthdate=None, health_status="Good"):
@@ -206,7 +1168,8 @@ class Animals:
         """
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT a.animalID, a.name, a.speciesID, a.gender, a.birthdate, a.health_status, s.name as species_name
+            """SELECT a.animalID, a.name, a.speciesID, a.gender, a.birthdate, a.health_status, s.name as species_name,
+                      a.version
                FROM Animals a
                JOIN Species s ON a.speciesID = s.speciesID
                WHERE a.animalID = ?""",
@@ -228,7 +1191,8 @@ class Animals:
         """
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT a.animalID, a.name, a.speciesID, a.gender, a.birthdate, a.health_status, s.name as species_name
+            """SELECT a.animalID, a.name, a.speciesID, a.gender, a.birthdate, a.health_status, s.name as species_name,
+                      a.version
                FROM Animals a
                JOIN Species s ON a.speciesID = s.speciesID"""
         )
@@ -236,7 +1200,8 @@ class Animals:
 
     @staticmethod
     @transaction
-    def update(conn, animal_id, name, species_id, gender=None, birthdate=None, health_status=None):
+    def update(conn, animal_id, name, species_id, gender=None, birthdate=None, health_status=None,
+               expected_version=None):
         """
         Update an animal record.
 
@@ -248,9 +1213,13 @@ class Animals:
             gender (str, optional): Updated gender
             birthdate (str, optional): Updated birthdate
             health_status (str, optional): Updated health status
+            expected_version (int, optional): Only update the record if it is still at this version
 
         Returns:
             bool: True if update was successful, False otherwise
+
+        Raises:
+            ConflictError: If the record was changed since expected_version was read
         """
         cursor = conn.cursor()
 
@@ -270,34 +1239,149 @@ class Animals:
                     health_status = current[2]
 
         cursor.execute(
-            """UPDATE Animals 
-               SET name = ?, speciesID = ?, gender = ?, birthdate = ?, health_status = ? 
-               WHERE animalID = ?""",
-            (name, species_id, gender, birthdate, health_status, animal_id)
+            """UPDATE Animals 
+               SET name = ?, speciesID = ?, gender = ?, birthdate = ?, health_status = ?, version = version + 1 
+               WHERE animalID = ? AND (? IS NULL OR version = ?)""",
+            (name, species_id, gender, birthdate, health_status, animal_id, expected_version, expected_version)
+        )
+        updated = cursor.rowcount > 0
+        if not updated:
+            _check_version(cursor, "Animals", "animalID", animal_id, expected_version)
+        return updated
+
+    @staticmethod
+    @transaction
+    def delete(conn, animal_id):
+        """
+        Delete an animal record.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            animal_id (int): Animal ID to delete
+
+        Returns:
+            bool: True if deletion was successful, False otherwise
+        """
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM Animals WHERE animalID = ?", (animal_id,))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    @transaction
+    def status(conn, animal_id):
+        """
+        Read the dashboard status of one animal.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            animal_id (int): Animal ID to retrieve
+
+        Returns:
+            tuple: (animalID, name, speciesID, species_name, health_status,
+                   last_feeding_date, last_care_date, last_care_type) or None if not found
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT animalID, name, speciesID, species_name, health_status,
+                      last_feeding_date, last_care_date, last_care_type
+               FROM AnimalStatus WHERE animalID = ?""",
+            (animal_id,)
+        )
+        return cursor.fetchone()
+
+    @staticmethod
+    @transaction
+    def status_board(conn):
+        """
+        Read the dashboard status of every animal from the materialized AnimalStatus table.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+
+        Returns:
+            list: Status records as returned by status(), ordered by animal ID
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT animalID, name, speciesID, species_name, health_status,
+                      last_feeding_date, last_care_date, last_care_type
+               FROM AnimalStatus ORDER BY animalID"""
+        )
+        return cursor.fetchall()
+
+    @staticmethod
+    @transaction
+    def rebuild_status_board(conn):
+        """
+        Recompute the materialized AnimalStatus table from Animals, Feeding and AnimalCare.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+
+        Returns:
+            int: Number of animals in the rebuilt table
+        """
+        return rebuild_animal_status(conn.cursor())
+
+    @staticmethod
+    @transaction
+    def needing_attention(conn):
+        """
+        Read the animals whose health status is not normal, from the partial index idx_animals_attention.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+
+        Returns:
+            list: (animalID, name, speciesID, species_name, health_status, last_care_date) tuples,
+                  animals never cared for first, then the longest without care
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            f"""SELECT a.animalID, a.name, a.speciesID,
+                       (SELECT s.name FROM Species s WHERE s.speciesID = a.speciesID),
+                       a.health_status,
+                       (SELECT MAX(c.care_date) FROM AnimalCare c WHERE c.animalID = a.animalID) AS last_care_date
+                FROM Animals a
+                WHERE a.{ATTENTION_CONDITION}
+                ORDER BY last_care_date IS NOT NULL, last_care_date, a.animalID"""
         )
-        return cursor.rowcount > 0
+        return cursor.fetchall()
 
     @staticmethod
     @transaction
-    def delete(conn, animal_id):
+    def attention_signature(conn):
         """
-        Delete an animal record.
+        Get a cheap fingerprint of the needing_attention() result.
+
+        Only the AttentionVersion counter is read. Triggers bump it on every
+        write that can change the result (see create_attention_triggers), so
+        a dashboard can poll it and only refetch needing_attention() when it
+        changed.
 
         Args:
             conn (sqlite3.Connection): Database connection
-            animal_id (int): Animal ID to delete
 
         Returns:
-            bool: True if deletion was successful, False otherwise
+            tuple: Opaque signature, compared with ==
         """
         cursor = conn.cursor()
-        cursor.execute("DELETE FROM Animals WHERE animalID = ?", (animal_id,))
-        return cursor.rowcount > 0
+        cursor.execute("SELECT version FROM AttentionVersion WHERE id = 1")
+        return cursor.fetchone()
 
 
-class FoodTypes:
+class FoodTypes(_TableQueries):
     """Class for managing food type records in the database"""
 
+    _from = "FoodTypes ft"
+    _columns = (
+        ("foodTypeID", "ft.foodTypeID", None),
+        ("name", "ft.name", None),
+        ("unit", "ft.unit", None),
+        ("storage_requirements", "ft.storage_requirements", None),
+    )
+    _cache_counts = True
+
     @staticmethod
     @transaction
     def create(conn, name, unit, storage_requirements=None):
@@ -397,9 +1481,23 @@ class FoodTypes:
         return cursor.rowcount > 0
 
 
-class FoodInventory:
+class FoodInventory(_TableQueries):
     """Class for managing food inventory records in the database"""
 
+    _from = "FoodInventory i"
+    _columns = (
+        ("inventoryID", "i.inventoryID", None),
+        ("foodTypeID", "i.foodTypeID", None),
+        ("food_type", "ft.name", "ft"),
+        ("quantity", "i.quantity", None),
+        ("expiration_date", "i.expiration_date", None),
+        ("last_updated", "i.last_updated", None),
+        ("version", "i.version", None),
+    )
+    _joins = {"ft": "JOIN FoodTypes ft ON i.foodTypeID = ft.foodTypeID"}
+    _day_columns = {"expiration_date": "i.expiration_day"}
+    _dimensions = {"food_type": ("foodTypeID", "FoodTypes", "foodTypeID", "name")}
+
     @staticmethod
     @transaction
     def create(conn, food_type_id, quantity, expiration_date=None):
@@ -439,7 +1537,8 @@ class FoodInventory:
         """
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT i.inventoryID, i.foodTypeID, ft.name, i.quantity, i.expiration_date, i.last_updated
+            """SELECT i.inventoryID, i.foodTypeID, ft.name, i.quantity, i.expiration_date, i.last_updated,
+                      i.version
                FROM FoodInventory i
                JOIN FoodTypes ft ON i.foodTypeID = ft.foodTypeID
                WHERE i.inventoryID = ?""",
@@ -461,7 +1560,8 @@ class FoodInventory:
         """
         cursor = conn.cursor()
         cursor.execute(
-            """SELECT i.inventoryID, i.foodTypeID, ft.name, i.quantity, i.expiration_date, i.last_updated
+            """SELECT i.inventoryID, i.foodTypeID, ft.name, i.quantity, i.expiration_date, i.last_updated,
+                      i.version
                FROM FoodInventory i
                JOIN FoodTypes ft ON i.foodTypeID = ft.foodTypeID"""
         )
@@ -469,7 +1569,7 @@ class FoodInventory:
 
     @staticmethod
     @transaction
-    def update_stock(conn, inventory_id, quantity, expiration_date=None):
+    def update_stock(conn, inventory_id, quantity, expiration_date=None, expected_version=None):
         """
         Update a food inventory record.
 
@@ -478,9 +1578,13 @@ class FoodInventory:
             inventory_id (int): Inventory ID to update
             quantity (float): Updated quantity
             expiration_date (str, optional): Updated expiration date
+            expected_version (int, optional): Only update the record if it is still at this version
 
         Returns:
             bool: True if update was successful, False otherwise
+
+        Raises:
+            ConflictError: If the record was changed since expected_version was read
         """
         cursor = conn.cursor()
         last_updated = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
@@ -497,11 +1601,14 @@ class FoodInventory:
 
         cursor.execute(
             """UPDATE FoodInventory 
-               SET quantity = ?, expiration_date = ?, last_updated = ? 
-               WHERE inventoryID = ?""",
-            (quantity, expiration_date, last_updated, inventory_id)
+               SET quantity = ?, expiration_date = ?, last_updated = ?, version = version + 1 
+               WHERE inventoryID = ? AND (? IS NULL OR version = ?)""",
+            (quantity, expiration_date, last_updated, inventory_id, expected_version, expected_version)
         )
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+        if not updated:
+            _check_version(cursor, "FoodInventory", "inventoryID", inventory_id, expected_version)
+        return updated
 
     @staticmethod
     @transaction
@@ -521,9 +1628,18 @@ class FoodInventory:
         return cursor.rowcount > 0
 
 
-class Roles:
+class Roles(_TableQueries):
     """Class for managing role records in the database"""
 
+    _from = "Roles r"
+    _columns = (
+        ("roleID", "r.roleID", None),
+        ("title", "r.title", None),
+        ("department", "r.department", None),
+        ("description", "r.description", None),
+    )
+    _cache_counts = True
+
     @staticmethod
     @transaction
     def create(conn, title, department, description=None):
@@ -623,9 +1739,25 @@ class Roles:
         return cursor.rowcount > 0
 
 
-class Staff:
+class Staff(_TableQueries):
     """Class for managing staff records in the database"""
 
+    _from = "Staff s"
+    _columns = (
+        ("staffID", "s.staffID", None),
+        ("firstName", "s.firstName", None),
+        ("lastName", "s.lastName", None),
+        ("roleID", "s.roleID", None),
+        ("role_title", "r.title", "r"),
+        ("country", "s.country", None),
+        ("hire_date", "s.hire_date", None),
+        ("salary", "s.salary", None),
+        ("version", "s.version", None),
+    )
+    _joins = {"r": "JOIN Roles r ON s.roleID = r.roleID"}
+    _day_columns = {"hire_date": "s.hire_day"}
+    _dimensions = {"role_title": ("roleID", "Roles", "roleID", "title")}
+
     @staticmethod
     @transaction
     def create(conn, first_name, last_name, role_id, country, salary, hire_date=None):
@@ -673,7 +1805,7 @@ class Staff:
         cursor = conn.cursor()
         cursor.execute(
             """SELECT s.staffID, s.firstName, s.lastName, s.roleID, r.title as role_title, 
-                      s.country, s.hire_date, s.salary
+                      s.country, s.hire_date, s.salary, s.version
                FROM Staff s
                JOIN Roles r ON s.roleID = r.roleID
                WHERE s.staffID = ?""",
@@ -696,7 +1828,7 @@ class Staff:
         cursor = conn.cursor()
         cursor.execute(
             """SELECT s.staffID, s.firstName, s.lastName, s.roleID, r.title as role_title, 
-                      s.country, s.hire_date, s.salary
+                      s.country, s.hire_date, s.salary, s.version
                FROM Staff s
                JOIN Roles r ON s.roleID = r.roleID"""
         )
@@ -704,7 +1836,8 @@ class Staff:
 
     @staticmethod
     @transaction
-    def update(conn, staff_id, first_name, last_name, role_id, country, salary, hire_date=None):
+    def update(conn, staff_id, first_name, last_name, role_id, country, salary, hire_date=None,
+               expected_version=None):
         """
         Update a staff record.
 
@@ -717,9 +1850,13 @@ class Staff:
             country (str): Updated country
             salary (float): Updated salary
             hire_date (str, optional): Updated hire date
+            expected_version (int, optional): Only update the record if it is still at this version
 
         Returns:
             bool: True if update was successful, False otherwise
+
+        Raises:
+            ConflictError: If the record was changed since expected_version was read
         """
         cursor = conn.cursor()
 
@@ -735,11 +1872,15 @@ class Staff:
 
         cursor.execute(
             """UPDATE Staff 
-               SET firstName = ?, lastName = ?, roleID = ?, country = ?, hire_date = ?, salary = ? 
-               WHERE staffID = ?""",
-            (first_name, last_name, role_id, country, hire_date, salary, staff_id)
+               SET firstName = ?, lastName = ?, roleID = ?, country = ?, hire_date = ?, salary = ?, 
+                   version = version + 1 
+               WHERE staffID = ? AND (? IS NULL OR version = ?)""",
+            (first_name, last_name, role_id, country, hire_date, salary, staff_id, expected_version, expected_version)
         )
-        return cursor.rowcount > 0
+        updated = cursor.rowcount > 0
+        if not updated:
+            _check_version(cursor, "Staff", "staffID", staff_id, expected_version)
+        return updated
 
     @staticmethod
     @transaction
@@ -758,10 +1899,144 @@ class Staff:
         cursor.execute("DELETE FROM Staff WHERE staffID = ?", (staff_id,))
         return cursor.rowcount > 0
 
+    @staticmethod
+    @transaction
+    def workload(conn, start, end, granularity="day", staff_ids=None, include_archive=False):
+        """
+        Count feedings and care events per staff member and period.
+
+        Each staff member is resolved with a range seek on the (staffID, day number)
+        indexes of Feeding and AnimalCare, so only rows inside the range are read.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            start (str): First day of the range in ISO format (YYYY-MM-DD)
+            end (str): Last day of the range in ISO format (YYYY-MM-DD), inclusive
+            granularity (str): 'day', 'week' (periods start on Monday) or 'month'
+            staff_ids (list, optional): Restrict the result to these staff members
+            include_archive (bool): Also count rows moved to the attached archive database
+
+        Returns:
+            list: Tuples (staffID, period_start, feedings, care_events) ordered by staff and period
+        """
+        if granularity not in WORKLOAD_PERIODS:
+            raise ValueError(f"Unknown granularity: {granularity}")
+        cursor = conn.cursor()
+
+        staff_filter = ""
+        params = []
+        if staff_ids is not None:
+            staff_filter = f"WHERE s.staffID IN ({', '.join('?' for _ in staff_ids)})"
+            params.extend(staff_ids)
+
+        # CROSS JOIN keeps Staff as the outer loop so each event table is probed per staff member
+        event_tables = [
+            ("main.Feeding", "f", "feeding_day", "COUNT(*) AS feedings, 0 AS care_events"),
+            ("main.AnimalCare", "c", "care_day", "0, COUNT(*)"),
+        ]
+        if include_archive:
+            _require_archive(conn)
+            event_tables += [
+                ("archive.Feeding", "f", "feeding_day", "COUNT(*), 0"),
+                ("archive.AnimalCare", "c", "care_day", "0, COUNT(*)"),
+            ]
+        parts = []
+        for table, alias, day_column, counts in event_tables:
+            # date() of a day number is the calendar date of that day
+            period = WORKLOAD_PERIODS[granularity].format(f"{alias}.{day_column}")
+            parts.append(
+                f"""SELECT s.staffID, {period} AS period, {counts}
+                    FROM Staff s CROSS JOIN {table} {alias}
+                    ON {alias}.staffID = s.staffID
+                       AND {alias}.{day_column} BETWEEN ? AND ?
+                    {staff_filter}
+                    GROUP BY s.staffID, period"""
+            )
+        cursor.execute(
+            f"""SELECT staffID, period, SUM(feedings), SUM(care_events)
+                FROM ({' UNION ALL '.join(parts)})
+                GROUP BY staffID, period
+                ORDER BY staffID, period""",
+            ([day_number(start), day_number(end)] + params) * len(event_tables)
+        )
+        return cursor.fetchall()
+
+    @classmethod
+    def payroll(cls, group_by=("department",), as_of=None):
+        """
+        Summarize salaries, headcount and tenure per group of staff members.
+
+        The rollup is computed in one query (the median with window functions)
+        and cached until Staff or Roles is modified.
+
+        Args:
+            group_by (tuple): Any of 'department', 'role' and 'country'; empty for a company total
+            as_of (str, optional): Day tenure is measured at (YYYY-MM-DD), defaults to today
+
+        Returns:
+            list: Tuples (*group values, headcount, total_salary, average_salary,
+                  median_salary, average_tenure_years) ordered by group
+        """
+        group_by = tuple(group_by)
+        for group in group_by:
+            if group not in PAYROLL_GROUPS:
+                raise ValueError(f"Unknown payroll group: {group}")
+        as_of = as_of or datetime.date.today().isoformat()
+
+        groups = ", ".join(f"{PAYROLL_GROUPS[group]} AS {group}" for group in group_by)
+        # The window is computed before the SELECT aliases exist, so it partitions by the expressions
+        partition = f"PARTITION BY {', '.join(PAYROLL_GROUPS[group] for group in group_by)} " if group_by else ""
+        grouping = f"GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}" if group_by else ""
+        query = f"""
+            WITH ranked AS (
+                SELECT {groups + ', ' if groups else ''}s.salary, s.hire_day,
+                       ROW_NUMBER() OVER ({partition}ORDER BY s.salary) AS position,
+                       COUNT(*) OVER ({partition.strip()}) AS headcount
+                FROM Staff s JOIN Roles r ON s.roleID = r.roleID
+            )
+            SELECT {', '.join(group_by) + ', ' if group_by else ''}
+                   COUNT(*), TOTAL(salary), AVG(salary),
+                   AVG(CASE WHEN position IN ((headcount + 1) / 2, (headcount + 2) / 2) THEN salary END),
+                   AVG(? - hire_day) / 365.25
+            FROM ranked
+            {grouping}"""
+        database = current_database()
+
+        def compute():
+            rows = database.stream(query, (day_number(as_of),), name="Staff.payroll")
+            return [row for row in rows if row[len(group_by)]]
+
+        return database.cached(("Staff", "payroll", group_by, as_of), ("Staff", "Roles"), compute)
+
 
-class Feeding:
+class Feeding(_TableQueries):
     """Class for managing feeding records in the database"""
 
+    _from = "Feeding f"
+    _columns = (
+        ("feedingID", "f.feedingID", None),
+        ("animalID", "f.animalID", None),
+        ("animal_name", "a.name", "a"),
+        ("foodTypeID", "f.foodTypeID", None),
+        ("food_type", "ft.name", "ft"),
+        ("staffID", "f.staffID", None),
+        ("staff_name", "s.firstName || ' ' || s.lastName", "s"),
+        ("quantity", "f.quantity", None),
+        ("notes", "notes_text(f.notes)", None),
+        ("feeding_date", "f.feeding_date", None),
+    )
+    _joins = {
+        "a": "JOIN Animals a ON f.animalID = a.animalID",
+        "ft": "JOIN FoodTypes ft ON f.foodTypeID = ft.foodTypeID",
+        "s": "JOIN Staff s ON f.staffID = s.staffID",
+    }
+    _day_columns = {"feeding_date": "f.feeding_day"}
+    _dimensions = {
+        "animal_name": ("animalID", "Animals", "animalID", "name"),
+        "food_type": ("foodTypeID", "FoodTypes", "foodTypeID", "name"),
+        "staff_name": ("staffID", "Staff", "staffID", "firstName || ' ' || lastName"),
+    }
+
     @staticmethod
     @transaction
     def create(conn, animal_id, food_type_id, staff_id, quantity, notes=None, feeding_date=None):
@@ -789,7 +2064,8 @@ class Feeding:
         cursor.execute(
             """INSERT INTO Feeding (animalID, foodTypeID, staffID, quantity, notes, feeding_date) 
                VALUES (?, ?, ?, ?, ?, ?)""",
-            (animal_id, food_type_id, staff_id, quantity, notes, feeding_date)
+            (animal_id, food_type_id, staff_id, quantity,
+             compression.compress_notes(notes, current_database().notes_threshold), feeding_date)
         )
         return cursor.lastrowid
 
@@ -811,7 +2087,7 @@ class Feeding:
             """SELECT f.feedingID, f.animalID, a.name as animal_name, 
                       f.foodTypeID, ft.name as food_type, 
                       f.staffID, s.firstName || ' ' || s.lastName as staff_name, 
-                      f.quantity, f.notes, f.feeding_date
+                      f.quantity, notes_text(f.notes), f.feeding_date
                FROM Feeding f
                JOIN Animals a ON f.animalID = a.animalID
                JOIN FoodTypes ft ON f.foodTypeID = ft.foodTypeID
@@ -838,7 +2114,7 @@ class Feeding:
             """SELECT f.feedingID, f.animalID, a.name as animal_name, 
                       f.foodTypeID, ft.name as food_type, 
                       f.staffID, s.firstName || ' ' || s.lastName as staff_name, 
-                      f.quantity, f.notes, f.feeding_date
+                      f.quantity, notes_text(f.notes), f.feeding_date
                FROM Feeding f
                JOIN Animals a ON f.animalID = a.animalID
                JOIN FoodTypes ft ON f.foodTypeID = ft.foodTypeID
@@ -882,7 +2158,8 @@ class Feeding:
                SET animalID = ?, foodTypeID = ?, staffID = ?, quantity = ?, 
                    notes = ?, feeding_date = ? 
                WHERE feedingID = ?""",
-            (animal_id, food_type_id, staff_id, quantity, notes, feeding_date, feeding_id)
+            (animal_id, food_type_id, staff_id, quantity,
+             compression.compress_notes(notes, current_database().notes_threshold), feeding_date, feeding_id)
         )
         return cursor.rowcount > 0
 
@@ -901,4 +2178,365 @@ class Feeding:
         """
         cursor = conn.cursor()
         cursor.execute("DELETE FROM Feeding WHERE feedingID = ?", (feeding_id,))
-        return cursor.rowcount > 0
\ No newline at end of file
+        return cursor.rowcount > 0
+
+    @staticmethod
+    @transaction
+    def history(conn, animal_id, start=None, end=None, include_archive=False):
+        """
+        Read the feedings of one animal in date order.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            animal_id (int): Animal ID
+            start (str, optional): First day to include in ISO format (YYYY-MM-DD)
+            end (str, optional): Last day to include in ISO format (YYYY-MM-DD)
+            include_archive (bool): Also read rows moved to the attached archive database
+
+        Returns:
+            list: Tuples (feedingID, foodTypeID, staffID, quantity, notes, feeding_date) ordered by date
+        """
+        schemas = ["main"]
+        if include_archive:
+            _require_archive(conn)
+            schemas.append("archive")
+        query = " UNION ALL ".join(
+            f"""SELECT feedingID, foodTypeID, staffID, quantity, notes_text(notes), feeding_date
+                FROM {schema}.Feeding
+                WHERE animalID = ? AND feeding_date >= ? AND feeding_date < date(?, '+1 day')"""
+            for schema in schemas
+        )
+        cursor = conn.cursor()
+        cursor.execute(
+            query + " ORDER BY feeding_date, feedingID",
+            [animal_id, start or "0000-01-01", end or "9999-12-30"] * len(schemas)
+        )
+        return cursor.fetchall()
+
+
+class AnimalCare(_TableQueries):
+    """Class for managing animal care records (medical care, training, etc.) in the database"""
+
+    _from = "AnimalCare c"
+    _columns = (
+        ("careID", "c.careID", None),
+        ("animalID", "c.animalID", None),
+        ("animal_name", "a.name", "a"),
+        ("staffID", "c.staffID", None),
+        ("staff_name", "s.firstName || ' ' || s.lastName", "s"),
+        ("care_date", "c.care_date", None),
+        ("care_type", "c.care_type", None),
+        ("notes", "notes_text(c.notes)", None),
+    )
+    _joins = {
+        "a": "JOIN Animals a ON c.animalID = a.animalID",
+        "s": "JOIN Staff s ON c.staffID = s.staffID",
+    }
+    _day_columns = {"care_date": "c.care_day"}
+    _dimensions = {
+        "animal_name": ("animalID", "Animals", "animalID", "name"),
+        "staff_name": ("staffID", "Staff", "staffID", "firstName || ' ' || lastName"),
+    }
+
+    @staticmethod
+    @transaction
+    def create(conn, animal_id, staff_id, care_type, notes=None, care_date=None):
+        """
+        Create a new animal care record.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            animal_id (int): Animal ID receiving care (foreign key to Animals table)
+            staff_id (int): Staff member ID who provided the care (foreign key to Staff table)
+            care_type (str): Type of care (e.g., Checkup, Vaccination, Training)
+            notes (str, optional): Additional notes about the care
+            care_date (str, optional): Date of care in ISO format (YYYY-MM-DD)
+
+        Returns:
+            int: ID of the newly created care record
+        """
+        cursor = conn.cursor()
+
+        # Use current date if care_date not provided
+        if care_date is None:
+            care_date = datetime.datetime.now().strftime("%Y-%m-%d")
+
+        cursor.execute(
+            """INSERT INTO AnimalCare (animalID, staffID, care_date, care_type, notes)
+               VALUES (?, ?, ?, ?, ?)""",
+            (animal_id, staff_id, care_date, care_type,
+             compression.compress_notes(notes, current_database().notes_threshold))
+        )
+        return cursor.lastrowid
+
+    @staticmethod
+    @transaction
+    def read(conn, care_id):
+        """
+        Read an animal care record by ID.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            care_id (int): Care record ID to retrieve
+
+        Returns:
+            tuple: Care record or None if not found
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT c.careID, c.animalID, a.name as animal_name,
+                      c.staffID, s.firstName || ' ' || s.lastName as staff_name,
+                      c.care_date, c.care_type, notes_text(c.notes)
+               FROM AnimalCare c
+               JOIN Animals a ON c.animalID = a.animalID
+               JOIN Staff s ON c.staffID = s.staffID
+               WHERE c.careID = ?""",
+            (care_id,)
+        )
+        return cursor.fetchone()
+
+    @staticmethod
+    @transaction
+    def read_all(conn):
+        """
+        Read all animal care records.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+
+        Returns:
+            list: List of all care records
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT c.careID, c.animalID, a.name as animal_name,
+                      c.staffID, s.firstName || ' ' || s.lastName as staff_name,
+                      c.care_date, c.care_type, notes_text(c.notes)
+               FROM AnimalCare c
+               JOIN Animals a ON c.animalID = a.animalID
+               JOIN Staff s ON c.staffID = s.staffID"""
+        )
+        return cursor.fetchall()
+
+    @staticmethod
+    @transaction
+    def update(conn, care_id, animal_id, staff_id, care_type, notes=None, care_date=None):
+        """
+        Update an animal care record.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            care_id (int): Care record ID to update
+            animal_id (int): Updated animal ID
+            staff_id (int): Updated staff ID
+            care_type (str): Updated type of care
+            notes (str, optional): Updated notes
+            care_date (str, optional): Updated care date
+
+        Returns:
+            bool: True if update was successful, False otherwise
+        """
+        cursor = conn.cursor()
+
+        # Get current care_date if not provided
+        if care_date is None:
+            cursor.execute(
+                "SELECT care_date FROM AnimalCare WHERE careID = ?",
+                (care_id,)
+            )
+            current = cursor.fetchone()
+            if current:
+                care_date = current[0]
+
+        cursor.execute(
+            """UPDATE AnimalCare
+               SET animalID = ?, staffID = ?, care_date = ?, care_type = ?, notes = ?
+               WHERE careID = ?""",
+            (animal_id, staff_id, care_date, care_type,
+             compression.compress_notes(notes, current_database().notes_threshold), care_id)
+        )
+        return cursor.rowcount > 0
+
+    @staticmethod
+    @transaction
+    def delete(conn, care_id):
+        """
+        Delete an animal care record.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            care_id (int): Care record ID to delete
+
+        Returns:
+            bool: True if deletion was successful, False otherwise
+        """
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM AnimalCare WHERE careID = ?", (care_id,))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    @transaction
+    def history(conn, animal_id, start=None, end=None, include_archive=False):
+        """
+        Read the care events of one animal in date order.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            animal_id (int): Animal ID
+            start (str, optional): First day to include in ISO format (YYYY-MM-DD)
+            end (str, optional): Last day to include in ISO format (YYYY-MM-DD)
+            include_archive (bool): Also read rows moved to the attached archive database
+
+        Returns:
+            list: Tuples (careID, staffID, care_type, notes, care_date) ordered by date
+        """
+        schemas = ["main"]
+        if include_archive:
+            _require_archive(conn)
+            schemas.append("archive")
+        query = " UNION ALL ".join(
+            f"""SELECT careID, staffID, care_type, notes_text(notes), care_date
+                FROM {schema}.AnimalCare
+                WHERE animalID = ? AND care_date >= ? AND care_date < date(?, '+1 day')"""
+            for schema in schemas
+        )
+        cursor = conn.cursor()
+        cursor.execute(
+            query + " ORDER BY care_date, careID",
+            [animal_id, start or "0000-01-01", end or "9999-12-30"] * len(schemas)
+        )
+        return cursor.fetchall()
+
+
+class ChangeLog:
+    """Class for consuming the change log filled by the change-data-capture triggers"""
+
+    @staticmethod
+    @transaction
+    def latest_seq(conn):
+        """
+        Get the sequence number of the most recent change.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+
+        Returns:
+            int: Latest sequence number, or 0 if nothing was logged yet
+        """
+        cursor = conn.cursor()
+        cursor.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog")
+        return cursor.fetchone()[0]
+
+    @staticmethod
+    @transaction
+    def changes_since(conn, seq=0, limit=1000, tables=None):
+        """
+        Read a batch of changes recorded after a sequence number.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            seq (int): Only changes with a greater sequence number are returned
+            limit (int): Maximum number of changes in the batch
+            tables (list, optional): Restrict the batch to these table names
+
+        Returns:
+            list: Change records (seq, table_name, row_id, operation, changed_at) in sequence order;
+                  operation is "I", "U", "D" or "A" for a row moved to the archive
+        """
+        cursor = conn.cursor()
+        query = "SELECT seq, table_name, row_id, operation, changed_at FROM ChangeLog WHERE seq > ?"
+        params = [seq]
+        if tables:
+            query += f" AND table_name IN ({', '.join('?' for _ in tables)})"
+            params.extend(tables)
+        query += " ORDER BY seq LIMIT ?"
+        params.append(limit)
+        cursor.execute(query, params)
+        return cursor.fetchall()
+
+    @staticmethod
+    @transaction
+    def consume(conn, consumer, limit=1000):
+        """
+        Read the next batch of changes a consumer has not acknowledged yet.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            consumer (str): Consumer name
+            limit (int): Maximum number of changes in the batch
+
+        Returns:
+            list: Change records (seq, table_name, row_id, operation, changed_at) in sequence order
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            """SELECT seq, table_name, row_id, operation, changed_at
+               FROM ChangeLog
+               WHERE seq > COALESCE((SELECT last_seq FROM ChangeLogConsumers WHERE consumer = ?), 0)
+               ORDER BY seq LIMIT ?""",
+            (consumer, limit)
+        )
+        return cursor.fetchall()
+
+    @staticmethod
+    @transaction
+    def acknowledge(conn, consumer, seq):
+        """
+        Record that a consumer has processed every change up to a sequence number.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            consumer (str): Consumer name
+            seq (int): Last sequence number processed by the consumer
+
+        Returns:
+            bool: True if the acknowledgement was stored
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            """INSERT INTO ChangeLogConsumers (consumer, last_seq) VALUES (?, ?)
+               ON CONFLICT(consumer) DO UPDATE SET last_seq = MAX(last_seq, excluded.last_seq)""",
+            (consumer, seq)
+        )
+        return cursor.rowcount > 0
+
+    @staticmethod
+    @transaction
+    def unregister(conn, consumer):
+        """
+        Remove a consumer so it no longer holds back pruning.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+            consumer (str): Consumer name
+
+        Returns:
+            bool: True if the consumer existed, False otherwise
+        """
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM ChangeLogConsumers WHERE consumer = ?", (consumer,))
+        return cursor.rowcount > 0
+
+    @staticmethod
+    @transaction
+    def prune(conn):
+        """
+        Delete changes every registered consumer has acknowledged.
+
+        Nothing is pruned while no consumer is registered.
+
+        Args:
+            conn (sqlite3.Connection): Database connection
+
+        Returns:
+            int: Number of deleted change records
+        """
+        cursor = conn.cursor()
+        cursor.execute(
+            "DELETE FROM ChangeLog WHERE seq <= (SELECT MIN(last_seq) FROM ChangeLogConsumers)"
+        )
+        return cursor.rowcount
+
+
+# CRUD classes exposed as attributes of every ZooDatabase
+REPOSITORIES = (Species, Animals, FoodTypes, FoodInventory, Roles, Staff, Feeding, AnimalCare, ChangeLog)
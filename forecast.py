@@ -0,0 +1,233 @@
+"""
+Stock-out forecasting for the food inventory.
+
+Daily consumption per food type over a rolling window is kept in a NumPy
+matrix (food types x days). The matrix is built once from Feeding and then
+updated incrementally from the change log: new feedings are added to their
+day, and only updates or deletes of feedings (or a new day) trigger a full
+reload. Stock lots are re-read when FoodInventory changes.
+"""
+import datetime
+import uuid
+
+import numpy as np
+
+import crud
+
+
+def _days_until_stockout(lots, rate, today):
+    """
+    Walk the lots of a food type in use order.
+
+    Args:
+        lots (list): (expiration day or None, quantity) in order of expiration
+        rate (float): Daily consumption
+        today (int): Current day number
+
+    Returns:
+        tuple: (days until nothing is left, inf if never; True if the last lot ran out by expiring)
+    """
+    day = 0.0
+    limited = False
+    for expiration, quantity in lots:
+        end = day + quantity / rate if rate > 0 else float("inf")
+        limited = expiration is not None and end > expiration - today
+        # A lot expiring before it is reached is skipped
+        day = max(day, expiration - today) if limited else end
+    return day, limited
+
+
+class StockForecaster:
+    """Cached days-until-stockout forecast per food type"""
+
+    def __init__(self, database=None, window=28, short_window=7, consumer=None):
+        """
+        Configure a forecaster.
+
+        Args:
+            database (crud.ZooDatabase, optional): Database to use, defaults to the default database
+            window (int): Days of feeding history used for the long-term consumption rate
+            short_window (int): Days used for the recent consumption rate
+            consumer (str, optional): Change log consumer name of this forecaster, unique
+                per instance by default; instances must never share one, as each
+                acknowledges the changes it consumed
+        """
+        if not 0 < short_window <= window:
+            raise ValueError("short_window must be between 1 and window")
+        self.database = database or crud.get_database()
+        self.window = window
+        self.short_window = short_window
+        self.consumer = consumer or f"stock_forecast-{uuid.uuid4().hex}"
+        self.food_type_ids = np.zeros(0, dtype=np.int64)
+        self.daily = np.zeros((0, window))
+        self.stock = {}
+        self._last_day = None
+        self._forecast = None
+
+    def _row(self, food_type_id):
+        """Index of a food type in the consumption matrix, adding a row if needed."""
+        position = np.searchsorted(self.food_type_ids, food_type_id)
+        if position == len(self.food_type_ids) or self.food_type_ids[position] != food_type_id:
+            self.food_type_ids = np.insert(self.food_type_ids, position, food_type_id)
+            self.daily = np.insert(self.daily, position, 0.0, axis=0)
+        return position
+
+    def _add_feedings(self, rows):
+        """Add (foodTypeID, feeding_day, quantity) rows falling inside the window."""
+        first_day = self._last_day - self.window + 1
+        rows = [row for row in rows if row[1] is not None and first_day <= row[1] <= self._last_day]
+        if not rows:
+            return
+        food_type_ids, days, quantities = (np.array(column) for column in zip(*rows))
+        for food_type_id in np.unique(food_type_ids):
+            self._row(food_type_id)
+        np.add.at(
+            self.daily,
+            (np.searchsorted(self.food_type_ids, food_type_ids), days - first_day),
+            quantities.astype(np.float64)
+        )
+
+    def _load_stock(self, conn, today):
+        """Read the non-expired lots per food type, as (expiration day or None, quantity) in use order."""
+        self.stock = {}
+        for food_type_id, expiration_day, quantity in conn.execute(
+            """SELECT foodTypeID, expiration_day, quantity
+               FROM FoodInventory
+               WHERE expiration_day IS NULL OR expiration_day >= ?
+               ORDER BY foodTypeID, expiration_day IS NULL, expiration_day""",
+            (today,)
+        ):
+            self.stock.setdefault(food_type_id, []).append((expiration_day, quantity))
+
+    def _full_reload(self, today):
+        conn = self.database.acquire()
+        try:
+            # One read transaction, so the change log position matches the loaded data
+            conn.execute("BEGIN")
+            seq = conn.execute("SELECT COALESCE(MAX(seq), 0) FROM ChangeLog").fetchone()[0]
+            rows = conn.execute(
+                """SELECT foodTypeID, feeding_day, SUM(quantity) FROM Feeding
+                   WHERE feeding_day BETWEEN ? AND ? GROUP BY foodTypeID, feeding_day""",
+                (today - self.window + 1, today)
+            ).fetchall()
+            self._load_stock(conn, today)
+            conn.commit()
+        finally:
+            self.database.release(conn)
+
+        self._last_day = today
+        self.food_type_ids = np.zeros(0, dtype=np.int64)
+        self.daily = np.zeros((0, self.window))
+        self._add_feedings(rows)
+        self.database.ChangeLog.acknowledge(self.consumer, seq)
+
+    def refresh(self, today=None):
+        """
+        Bring the consumption matrix and stock levels up to date.
+
+        Args:
+            today (str, optional): Current day (YYYY-MM-DD), defaults to today
+
+        Returns:
+            str: "full", "incremental" or "unchanged"
+        """
+        today = crud.day_number(today or datetime.date.today())
+        if self._last_day != today:
+            self._full_reload(today)
+            self._forecast = None
+            return "full"
+
+        changes = []
+        while True:
+            batch = self.database.ChangeLog.consume(self.consumer)
+            if not batch:
+                break
+            changes.extend(batch)
+            self.database.ChangeLog.acknowledge(self.consumer, batch[-1][0])
+        if not changes:
+            return "unchanged"
+
+        self._forecast = None
+        feedings = [change for change in changes if change[1] == "Feeding"]
+        if any(change[3] != "I" for change in feedings):
+            # The previous quantity of an updated or deleted feeding is unknown
+            self._full_reload(today)
+            return "full"
+
+        conn = self.database.acquire()
+        try:
+            inserted = [change[2] for change in feedings]
+            for start in range(0, len(inserted), 500):
+                chunk = inserted[start:start + 500]
+                self._add_feedings(conn.execute(
+                    f"""SELECT foodTypeID, feeding_day, quantity FROM Feeding
+                        WHERE feedingID IN ({', '.join('?' for _ in chunk)})""",
+                    chunk
+                ).fetchall())
+            if any(change[1] == "FoodInventory" for change in changes):
+                self._load_stock(conn, today)
+        finally:
+            self.database.release(conn)
+        return "incremental"
+
+    def forecast(self, today=None):
+        """
+        Forecast the number of days until each food type runs out.
+
+        The consumption rate is the larger of the long-window and the
+        short-window daily average, so a recent rise in consumption is
+        not hidden by a quiet month. Lots are used in order of expiration,
+        and what is left of a lot when it expires is lost, so the food runs
+        out early when expiring stock cannot be eaten in time.
+
+        Args:
+            today (str, optional): Current day (YYYY-MM-DD), defaults to today
+
+        Returns:
+            list: Tuples (foodTypeID, stock, daily_rate, days_until_stockout, limited_by)
+                  ordered by days until stockout; limited_by is "consumption" or
+                  "expiration". Stock that is not consumed still runs out when its
+                  last lot expires; days_until_stockout is None only when the stock
+                  never runs out (nothing is consumed and some lot never expires)
+        """
+        self.refresh(today)
+        if self._forecast is not None:
+            return self._forecast
+
+        food_type_ids = np.union1d(self.food_type_ids, np.array(sorted(self.stock), dtype=np.int64))
+        daily = np.zeros((len(food_type_ids), self.window))
+        daily[np.searchsorted(food_type_ids, self.food_type_ids)] = self.daily
+
+        # Rolling sums of the last `window` and `short_window` days from one cumulative sum
+        cumulative = daily.cumsum(axis=1)
+        long_rate = cumulative[:, -1] / self.window
+        short_rate = (cumulative[:, -1] - cumulative[:, -self.short_window - 1]
+                      if self.short_window < self.window else cumulative[:, -1]) / self.short_window
+        rates = np.maximum(long_rate, short_rate)
+
+        result = []
+        for food_type_id, rate in zip(food_type_ids.tolist(), rates.tolist()):
+            lots = self.stock.get(food_type_id, [])
+            days, limited = _days_until_stockout(lots, rate, self._last_day)
+            result.append((food_type_id, float(sum(quantity for _, quantity in lots)), rate,
+                           None if np.isinf(days) else float(days), "expiration" if limited else "consumption"))
+        result.sort(key=lambda row: (row[3] is None, row[3]))
+        self._forecast = result
+        return result
+
+    def close(self):
+        """
+        Unregister the change log consumer so it no longer holds back pruning.
+        """
+        self.database.ChangeLog.unregister(self.consumer)
+
+
+if __name__ == "__main__":
+    forecaster = StockForecaster()
+    try:
+        for food_type_id, stock, rate, days, limited_by in forecaster.forecast():
+            outlook = "not consumed" if days is None else f"{days:.1f} days ({limited_by})"
+            print(f"food type {food_type_id}: {stock:.1f} in stock, {rate:.2f}/day, {outlook}")
+    finally:
+        # A registered consumer would hold back ChangeLog.prune() for good
+        forecaster.close()
@@ -30,6 +30,7 @@ def help():
        - gender: Animal gender
        - birthdate: Date of birth
        - health_status: Health condition
+       - version: Row version, incremented by every update
 
     3. FoodTypes:
        - foodTypeID: Unique identifier for food type
@@ -43,6 +44,7 @@ def help():
        - quantity: Amount
        - expiration_date: Expiration date
        - last_updated: Last update date
+       - version: Row version, incremented by every update
 
     5. Roles:
        - roleID: Unique identifier for role
@@ -58,6 +60,7 @@ def help():
        - country: Country of origin
        - hire_date: Hire date
        - salary: Salary
+       - version: Row version, incremented by every update
 
     7. Feeding:
        - feedingID: Unique identifier for feeding record
@@ -90,8 +93,14 @@ def help():
        - create(name, species_id, gender=None, birthdate=None, health_status="Good") -> Creates a new animal record
        - read(animal_id) -> Returns information about a specific animal
        - read_all() -> Returns a list of all animals
-       - update(animal_id, name, species_id, gender=None, birthdate=None, health_status=None) -> Updates animal information
+       - update(animal_id, name, species_id, gender=None, birthdate=None, health_status=None, expected_version=None) -> Updates animal information
        - delete(animal_id) -> Removes an animal record
+       - status(animal_id) -> Returns species, health status, last feeding and last care event of an animal
+       - status_board() -> Returns the status of every animal from the materialized AnimalStatus table
+       - rebuild_status_board() -> Recomputes the AnimalStatus table from the source tables
+       - needing_attention() -> Animals whose health status is not Good/Healthy with species and last care date,
+         read from a partial index of those animals only
+       - attention_signature() -> Cheap fingerprint of needing_attention(); poll it and refetch only when it changes
 
     3. FoodTypes:
        - create(name, unit, storage_requirements=None) -> Creates a new food type record
@@ -104,7 +113,7 @@ def help():
        - create(food_type_id, quantity, expiration_date=None) -> Creates a new food inventory record
        - read(inventory_id) -> Returns information about a specific inventory
        - read_all() -> Returns a list of all inventory records
-       - update_stock(inventory_id, quantity, expiration_date=None) -> Updates inventory information
+       - update_stock(inventory_id, quantity, expiration_date=None, expected_version=None) -> Updates inventory information
        - delete(inventory_id) -> Removes an inventory record
 
     5. Roles:
@@ -118,8 +127,11 @@ def help():
        - create(first_name, last_name, role_id, country, salary, hire_date=None) -> Creates a new staff record
        - read(staff_id) -> Returns information about a specific staff member
        - read_all() -> Returns a list of all staff members
-       - update(staff_id, first_name, last_name, role_id, country, salary, hire_date=None) -> Updates staff information
+       - update(staff_id, first_name, last_name, role_id, country, salary, hire_date=None, expected_version=None) -> Updates staff information
        - delete(staff_id) -> Removes a staff record
+       - workload(start, end, granularity="day", staff_ids=None) -> Counts feedings and care events per staff member and day/week/month
+       - payroll(group_by=("department",), as_of=None) -> Headcount, total/average/median salary and average
+         tenure in years per department, role and/or country (cached until Staff or Roles change)
 
     7. Feeding:
        - create(animal_id, food_type_id, staff_id, quantity, notes=None, feeding_date=None) -> Creates a new feeding record
@@ -127,6 +139,171 @@ def help():
        - read_all() -> Returns a list of all feedings
        - update(feeding_id, animal_id, food_type_id, staff_id, quantity, notes=None, feeding_date=None) -> Updates feeding information
        - delete(feeding_id) -> Removes a feeding record
+       - history(animal_id, start=None, end=None, include_archive=False) -> Returns the feedings of an animal in date order
+
+    8. AnimalCare:
+       - create(animal_id, staff_id, care_type, notes=None, care_date=None) -> Creates a new care record
+       - read(care_id) -> Returns information about a specific care record
+       - read_all() -> Returns a list of all care records
+       - update(care_id, animal_id, staff_id, care_type, notes=None, care_date=None) -> Updates care information
+       - delete(care_id) -> Removes a care record
+       - history(animal_id, start=None, end=None, include_archive=False) -> Returns the care events of an animal in date order
+
+    FILTERED QUERIES (every class except ChangeLog):
+       - find(order_by=None, limit=None, **filters) -> Streams records matching the filters
+         Filters are column=value or column__operator=value with operator one of
+         eq, ne, lt, lte, gt, gte, like, in, not_in, between, isnull, e.g.
+         Feeding.find(staffID=3, feeding_date__gte="2025-01-01", order_by="-feeding_date", limit=50)
+       - find(columns=[...]) / read_many(ids, columns=[...]) -> Only the listed columns, joining only
+         the tables they need, e.g. Feeding.find(columns=["feedingID", "quantity"]) joins nothing
+       - include=[...] -> Resolve joined name columns (species_name, role_title, food_type, animal_name,
+         staff_name) from a cached in-memory dictionary instead of a SQL join
+
+    OPTIMISTIC CONCURRENCY (Animals, Staff, FoodInventory):
+       - Records end with a version column, incremented by every update
+       - update(..., expected_version=v) / update_stock(..., expected_version=v) -> Only writes if the record is
+         still at version v, otherwise raises crud.ConflictError (HTTP 409 from service.py) without waiting
+         for locks held during user think-time; re-read and retry instead of holding a long transaction
+
+    COUNTS AND AGGREGATES (every class except ChangeLog):
+       - count(**filters) -> Number of matching records (cached for Species, FoodTypes and Roles)
+       - exists(record_id) -> True if the record exists
+       - read_many(record_ids) -> (records in request order, missing IDs) read with a single query
+       - sum(column, **filters), min(column, **filters), max(column, **filters) -> Aggregate of a column
+       - aggregate(function, column, **filters) -> SUM, MIN, MAX, AVG or COUNT of a column
+
+    9. ChangeLog (inserts, updates and deletes on Animals, Feeding, FoodInventory, Staff and AnimalCare):
+       - latest_seq() -> Returns the sequence number of the most recent change
+       - changes_since(seq=0, limit=1000, tables=None) -> Returns a batch of changes after a sequence number
+       - consume(consumer, limit=1000) -> Returns the next batch of changes not acknowledged by a consumer
+       - acknowledge(consumer, seq) -> Marks changes up to seq as processed by a consumer
+       - unregister(consumer) -> Removes a consumer
+       - prune() -> Deletes changes acknowledged by every consumer
+
+    DATABASE HANDLES:
+    ----------------
+
+    The classes above act on the default database (crud.DB_NAME, or the DB_NAME
+    environment variable). Any other database is opened as a ZooDatabase handle
+    owning its own connection pool, caches and statistics:
+
+       db = ZooDatabase("other.db", profile="fast")   # profiles: default, fast, safe, read_heavy
+       db = ZooDatabase("big.db", pragmas={"mmap_size": 1 << 30, "cache_size": -65536})
+       db = ZooDatabase("zoo.db", on_error=log.append)  # failed transactions, printed by default
+       db.initialize()
+       db.Animals.read_all()
+       db.statistics() -> Calls, errors and time spent per CRUD method
+       db.close()
+
+    ARCHIVAL (archive.py):
+    ---------------------
+
+       - archive_records(cutoff, database=None, archive_path=None, chunk_size=500, pause=0.0)
+         -> Moves Feeding and AnimalCare rows older than cutoff to the archive database in chunks
+       - enable_incremental_vacuum(database=None) -> One-time conversion of an existing database file
+       Open ZooDatabase(path, archive_path="zoo_archive.db") to query archived rows with include_archive=True.
+
+    STORAGE SETTINGS:
+    ----------------
+
+       - initialize_database(db_name, page_size=16384) -> Sets the page size of a new database,
+         or rebuilds an existing one with VACUUM
+       - python bench.py -> Compares read_all and point-read throughput per page_size, mmap_size and cache_size
+
+    NUTRITION PLANNING (planner.py, requires NumPy):
+    -----------------------------------------------
+
+       - create_plan(plan_date=None, days=28, margin=0.0) -> Computes daily requirements per animal and
+         food type from recent feedings (species, then diet averages for animals without history)
+         and stores them in the NutritionPlan table
+       - read_plan(plan_date) -> Returns (animalID, foodTypeID, daily_quantity) rows of a stored plan
+
+    STOCK-OUT FORECAST (forecast.py, requires NumPy):
+    ------------------------------------------------
+
+       - StockForecaster(window=28, short_window=7).forecast(today=None) -> Returns
+         (foodTypeID, stock, daily_rate, days_until_stockout, limited_by) per food type,
+         using lots in order of expiration; updated incrementally from the change log between calls
+       - StockForecaster.close() -> Unregisters the forecaster's change log consumer
+
+    COMMAND LINE (cli.py):
+    ---------------------
+
+       - python cli.py import animals.csv Feeding=feedings.csv -> Streams CSV files into tables, one worker
+         process per table, lookup tables first, with progress and rows/s; rows are written with plain SQL,
+         not the CRUD classes, so they keep their CSV IDs and versions and other processes' caches are stale
+       - python cli.py export --directory dump/ [tables] -> Writes <Table>.csv files in parallel
+       - python cli.py report -> Record counts, payroll by department and stock outlook (if NumPy is installed)
+       - python cli.py vacuum [--full] -> Releases free pages and runs PRAGMA optimize
+       - python cli.py compress-notes [--threshold 64] -> Compresses stored notes and reports the bytes saved
+       - python cli.py bench [bench.py options] -> Storage settings benchmark
+
+    LOAD TESTING (loadtest.py):
+    --------------------------
+
+       - python loadtest.py copy.db --phases 30:20,15:400,30:20 --threads 16 --processes 2
+         -> Runs a weighted mix of feeding_insert, animal_read, inventory_update and report operations
+            at time-varying arrival rates (--mix feeding_insert=5,animal_read=10,...) and reports
+            requests, errors, lock waits, ops/s and p50/p95/p99 latency per operation
+
+    IN-MEMORY ENGINE (memory_engine.py):
+    -----------------------------------
+
+       - MemoryDatabase() / MemoryDatabase.load(database) -> Empty or copied in-memory database exposing
+         Species, Animals, ..., AnimalCare with the create/read/read_all/update/delete methods of the
+         CRUD classes, plus find()/count()/read_many() with the same filters and options, aggregate()/sum()/
+         min()/max(), exists(), history() and Animals.status(); other methods raise NotImplementedError;
+         about 10x faster creates
+       - flush(database) -> Writes the records created, updated and deleted since the load in one bulk
+         transaction; IDs taken in the database meanwhile are skipped by shifting the new records, and
+         ConflictError is raised if a versioned record updated in memory changed in the database meanwhile
+       - python memory_engine.py 100000 -> Compares Feeding.create throughput with SQLite
+
+    NOTES COMPRESSION (compression.py):
+    ----------------------------------
+
+       - ZooDatabase(path, notes_threshold=64) or ZOO_NOTES_THRESHOLD=64 -> Feeding and AnimalCare notes of at
+         least 64 bytes are stored zlib-compressed with a preset dictionary; reads return the text, decompressing
+         only the notes a query returns (SQL function notes_text(notes) on every connection)
+       - python cli.py compress-notes [--threshold 64] -> Compresses existing notes in short batches and reports
+         the bytes saved per table; compression.notes_report() measures it at any time
+       - python cli.py vacuum --full -> Shrinks the file afterwards
+
+    PROFILING (profiling.py):
+    ------------------------
+
+       - profiling.enable(sample_rate=0.05, memory=True) -> Profiles a sample of the CRUD calls with cProfile
+         and tracemalloc; or set ZOO_PROFILE=0.05 (ZOO_PROFILE_MEMORY=1) before starting the process
+       - profiling.summary() / profiling.report() -> Samples, time and allocations per CRUD method
+       - profiling.dump("profiles/") -> One .prof file per method plus report.txt; with ZOO_PROFILE set,
+         kill -USR1 <pid> dumps to ZOO_PROFILE_DIR without restarting
+       - profiling.disable() -> Stops profiling
+
+    HTTP SERVICE (service.py):
+    -------------------------
+
+       - python service.py --port 8080 -> Serves the CRUD classes as JSON over HTTP/1.1 with keep-alive
+       - GET/POST /<resource>, GET/PUT/DELETE /<resource>/<id> for species, animals, food-types,
+         food-inventory, roles, staff, feeding and animal-care
+       - GET /<resource>?limit=100&after=<id>&<filters> -> Streamed page of records and the next "after"
+       - Lookup tables (species, food-types, roles) send an ETag and answer If-None-Match with 304
+       - GET /metrics -> Request count, errors and latency percentiles per route
+
+    BACKUPS (backup.py):
+    -------------------
+
+       - backup_database(destination, database=None, pages=256, pause=0.01, progress=None)
+         -> Copies the live database in small steps, verifies it and reports pages, bytes and throughput
+       - BackupScheduler(pattern, interval, keep=7).start() -> Takes backups in a background thread
+
+    MODULE FUNCTIONS (crud):
+    -----------------------
+
+       - get_database() -> Returns the default ZooDatabase handle
+       - use_memory_database(name="zoo") -> Switches to a shared in-memory database with the full schema
+       - close_memory_database() -> Discards the in-memory database and switches back to the database file
+       - snapshot() -> Copies the current database into an in-memory snapshot
+       - restore(saved) -> Replaces the current database content with a snapshot
 
     USAGE EXAMPLES:
     -------------
@@ -0,0 +1,344 @@
+"""
+Load generator driving the CRUD classes with a concurrent mixed workload.
+
+Requests arrive open-loop (Poisson arrivals at the rate of the current phase)
+and are executed by a pool of worker threads in one or more processes, so
+queueing under a load spike shows up in the latencies just as it does in
+production. The database handle uses busy_timeout = 0 and retries locked
+operations with a short backoff, which makes every wait for the write lock
+countable. Reproduce a feeding-hour spike with e.g.
+
+    python loadtest.py zoo_copy.db --phases 30:20,15:400,30:20 --threads 16 --processes 2
+"""
+import concurrent.futures
+import queue
+import random
+import sqlite3
+import threading
+import time
+
+import crud
+
+
+def _feeding_insert(database, rng, ids):
+    database.Feeding.create(rng.choice(ids["animals"]), rng.choice(ids["food_types"]),
+                            rng.choice(ids["staff"]), round(rng.uniform(0.5, 20), 2), "Load test")
+
+
+def _animal_read(database, rng, ids):
+    database.Animals.read(rng.choice(ids["animals"]))
+
+
+def _inventory_update(database, rng, ids):
+    database.FoodInventory.update_stock(rng.choice(ids["inventory"]), round(rng.uniform(10, 500), 1))
+
+
+def _report(database, rng, ids):
+    database.Staff.workload("2024-01-01", "2024-12-31", "month", staff_ids=[rng.choice(ids["staff"])])
+    database.Feeding.sum("quantity", foodTypeID=rng.choice(ids["food_types"]))
+
+
+# Operation name -> function(database, rng, ids)
+OPERATIONS = {
+    "feeding_insert": _feeding_insert,
+    "animal_read": _animal_read,
+    "inventory_update": _inventory_update,
+    "report": _report,
+}
+
+DEFAULT_MIX = {"feeding_insert": 5, "animal_read": 10, "inventory_update": 2, "report": 1}
+
+
+def parse_mix(text):
+    """
+    Parse an operation mix such as "feeding_insert=5,animal_read=10".
+
+    Args:
+        text (str): Comma-separated operation=weight pairs
+
+    Returns:
+        dict: Operation name -> weight
+    """
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in OPERATIONS:
+            raise ValueError(f"Unknown operation: {name}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def parse_phases(text):
+    """
+    Parse arrival rate phases such as "30:20,10:400" (seconds:requests per second).
+
+    Args:
+        text (str): Comma-separated duration:rate pairs
+
+    Returns:
+        list: (seconds, rate) tuples
+    """
+    phases = []
+    for item in text.split(","):
+        seconds, _, rate = item.partition(":")
+        phases.append((float(seconds), float(rate)))
+    return phases
+
+
+def prepare(database):
+    """
+    Load the IDs the operations pick from, adding stock rows if the inventory is empty.
+
+    Args:
+        database (crud.ZooDatabase): Database under test
+
+    Returns:
+        dict: "animals", "food_types", "staff" and "inventory" ID lists
+    """
+    conn = database.connect()
+    try:
+        if conn.execute("SELECT COUNT(*) FROM FoodInventory").fetchone()[0] == 0:
+            conn.execute(
+                """INSERT INTO FoodInventory (foodTypeID, quantity, expiration_date, last_updated)
+                   SELECT foodTypeID, 100, date('now', '+30 days'), datetime('now') FROM FoodTypes"""
+            )
+            conn.commit()
+        ids = {
+            name: [row[0] for row in conn.execute(f"SELECT {key} FROM {table}")]
+            for name, table, key in (("animals", "Animals", "animalID"), ("food_types", "FoodTypes", "foodTypeID"),
+                                     ("staff", "Staff", "staffID"), ("inventory", "FoodInventory", "inventoryID"))
+        }
+    finally:
+        conn.close()
+    for name, values in ids.items():
+        if not values:
+            raise ValueError(f"The database has no {name.replace('_', ' ')} to run the load test on")
+    return ids
+
+
+def run_load(db_name, mix=None, phases=((10, 50),), threads=8, seed=0, max_retries=100, profile="fast", ids=None):
+    """
+    Run the workload in this process.
+
+    Args:
+        db_name (str): Database file
+        mix (dict, optional): Operation name -> weight, defaults to DEFAULT_MIX
+        phases (sequence): (seconds, requests per second) arrival phases, run in order
+        threads (int): Number of worker threads
+        seed (int): Random seed of arrivals and operation arguments
+        max_retries (int): Retries of an operation that finds the database locked
+        profile (str): Connection profile of the database handle (see crud.PROFILES)
+        ids (dict, optional): Result of prepare(), computed if not given
+
+    Returns:
+        dict: "seconds" and "operations" (name -> {"latencies", "errors", "lock_waits"})
+    """
+    mix = mix or DEFAULT_MIX
+    if ids is None:
+        setup = crud.ZooDatabase(db_name, profile)
+        try:
+            ids = prepare(setup)
+        finally:
+            setup.close()
+    # Locked attempts are expected and retried, so failed transactions are not reported
+    database = crud.ZooDatabase(db_name, profile, pool_size=threads, pragmas={"busy_timeout": 0},
+                                on_error=lambda error: None)
+    names = list(mix)
+    weights = [mix[name] for name in names]
+    results = {name: {"latencies": [], "errors": 0, "lock_waits": 0} for name in names}
+    results_lock = threading.Lock()
+    arrivals = queue.Queue()
+
+    def worker(worker_seed):
+        rng = random.Random(worker_seed)
+        while True:
+            item = arrivals.get()
+            if item is None:
+                return
+            scheduled, name = item
+            lock_waits = 0
+            failed = False
+            for attempt in range(max_retries + 1):
+                try:
+                    OPERATIONS[name](database, rng, ids)
+                    break
+                except sqlite3.OperationalError as e:
+                    if ("locked" not in str(e) and "busy" not in str(e)) or attempt == max_retries:
+                        failed = True
+                        break
+                    lock_waits += 1
+                    time.sleep(min(0.001 * 2 ** attempt, 0.05) * rng.random())
+                except Exception:
+                    failed = True
+                    break
+            latency = time.perf_counter() - scheduled
+            with results_lock:
+                entry = results[name]
+                entry["lock_waits"] += lock_waits
+                if failed:
+                    entry["errors"] += 1
+                else:
+                    entry["latencies"].append(latency)
+
+    rng = random.Random(seed)
+    workers = [threading.Thread(target=worker, args=(seed * 1000 + i,), daemon=True) for i in range(threads)]
+    for thread in workers:
+        thread.start()
+    start = time.perf_counter()
+    phase_start = start
+    for seconds, rate in phases:
+        next_arrival = phase_start
+        phase_end = phase_start + seconds
+        while rate > 0:
+            next_arrival += rng.expovariate(rate)
+            if next_arrival >= phase_end:
+                break
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            arrivals.put((next_arrival, rng.choices(names, weights)[0]))
+        phase_end_delay = phase_end - time.perf_counter()
+        if phase_end_delay > 0:
+            time.sleep(phase_end_delay)
+        phase_start = phase_end
+    for _ in workers:
+        arrivals.put(None)
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    database.close()
+    return {"seconds": elapsed, "operations": results}
+
+
+def run(db_name, mix=None, phases=((10, 50),), threads=8, processes=1, seed=0, profile="fast"):
+    """
+    Run the workload in several processes, splitting the arrival rate between them.
+
+    Args:
+        db_name (str): Database file
+        mix (dict, optional): Operation name -> weight, defaults to DEFAULT_MIX
+        phases (sequence): (seconds, total requests per second) arrival phases
+        threads (int): Worker threads per process
+        processes (int): Number of processes; 1 runs in this process
+        seed (int): Random seed
+        profile (str): Connection profile of the database handles (see crud.PROFILES)
+
+    Returns:
+        dict: Operation name -> {"requests", "errors", "lock_waits", "throughput",
+              "p50_ms", "p95_ms", "p99_ms", "max_ms"}, plus "total" over all operations
+    """
+    # Prepared once, so the processes do not race to switch the journal mode or add stock
+    setup = crud.ZooDatabase(db_name, profile)
+    try:
+        ids = prepare(setup)
+    finally:
+        setup.close()
+    share = [(seconds, rate / processes) for seconds, rate in phases]
+    options = {"profile": profile, "ids": ids}
+    if processes == 1:
+        runs = [run_load(db_name, mix, share, threads, seed, **options)]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(max_workers=processes) as pool:
+            futures = [pool.submit(run_load, db_name, mix, share, threads, seed + i, **options)
+                       for i in range(processes)]
+            runs = [future.result() for future in futures]
+    return summarize(runs)
+
+
+def summarize(runs):
+    """
+    Merge the results of run_load() calls into per-operation statistics.
+
+    Args:
+        runs (list): Results of run_load()
+
+    Returns:
+        dict: See run()
+    """
+    seconds = max(result["seconds"] for result in runs)
+    merged = {}
+    for result in runs:
+        for name, entry in result["operations"].items():
+            target = merged.setdefault(name, {"latencies": [], "errors": 0, "lock_waits": 0})
+            target["latencies"] += entry["latencies"]
+            target["errors"] += entry["errors"]
+            target["lock_waits"] += entry["lock_waits"]
+    merged["total"] = {
+        "latencies": [latency for entry in list(merged.values()) for latency in entry["latencies"]],
+        "errors": sum(entry["errors"] for entry in merged.values()),
+        "lock_waits": sum(entry["lock_waits"] for entry in merged.values()),
+    }
+
+    report = {}
+    for name, entry in merged.items():
+        latencies = sorted(entry["latencies"])
+
+        def percentile(fraction):
+            if not latencies:
+                return None
+            return latencies[min(int(fraction * len(latencies)), len(latencies) - 1)] * 1000
+
+        report[name] = {
+            "requests": len(latencies) + entry["errors"],
+            "errors": entry["errors"],
+            "lock_waits": entry["lock_waits"],
+            "throughput": len(latencies) / seconds if seconds else 0.0,
+            "p50_ms": percentile(0.50),
+            "p95_ms": percentile(0.95),
+            "p99_ms": percentile(0.99),
+            "max_ms": percentile(1.0),
+        }
+    return report
+
+
+def print_report(report):
+    """
+    Print load test results as a table.
+
+    Args:
+        report (dict): Result of run()
+    """
+    print(f"{'operation':<17} {'requests':>8} {'errors':>6} {'lock waits':>10} {'ops/s':>8} "
+          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+    for name, entry in report.items():
+        latencies = "".join(f" {entry[key]:>8.1f}" if entry[key] is not None else f" {'-':>8}"
+                            for key in ("p50_ms", "p95_ms", "p99_ms", "max_ms"))
+        print(f"{name:<17} {entry['requests']:>8} {entry['errors']:>6} {entry['lock_waits']:>10} "
+              f"{entry['throughput']:>8.1f}{latencies}")
+
+
+def main(argv=None):
+    """
+    Run the load test from the command line.
+
+    Args:
+        argv (list, optional): Command-line arguments, defaults to sys.argv
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Drive the zoo database with a concurrent mixed workload")
+    parser.add_argument("database", help="Database file to load (use a copy of production)")
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_MIX,
+                        help="Operation weights, e.g. feeding_insert=5,animal_read=10,inventory_update=2,report=1")
+    parser.add_argument("--phases", type=parse_phases, default=[(10, 50)],
+                        help="Arrival phases as seconds:requests_per_second, e.g. 30:20,15:400,30:20")
+    parser.add_argument("--threads", type=int, default=8, help="Worker threads per process")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", default="fast", choices=sorted(crud.PROFILES))
+    parser.add_argument("--create", action="store_true",
+                        help="Create a sample database first (see bench.create_sample_database)")
+    parser.add_argument("--animals", type=int, default=2000)
+    parser.add_argument("--feedings", type=int, default=100000)
+    args = parser.parse_args(argv)
+
+    if args.create:
+        import bench
+
+        bench.create_sample_database(args.database, args.animals, args.feedings)
+    print_report(run(args.database, args.mix, args.phases, args.threads, args.processes, args.seed, args.profile))
+
+
+if __name__ == "__main__":
+    main()
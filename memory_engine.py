@@ -0,0 +1,965 @@
+"""
+In-memory storage engine with the interface of the CRUD classes.
+
+What-if simulations create records by the million, and SQLite's per-statement
+overhead dominates such workloads. A MemoryDatabase offers the Species,
+Animals, FoodTypes, FoodInventory, Roles, Staff, Feeding and AnimalCare
+methods of the CRUD classes (same arguments, same result tuples) over
+column-oriented Python arrays, with hash indexes on the foreign keys and the
+unique names. Nothing touches SQLite until flush() writes the changed rows in
+one bulk transaction:
+
+    simulation = MemoryDatabase.load(database)      # or MemoryDatabase() to start empty
+    for day in range(365):
+        simulation.Feeding.create(animal_id, food_type_id, staff_id, 2.5, feeding_date=...)
+    simulation.flush(database)                      # keep the result
+
+Supported are create, read, read_all, read_many, update, delete, exists,
+find, count, aggregate, sum, min, max, history and Animals.status; the
+other CRUD methods (reports such as Staff.payroll or Animals.status_board)
+raise NotImplementedError. New IDs continue after the largest ID the
+database ever handed out, including archived and deleted rows.
+
+Foreign keys are not enforced, like in the SQLite database; as with the
+JOINs of the CRUD classes, records whose parent is missing are left out of
+reads. NOT NULL, UNIQUE and CHECK constraints raise sqlite3.IntegrityError.
+"""
+import array
+import datetime
+import operator as operator_module
+import re
+import sqlite3
+
+import compression
+import crud
+
+
+# Table -> (primary key, stored columns in table order)
+TABLES = {
+    "Species": ("speciesID", ("name", "habitat", "diet")),
+    "FoodTypes": ("foodTypeID", ("name", "unit", "storage_requirements")),
+    "Roles": ("roleID", ("title", "department", "description")),
+    "Animals": ("animalID", ("name", "speciesID", "gender", "birthdate", "health_status", "version")),
+    "FoodInventory": ("inventoryID", ("foodTypeID", "quantity", "expiration_date", "last_updated", "version")),
+    "Staff": ("staffID", ("firstName", "lastName", "roleID", "country", "hire_date", "salary", "version")),
+    "Feeding": ("feedingID", ("animalID", "foodTypeID", "staffID", "feeding_date", "quantity", "notes")),
+    "AnimalCare": ("careID", ("animalID", "staffID", "care_date", "care_type", "notes")),
+}
+
+# Table -> {foreign key column: referenced table}; foreign key columns are indexed
+FOREIGN_KEYS = {
+    "Animals": {"speciesID": "Species"},
+    "FoodInventory": {"foodTypeID": "FoodTypes"},
+    "Staff": {"roleID": "Roles"},
+    "Feeding": {"animalID": "Animals", "foodTypeID": "FoodTypes", "staffID": "Staff"},
+    "AnimalCare": {"animalID": "Animals", "staffID": "Staff"},
+}
+
+# NOT NULL integer and real columns, stored in typed arrays; other columns are lists
+INTEGER_COLUMNS = {"speciesID", "foodTypeID", "roleID", "animalID", "staffID", "version"}
+REAL_COLUMNS = {"quantity", "salary"}
+
+NOT_NULL = {
+    "Species": ("name", "habitat", "diet"),
+    "FoodTypes": ("name", "unit"),
+    "Roles": ("title", "department"),
+    "Animals": ("name",),
+    "FoodInventory": ("last_updated",),
+    "Staff": ("firstName", "lastName", "country", "hire_date"),
+    "Feeding": ("feeding_date",),
+    "AnimalCare": ("care_date", "care_type"),
+}
+
+UNIQUE = {"Species": "name", "FoodTypes": "name", "Roles": "title"}
+
+# Table -> (column, SQL text of the check, test)
+CHECKS = {
+    "FoodInventory": ("quantity", "quantity >= 0", lambda value: value >= 0),
+    "Staff": ("salary", "salary > 0", lambda value: value > 0),
+    "Feeding": ("quantity", "quantity > 0", lambda value: value > 0),
+}
+
+
+def _now():
+    return datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _today():
+    return datetime.datetime.now().strftime("%Y-%m-%d")
+
+
+def _highest_id(conn, table, key):
+    """
+    Get the largest ID a table has handed out.
+
+    For AUTOINCREMENT tables this includes the IDs of deleted and archived
+    rows, recorded in sqlite_sequence, so they are never used again.
+
+    Returns:
+        int: Largest ID, 0 for a table that never had rows
+    """
+    return conn.execute(
+        f"""SELECT MAX(COALESCE((SELECT MAX({key}) FROM {table}), 0),
+                       COALESCE((SELECT seq FROM sqlite_sequence WHERE name = ?), 0))""",
+        (table,)
+    ).fetchone()[0]
+
+
+def _like(pattern):
+    # SQLite LIKE: % and _ wildcards, case-insensitive for ASCII letters
+    regex = "".join(".*" if char == "%" else "." if char == "_" else re.escape(char) for char in pattern)
+    return re.compile(regex, re.IGNORECASE | re.DOTALL)
+
+
+def _test(operator, value, by_day=False):
+    """
+    Build the test of a crud find() filter on one column value.
+
+    Args:
+        operator (str): Filter operator, a key of crud.FILTER_OPERATORS
+        value: Filter value
+        by_day (bool): Compare ranges by day number, like the indexed *_day columns
+
+    Returns:
+        function: Column value -> bool, False for NULL unless the filter asks for NULL
+    """
+    if operator == "isnull":
+        return lambda column: (column is None) == bool(value)
+    if value is None and operator in ("eq", "ne"):
+        return lambda column: (column is None) == (operator == "eq")
+    if operator in ("in", "not_in"):
+        values = set(value)
+        if operator == "in":
+            return lambda column: column is not None and column in values
+        return lambda column: column is not None and column not in values
+    if operator == "like":
+        regex = _like(value)
+        return lambda column: column is not None and regex.fullmatch(str(column)) is not None
+    convert = crud.day_number if by_day and operator in crud.RANGE_OPERATORS else (lambda column: column)
+    if operator == "between":
+        low, high = map(convert, value)
+        return lambda column: column is not None and low <= convert(column) <= high
+    compare = {
+        "eq": operator_module.eq, "ne": operator_module.ne, "lt": operator_module.lt,
+        "lte": operator_module.le, "gt": operator_module.gt, "gte": operator_module.ge,
+    }[operator]
+    value = convert(value)
+    return lambda column: column is not None and compare(convert(column), value)
+
+
+class _Table:
+    """
+    Column-oriented storage of one table.
+
+    Every column is an array (typed for NOT NULL numbers) indexed by slot;
+    slots maps record IDs to their slot. Deleted records keep their slot
+    until the table is rebuilt by a flush. Changes since the last load or
+    flush are tracked in dirty (created or updated IDs) and deleted.
+    """
+
+    def __init__(self, name):
+        self.name = name
+        self.key, self.columns = TABLES[name]
+        self.positions = {column: i for i, column in enumerate(self.columns)}
+        self.not_null = tuple(self.positions[column] for column in NOT_NULL.get(name, ()))
+        self.unique = self.positions[UNIQUE[name]] if name in UNIQUE else None
+        check = CHECKS.get(name)
+        self.check = (self.positions[check[0]], check[1], check[2]) if check else None
+        self.loaded_max = 0
+        self._reset()
+
+    def _reset(self):
+        self.ids = array.array("q")
+        self.data = [array.array("q") if column in INTEGER_COLUMNS else
+                     array.array("d") if column in REAL_COLUMNS else []
+                     for column in self.columns]
+        self.slots = {}
+        self.unique_values = {}
+        self.indexes = {self.positions[column]: {} for column in FOREIGN_KEYS.get(self.name, ())}
+        self.next_id = self.loaded_max + 1
+        self.dirty = set()
+        self.deleted = set()
+        # Version of each updated loaded record when it was loaded, checked by flush()
+        self.base_versions = {}
+
+    def _validate(self, row, record_id):
+        for position in self.not_null:
+            if row[position] is None:
+                raise sqlite3.IntegrityError(
+                    f"NOT NULL constraint failed: {self.name}.{self.columns[position]}")
+        if self.check is not None:
+            position, text, test = self.check
+            if row[position] is not None and not test(row[position]):
+                raise sqlite3.IntegrityError(f"CHECK constraint failed: {text}")
+        if self.unique is not None:
+            owner = self.unique_values.get(row[self.unique])
+            if owner is not None and owner != record_id:
+                raise sqlite3.IntegrityError(f"UNIQUE constraint failed: {self.name}.{self.columns[self.unique]}")
+
+    def insert(self, row, record_id=None, track=True):
+        """
+        Append a record.
+
+        Args:
+            row (tuple): Values of the stored columns
+            record_id (int, optional): Primary key, the next free ID by default
+            track (bool): Record the insert for the next flush
+
+        Returns:
+            int: ID of the record
+        """
+        if record_id is None:
+            record_id = self.next_id
+        elif record_id in self.slots:
+            raise sqlite3.IntegrityError(f"UNIQUE constraint failed: {self.name}.{self.key}")
+        self._validate(row, record_id)
+        slot = len(self.ids)
+        try:
+            for column, value in zip(self.data, row):
+                column.append(value)
+        except TypeError:
+            for column in self.data:
+                del column[slot:]
+            raise
+        self.ids.append(record_id)
+        self.slots[record_id] = slot
+        if record_id >= self.next_id:
+            self.next_id = record_id + 1
+        if self.unique is not None:
+            self.unique_values[row[self.unique]] = record_id
+        for position, index in self.indexes.items():
+            index.setdefault(row[position], []).append(record_id)
+        if track:
+            self.dirty.add(record_id)
+        return record_id
+
+    def get(self, record_id):
+        """
+        Returns:
+            tuple: (record_id, *stored columns) or None if not found
+        """
+        slot = self.slots.get(record_id)
+        if slot is None:
+            return None
+        return (record_id, *[column[slot] for column in self.data])
+
+    def value(self, record_id, position):
+        """
+        Returns:
+            The stored column at position of a record, None if the record does not exist
+        """
+        slot = self.slots.get(record_id)
+        return None if slot is None else self.data[position][slot]
+
+    def update(self, record_id, row):
+        """
+        Replace the stored columns of a record.
+
+        Returns:
+            bool: True if the record exists
+        """
+        slot = self.slots.get(record_id)
+        if slot is None:
+            return False
+        self._validate(row, record_id)
+        old = [column[slot] for column in self.data]
+        try:
+            for column, value in zip(self.data, row):
+                column[slot] = value
+        except TypeError:
+            for column, value in zip(self.data, old):
+                column[slot] = value
+            raise
+        if self.unique is not None and old[self.unique] != row[self.unique]:
+            del self.unique_values[old[self.unique]]
+            self.unique_values[row[self.unique]] = record_id
+        for position, index in self.indexes.items():
+            if old[position] != row[position]:
+                index[old[position]].remove(record_id)
+                index.setdefault(row[position], []).append(record_id)
+        self.dirty.add(record_id)
+        return True
+
+    def remove(self, record_id):
+        """
+        Returns:
+            bool: True if the record existed
+        """
+        slot = self.slots.pop(record_id, None)
+        if slot is None:
+            return False
+        if self.unique is not None:
+            del self.unique_values[self.data[self.unique][slot]]
+        for position, index in self.indexes.items():
+            index[self.data[position][slot]].remove(record_id)
+        self.dirty.discard(record_id)
+        if record_id <= self.loaded_max:
+            self.deleted.add(record_id)
+        return True
+
+    def rows(self):
+        """
+        Yields:
+            tuple: (record_id, *stored columns) of every record in ID insertion order
+        """
+        data = self.data
+        for record_id, slot in self.slots.items():
+            yield (record_id, *[column[slot] for column in data])
+
+    def match(self, filters):
+        """
+        Find the records whose columns equal the filter values.
+
+        Args:
+            filters (dict): Column name (the primary key or a stored column) -> value
+
+        Returns:
+            list: IDs of the matching records
+        """
+        if self.key in filters:
+            record_id = filters[self.key]
+            candidates = [record_id] if record_id in self.slots else []
+        else:
+            candidates = None
+        checks = []
+        for column, value in filters.items():
+            if column == self.key:
+                continue
+            if column not in self.positions:
+                raise ValueError(f"Unknown column for {self.name}: {column}")
+            position = self.positions[column]
+            checks.append((self.data[position], value))
+            if position in self.indexes and self.key not in filters:
+                ids = self.indexes[position].get(value, [])
+                if candidates is None or len(ids) < len(candidates):
+                    candidates = ids
+        slots = self.slots
+        return [record_id for record_id in (slots if candidates is None else candidates)
+                if all(column[slots[record_id]] == value for column, value in checks)]
+
+    def rebuild(self, key_shift, foreign_shifts):
+        """
+        Compact the storage, moving new records and references to new parents by an ID shift.
+
+        Args:
+            key_shift (int): Added to the IDs above loaded_max
+            foreign_shifts (dict): Column position -> (parent loaded_max, shift)
+        """
+        rows = list(self.rows())
+        loaded_max = self.loaded_max
+        self._reset()
+        for row in rows:
+            record_id = row[0] + (key_shift if row[0] > loaded_max else 0)
+            values = list(row[1:])
+            for position, (parent_max, shift) in foreign_shifts.items():
+                if values[position] > parent_max:
+                    values[position] += shift
+            self.insert(values, record_id, track=False)
+
+
+class _Store:
+    """Methods of the CRUD classes shared by every table"""
+
+    table = None
+
+    def __init__(self, engine):
+        self._engine = engine
+        self._table = engine._tables[self.table]
+
+    def _output(self, row):
+        # Result tuple of read(); None when a joined parent is missing
+        return row
+
+    def read(self, record_id):
+        """Read a record by ID, as the CRUD class does; None if not found"""
+        row = self._table.get(record_id)
+        return None if row is None else self._output(row)
+
+    def read_all(self):
+        """Read all records, as the CRUD class does"""
+        output = self._output
+        return [record for record in map(output, self._table.rows()) if record is not None]
+
+    def delete(self, record_id):
+        """Delete a record; True if it existed"""
+        return self._table.remove(record_id)
+
+    def _filter(self, filters):
+        """
+        Split filters into an indexed equality lookup and per-record tests.
+
+        Args:
+            filters (dict): "column" or "column__operator" -> value, as accepted by crud find()
+
+        Returns:
+            tuple: (IDs of the candidate records, tests on stored rows, tests on read() records)
+        """
+        table = self._table
+        names = self._names()
+        day_columns = getattr(crud, self.table)._day_columns
+        equal = {}
+        stored_tests = []
+        record_tests = []
+        for key, value in filters.items():
+            name, _, operator = key.partition("__")
+            operator = operator or "eq"
+            if operator not in crud.FILTER_OPERATORS:
+                raise ValueError(f"Unknown filter operator: {operator}")
+            if name not in names:
+                raise ValueError(f"Unknown column for {self.table}: {name}")
+            stored = name == table.key or name in table.positions
+            if operator == "eq" and value is not None and stored:
+                equal[name] = value
+                continue
+            test = _test(operator, value, name in day_columns)
+            if stored:
+                stored_tests.append((0 if name == table.key else table.positions[name] + 1, test))
+            else:
+                record_tests.append((names.index(name), test))
+        return table.match(equal), stored_tests, record_tests
+
+    def _names(self):
+        # Column names of the read() records, in order
+        return [name for name, _, _ in getattr(crud, self.table)._columns]
+
+    def find(self, order_by=None, limit=None, batch_size=500, columns=None, include=(), **filters):
+        """
+        Find records matching filters (see crud find() for the filters and options).
+
+        Equality filters on stored columns use the foreign key indexes; the
+        other filters are tested record by record with the semantics of
+        their SQL form, date ranges comparing whole days. batch_size is
+        accepted for compatibility and ignored.
+
+        Args:
+            order_by (str or list, optional): Column name(s), prefixed with "-" for descending order
+            limit (int, optional): Maximum number of records
+            batch_size (int): Ignored
+            columns (list, optional): Names of the returned columns
+            include (list): Joined name columns added to the returned columns if missing
+            **filters: Column filters
+
+        Returns:
+            list: Records as returned by read(), or with the requested columns
+        """
+        names = self._names()
+        output = names if columns is None else list(columns)
+        output += [name for name in include if name not in output]
+        for name in output:
+            if name not in names:
+                raise ValueError(f"Unknown column for {self.table}: {name}")
+        table = self._table
+        ids, stored_tests, record_tests = self._filter(filters)
+        records = []
+        for record_id in ids:
+            row = table.get(record_id)
+            if not all(test(row[position]) for position, test in stored_tests):
+                continue
+            record = self._output(row)
+            if record is not None and all(test(record[position]) for position, test in record_tests):
+                records.append(record)
+
+        if order_by is not None:
+            # Stable sorts from the last key to the first; NULL sorts first, as in SQLite
+            for name in reversed([order_by] if isinstance(order_by, str) else list(order_by)):
+                column = name.lstrip("-")
+                if column not in names:
+                    raise ValueError(f"Unknown column for {self.table}: {column}")
+                position = names.index(column)
+                records.sort(key=lambda record: (record[position] is not None, record[position]),
+                             reverse=name.startswith("-"))
+        if limit is not None:
+            records = records[:limit]
+        if output != names:
+            positions = [names.index(name) for name in output]
+            records = [tuple(record[position] for position in positions) for record in records]
+        return records
+
+    def count(self, **filters):
+        """
+        Returns:
+            int: Number of records matching the filters (see find()); as in SQL, records
+                 whose parent is missing only drop out when a joined column is filtered
+        """
+        if not filters:
+            return len(self._table.slots)
+        table = self._table
+        ids, stored_tests, record_tests = self._filter(filters)
+        total = 0
+        for record_id in ids:
+            row = table.get(record_id)
+            if not all(test(row[position]) for position, test in stored_tests):
+                continue
+            if record_tests:
+                record = self._output(row)
+                if record is None or not all(test(record[position]) for position, test in record_tests):
+                    continue
+            total += 1
+        return total
+
+    def exists(self, record_id):
+        """True if the record exists"""
+        return record_id in self._table.slots
+
+    def read_many(self, record_ids, columns=None, include=()):
+        """
+        Read several records by ID (see crud read_many()).
+
+        Returns:
+            tuple: (records in the order of record_ids, list of the requested IDs that do not exist)
+        """
+        record_ids = list(record_ids)
+        names = self._names()
+        output = names if columns is None else list(columns)
+        output += [name for name in include if name not in output]
+        for name in output:
+            if name not in names:
+                raise ValueError(f"Unknown column for {self.table}: {name}")
+        positions = [names.index(name) for name in output]
+        found = {}
+        for record_id in dict.fromkeys(record_ids):
+            record = self.read(record_id)
+            if record is not None:
+                found[record_id] = record if output == names else tuple(record[i] for i in positions)
+        records = [found[record_id] for record_id in record_ids if record_id in found]
+        missing = [record_id for record_id in dict.fromkeys(record_ids) if record_id not in found]
+        return records, missing
+
+    def aggregate(self, function, column, **filters):
+        """
+        Compute SUM, MIN, MAX, AVG or COUNT of a column over the matching records (see crud aggregate()).
+
+        Returns:
+            The aggregate value, or None when no record matches (0 for SUM and COUNT)
+        """
+        function = function.upper()
+        if function not in ("SUM", "MIN", "MAX", "AVG", "COUNT"):
+            raise ValueError(f"Unknown aggregate function: {function}")
+        # NULL values are ignored, as in SQL
+        values = [record[0] for record in self.find(columns=[column], **filters) if record[0] is not None]
+        if function == "COUNT":
+            return len(values)
+        if function == "SUM":
+            return float(sum(values))
+        if not values:
+            return None
+        if function == "AVG":
+            return sum(values) / len(values)
+        return min(values) if function == "MIN" else max(values)
+
+    def sum(self, column, **filters):
+        """Sum a column over the matching records, 0.0 when none match"""
+        return self.aggregate("SUM", column, **filters)
+
+    def min(self, column, **filters):
+        """Smallest value of a column over the matching records, None when none match"""
+        return self.aggregate("MIN", column, **filters)
+
+    def max(self, column, **filters):
+        """Largest value of a column over the matching records, None when none match"""
+        return self.aggregate("MAX", column, **filters)
+
+    def __getattr__(self, name):
+        # Methods of the CRUD class the engine does not implement fail clearly instead of as a typo
+        if not name.startswith("_") and hasattr(getattr(crud, self.table, None), name):
+            raise NotImplementedError(f"{self.table}.{name} is not supported by the in-memory engine")
+        raise AttributeError(f"{type(self).__name__!r} object has no attribute {name!r}")
+
+    def _name(self, table, record_id, position=0):
+        return self._engine._tables[table].value(record_id, position)
+
+    def _staff_name(self, staff_id):
+        staff = self._engine._tables["Staff"]
+        slot = staff.slots.get(staff_id)
+        return None if slot is None else f"{staff.data[0][slot]} {staff.data[1][slot]}"
+
+    def _versioned_update(self, record_id, expected_version, build):
+        # build(current stored columns) -> new stored columns, the version being the last one
+        table = self._table
+        current = table.get(record_id)
+        if current is None:
+            return False
+        if expected_version is not None and current[-1] != expected_version:
+            raise crud.ConflictError(table.name, record_id, expected_version, current[-1])
+        if record_id <= table.loaded_max:
+            table.base_versions.setdefault(record_id, current[-1])
+        row = build(current[1:])
+        return table.update(record_id, (*row[:-1], current[-1] + 1))
+
+
+class SpeciesStore(_Store):
+    table = "Species"
+
+    def create(self, name, habitat, diet):
+        return self._table.insert((name, habitat, diet))
+
+    def update(self, species_id, name, habitat, diet):
+        return self._table.update(species_id, (name, habitat, diet))
+
+
+class FoodTypesStore(_Store):
+    table = "FoodTypes"
+
+    def create(self, name, unit, storage_requirements=None):
+        return self._table.insert((name, unit, storage_requirements))
+
+    def update(self, food_type_id, name, unit, storage_requirements=None):
+        return self._table.update(food_type_id, (name, unit, storage_requirements))
+
+
+class RolesStore(_Store):
+    table = "Roles"
+
+    def create(self, title, department, description=None):
+        return self._table.insert((title, department, description))
+
+    def update(self, role_id, title, department, description=None):
+        return self._table.update(role_id, (title, department, description))
+
+
+class AnimalsStore(_Store):
+    table = "Animals"
+
+    def _output(self, row):
+        species = self._name("Species", row[2])
+        if species is None:
+            return None
+        animal_id, name, species_id, gender, birthdate, health_status, version = row
+        return animal_id, name, species_id, gender, birthdate, health_status, species, version
+
+    def create(self, name, species_id, gender=None, birthdate=None, health_status="Good"):
+        return self._table.insert((name, species_id, gender, birthdate, health_status, 1))
+
+    def status(self, animal_id):
+        """
+        Compute the dashboard status of one animal (see crud.Animals.status).
+
+        Returns:
+            tuple: (animalID, name, speciesID, species_name, health_status,
+                   last_feeding_date, last_care_date, last_care_type) or None if not found
+        """
+        row = self._table.get(animal_id)
+        if row is None:
+            return None
+        _, name, species_id, _, _, health_status, _ = row
+        tables = self._engine._tables
+        feeding, care = tables["Feeding"], tables["AnimalCare"]
+        feeding_date = feeding.positions["feeding_date"]
+        feeding_dates = [feeding.data[feeding_date][feeding.slots[record_id]]
+                         for record_id in feeding.match({"animalID": animal_id})]
+        care_date, care_type = care.positions["care_date"], care.positions["care_type"]
+        # Latest care event by date, then by ID, like the AnimalStatus triggers
+        latest = max(((care.data[care_date][care.slots[record_id]], record_id)
+                      for record_id in care.match({"animalID": animal_id})), default=None)
+        return (animal_id, name, species_id, self._name("Species", species_id), health_status,
+                max(feeding_dates, default=None),
+                None if latest is None else latest[0],
+                None if latest is None else care.data[care_type][care.slots[latest[1]]])
+
+    def update(self, animal_id, name, species_id, gender=None, birthdate=None, health_status=None,
+               expected_version=None):
+        return self._versioned_update(animal_id, expected_version, lambda current: (
+            name, species_id,
+            current[2] if gender is None else gender,
+            current[3] if birthdate is None else birthdate,
+            current[4] if health_status is None else health_status,
+            None,
+        ))
+
+
+class FoodInventoryStore(_Store):
+    table = "FoodInventory"
+
+    def _output(self, row):
+        food_type = self._name("FoodTypes", row[1])
+        if food_type is None:
+            return None
+        inventory_id, food_type_id, quantity, expiration_date, last_updated, version = row
+        return inventory_id, food_type_id, food_type, quantity, expiration_date, last_updated, version
+
+    def create(self, food_type_id, quantity, expiration_date=None):
+        return self._table.insert((food_type_id, quantity, expiration_date, _now(), 1))
+
+    def update_stock(self, inventory_id, quantity, expiration_date=None, expected_version=None):
+        return self._versioned_update(inventory_id, expected_version, lambda current: (
+            current[0], quantity, current[2] if expiration_date is None else expiration_date, _now(), None,
+        ))
+
+
+class StaffStore(_Store):
+    table = "Staff"
+
+    def _output(self, row):
+        role = self._name("Roles", row[3])
+        if role is None:
+            return None
+        staff_id, first_name, last_name, role_id, country, hire_date, salary, version = row
+        return staff_id, first_name, last_name, role_id, role, country, hire_date, salary, version
+
+    def create(self, first_name, last_name, role_id, country, salary, hire_date=None):
+        return self._table.insert((first_name, last_name, role_id, country, hire_date or _today(), salary, 1))
+
+    def update(self, staff_id, first_name, last_name, role_id, country, salary, hire_date=None,
+               expected_version=None):
+        return self._versioned_update(staff_id, expected_version, lambda current: (
+            first_name, last_name, role_id, country, current[4] if hire_date is None else hire_date, salary, None,
+        ))
+
+
+class _HistoryStore(_Store):
+    """history() of the event tables, over the animalID index"""
+
+    date_column = None
+    history_columns = ()
+
+    def history(self, animal_id, start=None, end=None, include_archive=False):
+        """
+        Get the events of an animal in date order (see crud.Feeding.history).
+
+        Raises:
+            ValueError: If include_archive is set; the engine has no archive
+        """
+        if include_archive:
+            raise ValueError("The in-memory engine has no archive")
+        table = self._table
+        date = table.positions[self.date_column]
+        positions = [table.positions[column] for column in self.history_columns]
+        events = []
+        for record_id in table.match({"animalID": animal_id}):
+            slot = table.slots[record_id]
+            value = table.data[date][slot]
+            if (start is None or value >= start) and (end is None or value[:10] <= end[:10]):
+                events.append((record_id, *[table.data[position][slot] for position in positions]))
+        events.sort(key=lambda event: (event[-1], event[0]))
+        return events
+
+
+class FeedingStore(_HistoryStore):
+    table = "Feeding"
+    date_column = "feeding_date"
+    history_columns = ("foodTypeID", "staffID", "quantity", "notes", "feeding_date")
+
+    def _output(self, row):
+        feeding_id, animal_id, food_type_id, staff_id, feeding_date, quantity, notes = row
+        animal = self._name("Animals", animal_id)
+        food_type = self._name("FoodTypes", food_type_id)
+        staff = self._staff_name(staff_id)
+        if animal is None or food_type is None or staff is None:
+            return None
+        return feeding_id, animal_id, animal, food_type_id, food_type, staff_id, staff, quantity, notes, feeding_date
+
+    def create(self, animal_id, food_type_id, staff_id, quantity, notes=None, feeding_date=None):
+        return self._table.insert((animal_id, food_type_id, staff_id, feeding_date or _today(), quantity, notes))
+
+    def update(self, feeding_id, animal_id, food_type_id, staff_id, quantity, notes=None, feeding_date=None):
+        if feeding_date is None:
+            feeding_date = self._table.value(feeding_id, 3)
+        return self._table.update(feeding_id, (animal_id, food_type_id, staff_id, feeding_date, quantity, notes))
+
+
+class AnimalCareStore(_HistoryStore):
+    table = "AnimalCare"
+    date_column = "care_date"
+    history_columns = ("staffID", "care_type", "notes", "care_date")
+
+    def _output(self, row):
+        care_id, animal_id, staff_id, care_date, care_type, notes = row
+        animal = self._name("Animals", animal_id)
+        staff = self._staff_name(staff_id)
+        if animal is None or staff is None:
+            return None
+        return care_id, animal_id, animal, staff_id, staff, care_date, care_type, notes
+
+    def create(self, animal_id, staff_id, care_type, notes=None, care_date=None):
+        return self._table.insert((animal_id, staff_id, care_date or _today(), care_type, notes))
+
+    def update(self, care_id, animal_id, staff_id, care_type, notes=None, care_date=None):
+        if care_date is None:
+            care_date = self._table.value(care_id, 2)
+        return self._table.update(care_id, (animal_id, staff_id, care_date, care_type, notes))
+
+
+class MemoryDatabase:
+    """
+    In-memory zoo database exposing the CRUD classes as attributes,
+    e.g. MemoryDatabase().Animals.create("Leo", species_id).
+    """
+
+    def __init__(self):
+        self._tables = {name: _Table(name) for name in TABLES}
+        self.Species = SpeciesStore(self)
+        self.FoodTypes = FoodTypesStore(self)
+        self.Roles = RolesStore(self)
+        self.Animals = AnimalsStore(self)
+        self.FoodInventory = FoodInventoryStore(self)
+        self.Staff = StaffStore(self)
+        self.Feeding = FeedingStore(self)
+        self.AnimalCare = AnimalCareStore(self)
+
+    @classmethod
+    def load(cls, database=None, tables=tuple(TABLES)):
+        """
+        Copy tables of a SQLite database into a new in-memory database.
+
+        The tables are read in one read transaction, so they are consistent.
+
+        Args:
+            database (crud.ZooDatabase, optional): Source database, defaults to the default database
+            tables (tuple): Tables to copy; the others start empty
+
+        Returns:
+            MemoryDatabase: The loaded database
+        """
+        database = database or crud.get_database()
+        engine = cls()
+        conn = database.connect()
+        try:
+            conn.execute("BEGIN")
+            for name in tables:
+                table = engine._tables[name]
+                columns = [f"notes_text({column})" if column == "notes" else column for column in table.columns]
+                cursor = conn.execute(
+                    f"SELECT {table.key}, {', '.join(columns)} FROM {name} ORDER BY {table.key}")
+                while True:
+                    batch = cursor.fetchmany(10000)
+                    if not batch:
+                        break
+                    for row in batch:
+                        table.insert(row[1:], row[0], track=False)
+                table.loaded_max = max(table.next_id - 1, _highest_id(conn, name, table.key))
+                table.next_id = table.loaded_max + 1
+            conn.rollback()
+        finally:
+            conn.close()
+        return engine
+
+    def flush(self, database=None):
+        """
+        Write the records created, updated and deleted since the last load or flush.
+
+        All changes are written in one transaction with executemany(): created
+        and updated records are upserted by ID, then deleted ones are removed.
+        Updated Animals, Staff and FoodInventory records are only written if
+        the database still has the version they were loaded at; otherwise
+        nothing is written and ConflictError is raised.
+        If records were added to the database in the meantime, the IDs of the
+        records created in memory (and the references to them) are shifted
+        past the database's largest ID, both in the database and in memory.
+        Notes are compressed as configured by the target's notes_threshold.
+
+        Args:
+            database (crud.ZooDatabase, optional): Target database, defaults to the default database
+
+        Returns:
+            dict: Table -> (rows written, rows deleted, ID shift of the created records)
+
+        Raises:
+            crud.ConflictError: If an updated record changed in the database since the load
+        """
+        database = database or crud.get_database()
+        conn = database.connect()
+        shifts = {}
+        result = {}
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            for name, table in self._tables.items():
+                stored_max = _highest_id(conn, name, table.key)
+                created = any(record_id > table.loaded_max for record_id in table.dirty)
+                shifts[name] = max(0, stored_max - table.loaded_max) if created else 0
+
+            for name, table in self._tables.items():
+                references = [(table.positions[column], self._tables[parent].loaded_max, shifts[parent])
+                              for column, parent in FOREIGN_KEYS.get(name, {}).items() if shifts[parent]]
+                rows = [self._shifted(table.get(record_id), table.loaded_max, shifts[name], references)
+                        for record_id in sorted(table.dirty)]
+                if "notes" in table.positions:
+                    position = table.positions["notes"] + 1
+                    for row in rows:
+                        row[position] = compression.compress_notes(row[position], database.notes_threshold)
+                columns = (table.key, *table.columns)
+                checked = [row for row in rows if row[0] in table.base_versions]
+                if checked:
+                    rows = [row for row in rows if row[0] not in table.base_versions]
+                    self._update_versioned(conn, table, checked)
+                conn.executemany(
+                    f"""INSERT INTO {name} ({', '.join(columns)}) VALUES ({', '.join('?' for _ in columns)})
+                        ON CONFLICT({table.key}) DO UPDATE SET
+                        {', '.join(f'{column} = excluded.{column}' for column in table.columns)}""",
+                    rows
+                )
+                rows += checked
+                result[name] = (len(rows), len(table.deleted), shifts[name])
+
+            for name in reversed(list(self._tables)):
+                table = self._tables[name]
+                conn.executemany(f"DELETE FROM {name} WHERE {table.key} = ?",
+                                 [(record_id,) for record_id in sorted(table.deleted)])
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            conn.close()
+        database.invalidate(*self._tables)
+
+        for name, table in self._tables.items():
+            references = {table.positions[column]: (self._tables[parent].loaded_max, shifts[parent])
+                          for column, parent in FOREIGN_KEYS.get(name, {}).items() if shifts[parent]}
+            if shifts[name] or references or table.dirty or table.deleted:
+                table.rebuild(shifts[name], references)
+        for table in self._tables.values():
+            table.loaded_max = table.next_id - 1
+        return result
+
+    @staticmethod
+    def _update_versioned(conn, table, rows):
+        """
+        Write updated loaded records only if the database still has the version they were loaded at.
+
+        Raises:
+            crud.ConflictError: If a record was updated or deleted in the database since the load
+        """
+        cursor = conn.executemany(
+            f"""UPDATE {table.name} SET {', '.join(f'{column} = ?' for column in table.columns)}
+                WHERE {table.key} = ? AND version = ?""",
+            [(*row[1:], row[0], table.base_versions[row[0]]) for row in rows]
+        )
+        if cursor.rowcount == len(rows):
+            return
+        for row in rows:
+            stored = conn.execute(f"SELECT version FROM {table.name} WHERE {table.key} = ?", (row[0],)).fetchone()
+            actual = None if stored is None else stored[0]
+            if actual != table.base_versions[row[0]]:
+                raise crud.ConflictError(table.name, row[0], table.base_versions[row[0]], actual)
+
+    @staticmethod
+    def _shifted(row, loaded_max, shift, references):
+        # Apply the ID shift of the created records to a (key, *columns) row, as a list
+        row = list(row)
+        if shift and row[0] > loaded_max:
+            row[0] += shift
+        if references:
+            for position, parent_max, parent_shift in references:
+                if row[position + 1] > parent_max:
+                    row[position + 1] += parent_shift
+        return row
+
+
+if __name__ == "__main__":
+    import sys
+    import time
+
+    # Compare create throughput of the in-memory engine and SQLite
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    for label, target in (("memory", MemoryDatabase()), ("sqlite", crud.ZooDatabase(crud.MEMORY_DB_URI.format("engine")))):
+        if isinstance(target, crud.ZooDatabase):
+            target.initialize()
+        species_id = target.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = target.Animals.create("Leo", species_id)
+        food_type_id = target.FoodTypes.create("Meat", "kg")
+        staff_id = target.Staff.create("John", "Doe", target.Roles.create("Keeper", "Care"), "USA", 50000)
+        start = time.perf_counter()
+        for i in range(count):
+            target.Feeding.create(animal_id, food_type_id, staff_id, 1.5, None, "2025-01-01")
+        elapsed = time.perf_counter() - start
+        print(f"{label:<7} {count:,} Feeding.create in {elapsed:.2f}s ({count / elapsed:,.0f}/s)")
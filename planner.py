@@ -0,0 +1,194 @@
+"""
+Nutrition planner computing daily food requirements per animal and food type.
+
+Animals, their species and diet, and the feedings of a recent window are
+loaded as NumPy columns. The daily intake of every (animal, food type) pair
+is computed in one vectorized pass, animals without feeding history inherit
+the average of their species (or, failing that, of their diet), and the
+resulting plan is written to the NutritionPlan table with bulk inserts.
+"""
+import datetime
+
+import numpy as np
+
+import crud
+
+
+def load_inputs(database, first_day, last_day):
+    """
+    Load animals and the feedings of a day range as NumPy columns.
+
+    Args:
+        database (crud.ZooDatabase): Database to read
+        first_day (int): First day number of the window
+        last_day (int): Last day number of the window
+
+    Returns:
+        dict: "animal_ids", "species_ids", "diets" (per animal) and
+              "feeding_animal_ids", "feeding_food_type_ids", "feeding_quantities" (per feeding)
+    """
+    conn = database.acquire()
+    try:
+        animals = conn.execute(
+            """SELECT a.animalID, a.speciesID, COALESCE(s.diet, '')
+               FROM Animals a LEFT JOIN Species s ON a.speciesID = s.speciesID
+               ORDER BY a.animalID"""
+        ).fetchall()
+        feedings = conn.execute(
+            "SELECT animalID, foodTypeID, quantity FROM Feeding WHERE feeding_day BETWEEN ? AND ?",
+            (first_day, last_day)
+        ).fetchall()
+    finally:
+        database.release(conn)
+
+    animal_columns = list(zip(*animals)) or [(), (), ()]
+    feeding_columns = list(zip(*feedings)) or [(), (), ()]
+    return {
+        "animal_ids": np.array(animal_columns[0], dtype=np.int64),
+        "species_ids": np.array(animal_columns[1], dtype=np.int64),
+        "diets": np.array(animal_columns[2], dtype=object),
+        "feeding_animal_ids": np.array(feeding_columns[0], dtype=np.int64),
+        "feeding_food_type_ids": np.array(feeding_columns[1], dtype=np.int64),
+        "feeding_quantities": np.array(feeding_columns[2], dtype=np.float64),
+    }
+
+
+def _group_average(rates, has_history, groups):
+    """
+    Average the rate rows of the animals with history within each group.
+
+    Args:
+        rates (numpy.ndarray): Daily rates, one row per animal
+        has_history (numpy.ndarray): Boolean mask of animals with feedings
+        groups (numpy.ndarray): Group label of every animal
+
+    Returns:
+        tuple: (per-animal group average rows, per-animal mask of groups with history)
+    """
+    _, group_index = np.unique(groups, return_inverse=True)
+    group_count = group_index.max() + 1 if len(group_index) else 0
+    totals = np.zeros((group_count, rates.shape[1]))
+    np.add.at(totals, group_index[has_history], rates[has_history])
+    members = np.bincount(group_index[has_history], minlength=group_count)
+    averages = totals / np.maximum(members, 1)[:, None]
+    return averages[group_index], members[group_index] > 0
+
+
+def compute_requirements(inputs, days, margin=0.0):
+    """
+    Compute the daily requirement of every animal for every food type.
+
+    Args:
+        inputs (dict): Columns returned by load_inputs()
+        days (int): Length of the feeding window in days
+        margin (float): Safety margin added to every requirement (0.1 = +10%)
+
+    Returns:
+        tuple: (requirements matrix with one row per animal and one column per
+               food type, array of the food type IDs of the columns)
+    """
+    animal_ids = inputs["animal_ids"]
+    food_type_ids, food_index = np.unique(inputs["feeding_food_type_ids"], return_inverse=True)
+
+    # Feedings of animals that no longer exist are ignored
+    animal_index = np.searchsorted(animal_ids, inputs["feeding_animal_ids"])
+    known = animal_index < len(animal_ids)
+    known[known] = animal_ids[animal_index[known]] == inputs["feeding_animal_ids"][known]
+
+    rates = np.zeros((len(animal_ids), len(food_type_ids)))
+    np.add.at(rates, (animal_index[known], food_index[known]), inputs["feeding_quantities"][known])
+    rates /= days
+
+    # Animals without history get their species average, or their diet average
+    has_history = rates.sum(axis=1) > 0
+    species_rates, species_known = _group_average(rates, has_history, inputs["species_ids"])
+    diet_rates, _ = _group_average(rates, has_history, inputs["diets"])
+    fallback = np.where(species_known[:, None], species_rates, diet_rates)
+    requirements = np.where(has_history[:, None], rates, fallback)
+
+    return requirements * (1.0 + margin), food_type_ids
+
+
+def create_plan(plan_date=None, days=28, margin=0.0, database=None):
+    """
+    Compute the nutrition plan from the last days of feedings and store it.
+
+    Any plan previously stored for the same date is replaced.
+
+    Args:
+        plan_date (str, optional): Date of the plan (YYYY-MM-DD), defaults to today;
+            the window is the `days` days before it
+        days (int): Length of the feeding window in days
+        margin (float): Safety margin added to every requirement (0.1 = +10%)
+        database (crud.ZooDatabase, optional): Database to use, defaults to the default database
+
+    Returns:
+        dict: "plan_date", "animals", "rows" written and "totals" (foodTypeID -> daily quantity)
+    """
+    database = database or crud.get_database()
+    plan_date = plan_date or datetime.date.today().isoformat()
+    last_day = crud.day_number(plan_date) - 1
+
+    inputs = load_inputs(database, last_day - days + 1, last_day)
+    requirements, food_type_ids = compute_requirements(inputs, days, margin)
+
+    animal_rows, food_columns = np.nonzero(requirements)
+    rows = zip(
+        [plan_date] * len(animal_rows),
+        inputs["animal_ids"][animal_rows].tolist(),
+        food_type_ids[food_columns].tolist(),
+        requirements[animal_rows, food_columns].tolist(),
+    )
+    conn = database.acquire()
+    try:
+        conn.execute("DELETE FROM NutritionPlan WHERE plan_date = ?", (plan_date,))
+        conn.executemany(
+            "INSERT INTO NutritionPlan (plan_date, animalID, foodTypeID, daily_quantity) VALUES (?, ?, ?, ?)",
+            rows
+        )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        database.release(conn)
+
+    return {
+        "plan_date": plan_date,
+        "animals": len(inputs["animal_ids"]),
+        "rows": len(animal_rows),
+        "totals": dict(zip(food_type_ids.tolist(), requirements.sum(axis=0).tolist())),
+    }
+
+
+def read_plan(plan_date, database=None):
+    """
+    Read a stored nutrition plan.
+
+    Args:
+        plan_date (str): Date of the plan (YYYY-MM-DD)
+        database (crud.ZooDatabase, optional): Database to use, defaults to the default database
+
+    Returns:
+        list: Tuples (animalID, foodTypeID, daily_quantity) ordered by animal and food type
+    """
+    database = database or crud.get_database()
+    return list(database.stream(
+        """SELECT animalID, foodTypeID, daily_quantity FROM NutritionPlan
+           WHERE plan_date = ? ORDER BY animalID, foodTypeID""",
+        (plan_date,), name="planner.read_plan"
+    ))
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compute the daily nutrition plan")
+    parser.add_argument("--date", help="Plan date (YYYY-MM-DD), defaults to today")
+    parser.add_argument("--days", type=int, default=28, help="Feeding window in days")
+    parser.add_argument("--margin", type=float, default=0.0, help="Safety margin, e.g. 0.1 for +10%%")
+    args = parser.parse_args()
+    summary = create_plan(args.date, args.days, args.margin)
+    print(f"Plan {summary['plan_date']}: {summary['rows']} rows for {summary['animals']} animals")
+    for food_type_id, quantity in summary["totals"].items():
+        print(f"  food type {food_type_id}: {quantity:.2f} per day")
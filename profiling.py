@@ -0,0 +1,294 @@
+"""
+Opt-in profiling of the CRUD methods run through crud.transaction.
+
+A sample of the calls is run under cProfile and, optionally, tracemalloc.
+Time, call counts and allocations are aggregated per CRUD method
+("Animals.read", "Feeding.create", ...) and can be reported or dumped at any
+time without restarting the process. Unsampled calls only pay for one random
+number, and nothing at all while profiling is disabled.
+
+Enable it from code:
+
+    import profiling
+    profiling.enable(sample_rate=0.05, memory=True)
+    ...
+    print(profiling.report())
+    profiling.dump("profiles/")
+
+or through the environment before the process starts:
+
+    ZOO_PROFILE=0.05 ZOO_PROFILE_MEMORY=1 ZOO_PROFILE_DIR=profiles python service.py
+
+With ZOO_PROFILE set, SIGUSR1 dumps the aggregated profiles to ZOO_PROFILE_DIR.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import signal
+import threading
+import time
+import tracemalloc
+
+
+class Profiler:
+    """Aggregates sampled cProfile and tracemalloc measurements per method"""
+
+    def __init__(self, sample_rate=1.0, memory=False):
+        """
+        Args:
+            sample_rate (float): Fraction of the calls profiled, between 0 and 1
+            memory (bool): Also measure allocations with tracemalloc
+        """
+        if not 0 <= sample_rate <= 1:
+            raise ValueError("sample_rate must be between 0 and 1")
+        self.sample_rate = sample_rate
+        self.memory = memory
+        self._lock = threading.Lock()
+        # Held while a sampled call runs under cProfile
+        self._profiling = threading.Lock()
+        self._local = threading.local()
+        self._methods = {}
+        self._started_tracemalloc = False
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracemalloc = True
+
+    def should_sample(self):
+        """
+        Decide whether the next call is profiled.
+
+        Returns:
+            bool: True for a sampled call; nested calls are never sampled
+        """
+        return random.random() < self.sample_rate and not getattr(self._local, "active", False)
+
+    def call(self, name, func, *args, **kwargs):
+        """
+        Run a call under the profiler and add its measurements to a method.
+
+        Only one call is profiled at a time; the call runs unprofiled while
+        another one is being profiled or when cProfile cannot be enabled.
+
+        Args:
+            name (str): Method name the measurements are attributed to
+            func: Function to call
+            *args, **kwargs: Arguments of the call
+
+        Returns:
+            The return value of func
+        """
+        # cProfile allows one active profiler per process, so sampled calls take turns;
+        # a call arriving while another is profiled runs unprofiled instead of waiting
+        if not self._profiling.acquire(blocking=False):
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler (e.g. a debugger or an outer cProfile run) is active
+            self._profiling.release()
+            return func(*args, **kwargs)
+        self._local.active = True
+        memory_before = tracemalloc.get_traced_memory()[0] if self.memory else 0
+        if self.memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            profile.disable()
+            seconds = time.perf_counter() - start
+            current, peak = tracemalloc.get_traced_memory() if self.memory else (0, 0)
+            self._local.active = False
+            self._profiling.release()
+            stats = pstats.Stats(profile)
+            with self._lock:
+                entry = self._methods.get(name)
+                if entry is None:
+                    entry = self._methods[name] = {
+                        "samples": 0, "seconds": 0.0, "allocated_bytes": 0, "peak_bytes": 0, "stats": stats,
+                    }
+                else:
+                    entry["stats"].add(stats)
+                entry["samples"] += 1
+                entry["seconds"] += seconds
+                entry["allocated_bytes"] += current - memory_before
+                entry["peak_bytes"] = max(entry["peak_bytes"], peak - memory_before)
+
+    def summary(self):
+        """
+        Get the aggregated measurements of every sampled method.
+
+        Returns:
+            dict: Method name -> {"samples", "seconds", "mean_ms", "allocated_bytes", "peak_bytes"}
+        """
+        with self._lock:
+            return self._summary()
+
+    def _summary(self):
+        """Build the summary; the caller holds the lock."""
+        return {
+            name: {
+                "samples": entry["samples"],
+                "seconds": entry["seconds"],
+                "mean_ms": entry["seconds"] / entry["samples"] * 1000,
+                "allocated_bytes": entry["allocated_bytes"],
+                "peak_bytes": entry["peak_bytes"],
+            }
+            for name, entry in self._methods.items()
+        }
+
+    def report(self, limit=15, sort="cumulative"):
+        """
+        Format the summary and the hottest functions of every method.
+
+        Args:
+            limit (int): Number of functions listed per method
+            sort (str): pstats sort key, e.g. "cumulative" or "tottime"
+
+        Returns:
+            str: Report text, methods ordered by total sampled time
+        """
+        output = io.StringIO()
+        # One snapshot, so a concurrent reset() or sample cannot change what is printed
+        with self._lock:
+            summary = self._summary()
+            profiles = {}
+            for name, entry in self._methods.items():
+                profiles[name] = pstats.Stats(stream=output)
+                profiles[name].add(entry["stats"])
+        output.write(f"{'method':<32} {'samples':>8} {'total s':>9} {'mean ms':>9} {'alloc KiB':>10} {'peak KiB':>10}\n")
+        ordered = sorted(summary.items(), key=lambda item: item[1]["seconds"], reverse=True)
+        for name, entry in ordered:
+            output.write(f"{name:<32} {entry['samples']:>8} {entry['seconds']:>9.3f} {entry['mean_ms']:>9.2f} "
+                         f"{entry['allocated_bytes'] / 1024:>10.1f} {entry['peak_bytes'] / 1024:>10.1f}\n")
+        for name, _ in ordered:
+            output.write(f"\n=== {name} ===\n")
+            profiles[name].sort_stats(sort).print_stats(limit)
+        return output.getvalue()
+
+    def dump(self, directory):
+        """
+        Write the report and one pstats file per method to a directory.
+
+        The .prof files can be opened with pstats or any cProfile viewer.
+
+        Args:
+            directory (str): Output directory, created if needed
+
+        Returns:
+            list: Paths of the written files
+        """
+        os.makedirs(directory, exist_ok=True)
+        paths = []
+        with self._lock:
+            for name, entry in self._methods.items():
+                path = os.path.join(directory, re.sub(r"[^\w.-]", "_", name) + ".prof")
+                entry["stats"].dump_stats(path)
+                paths.append(path)
+        report_path = os.path.join(directory, "report.txt")
+        with open(report_path, "w", encoding="utf-8") as file:
+            file.write(self.report())
+        return paths + [report_path]
+
+    def reset(self):
+        """
+        Discard the measurements collected so far.
+        """
+        with self._lock:
+            self._methods.clear()
+
+    def close(self):
+        """
+        Stop tracemalloc if this profiler started it.
+        """
+        if self._started_tracemalloc:
+            tracemalloc.stop()
+            self._started_tracemalloc = False
+
+
+# Profiler used by crud.transaction, None while profiling is disabled
+current = None
+
+
+def enable(sample_rate=1.0, memory=False):
+    """
+    Start profiling CRUD calls, replacing any active profiler.
+
+    Args:
+        sample_rate (float): Fraction of the calls profiled
+        memory (bool): Also measure allocations with tracemalloc
+
+    Returns:
+        Profiler: The active profiler
+    """
+    global current
+    disable()
+    current = Profiler(sample_rate, memory)
+    return current
+
+
+def disable():
+    """
+    Stop profiling; the measurements of the previous profiler are discarded.
+    """
+    global current
+    profiler, current = current, None
+    if profiler is not None:
+        profiler.close()
+
+
+def _active():
+    if current is None:
+        raise RuntimeError("Profiling is not enabled")
+    return current
+
+
+def summary():
+    """
+    Get the per-method measurements of the active profiler (see Profiler.summary).
+    """
+    return _active().summary()
+
+
+def report(limit=15, sort="cumulative"):
+    """
+    Format the report of the active profiler (see Profiler.report).
+    """
+    return _active().report(limit, sort)
+
+
+def dump(directory):
+    """
+    Dump the profiles of the active profiler to a directory (see Profiler.dump).
+    """
+    return _active().dump(directory)
+
+
+def _enable_from_environment():
+    sample_rate = os.environ.get("ZOO_PROFILE")
+    if not sample_rate:
+        return
+    enable(float(sample_rate), os.environ.get("ZOO_PROFILE_MEMORY") == "1")
+    directory = os.environ.get("ZOO_PROFILE_DIR", "profiles")
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: _dump_in_background(directory))
+
+
+def _dump_in_background(directory):
+    """
+    Dump the active profiler from a new thread.
+
+    A signal handler runs between two bytecodes of the main thread, which
+    may hold the profiler lock at that moment; the dump waits for it in
+    another thread instead of deadlocking.
+    """
+    profiler = current
+    if profiler is not None:
+        threading.Thread(target=profiler.dump, args=(directory,), name="profile-dump", daemon=True).start()
+
+
+_enable_from_environment()
@@ -0,0 +1,393 @@
+"""
+HTTP/JSON service over the CRUD classes of the Zoo Management System.
+
+Built on the standard library only: a ThreadingHTTPServer speaking HTTP/1.1
+with keep-alive, one thread per client connection, and every request run on
+a pooled connection of one shared ZooDatabase. Endpoints:
+
+    GET    /                      -> Available resources
+    GET    /metrics               -> Request latency per route and database call statistics
+    GET    /<resource>            -> Page of records, ?limit=&after=<last id>&<filters>
+    GET    /<resource>/<id>       -> One record
+    POST   /<resource>            -> Create a record from a JSON object of create() arguments
+    PUT    /<resource>/<id>       -> Update a record from a JSON object of update() arguments
+    DELETE /<resource>/<id>       -> Delete a record
+
+Filters use the find() syntax, e.g. /feeding?staffID=3&feeding_date__gte=2025-01-01;
+"in", "not_in" and "between" values are comma-separated. Lists are streamed
+with chunked transfer encoding. Responses of the lookup tables (species,
+food-types, roles) carry an ETag and answer If-None-Match with 304.
+"""
+import collections
+import hashlib
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import crud
+
+
+# URL name -> (CRUD class, name of its update method)
+RESOURCES = {
+    "species": (crud.Species, "update"),
+    "animals": (crud.Animals, "update"),
+    "food-types": (crud.FoodTypes, "update"),
+    "food-inventory": (crud.FoodInventory, "update_stock"),
+    "roles": (crud.Roles, "update"),
+    "staff": (crud.Staff, "update"),
+    "feeding": (crud.Feeding, "update"),
+    "animal-care": (crud.AnimalCare, "update"),
+}
+
+# Resources whose responses are cached and validated with ETags
+LOOKUP_RESOURCES = ("species", "food-types", "roles")
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+class HTTPError(Exception):
+    """Error answered with an HTTP status and a JSON error message"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+class LatencyMetrics:
+    """Thread-safe request latencies per route, keeping the most recent samples"""
+
+    def __init__(self, samples=1024):
+        """
+        Args:
+            samples (int): Number of recent latencies kept per route for the percentiles
+        """
+        self.samples = samples
+        self._lock = threading.Lock()
+        self._routes = {}
+
+    def record(self, route, seconds, failed):
+        """
+        Record one request.
+
+        Args:
+            route (str): Route name, e.g. "GET /animals/{id}"
+            seconds (float): Request duration
+            failed (bool): True if the response status was 400 or higher
+        """
+        with self._lock:
+            entry = self._routes.get(route)
+            if entry is None:
+                entry = self._routes[route] = {
+                    "requests": 0, "errors": 0, "seconds": 0.0, "max": 0.0,
+                    "recent": collections.deque(maxlen=self.samples),
+                }
+            entry["requests"] += 1
+            entry["errors"] += failed
+            entry["seconds"] += seconds
+            entry["max"] = max(entry["max"], seconds)
+            entry["recent"].append(seconds)
+
+    def report(self):
+        """
+        Summarize the recorded requests.
+
+        Returns:
+            dict: Route -> {"requests", "errors", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "max_ms"}
+        """
+        with self._lock:
+            routes = {route: dict(entry, recent=sorted(entry["recent"])) for route, entry in self._routes.items()}
+        report = {}
+        for route, entry in routes.items():
+            recent = entry["recent"]
+
+            def percentile(fraction):
+                return recent[min(int(fraction * len(recent)), len(recent) - 1)] * 1000
+
+            report[route] = {
+                "requests": entry["requests"],
+                "errors": entry["errors"],
+                "mean_ms": entry["seconds"] / entry["requests"] * 1000,
+                "p50_ms": percentile(0.50),
+                "p95_ms": percentile(0.95),
+                "p99_ms": percentile(0.99),
+                "max_ms": entry["max"] * 1000,
+            }
+        return report
+
+
+def _filters(query):
+    """Turn query string parameters into find() filters."""
+    filters = {}
+    for name, value in query.items():
+        operator = name.rsplit("__", 1)[1] if "__" in name else "eq"
+        if operator in ("in", "not_in"):
+            value = value.split(",")
+        elif operator == "between":
+            value = tuple(value.split(",", 1))
+        elif operator == "isnull":
+            value = value.lower() in ("1", "true", "yes")
+        filters[name] = value
+    return filters
+
+
+class ZooRequestHandler(BaseHTTPRequestHandler):
+    """Request handler dispatching JSON requests to the CRUD classes"""
+
+    protocol_version = "HTTP/1.1"
+    server_version = "ZooService/1.0"
+
+    def log_message(self, format, *args):
+        if not self.server.quiet:
+            super().log_message(format, *args)
+
+    def do_GET(self):
+        self._handle("GET")
+
+    def do_POST(self):
+        self._handle("POST")
+
+    def do_PUT(self):
+        self._handle("PUT")
+
+    def do_DELETE(self):
+        self._handle("DELETE")
+
+    def _handle(self, method):
+        start = time.perf_counter()
+        url = urllib.parse.urlsplit(self.path)
+        parts = [part for part in url.path.split("/") if part]
+        route = f"{method} /{'/'.join(parts[:1])}{'/{id}' if len(parts) > 1 else ''}"
+        status = 500
+        try:
+            status = self._dispatch(method, parts, dict(urllib.parse.parse_qsl(url.query)))
+        except HTTPError as e:
+            status = self._send_json(e.status, {"error": str(e)})
+        except crud.ConflictError as e:
+            status = self._send_json(409, {"error": str(e), "version": e.actual_version})
+        except (ValueError, TypeError) as e:
+            status = self._send_json(400, {"error": str(e)})
+        except Exception as e:
+            self._send_json(500, {"error": f"Internal error: {e}"})
+            raise
+        finally:
+            if parts and parts[0] not in RESOURCES and parts[0] != "metrics":
+                route = f"{method} (unknown)"
+            self.server.metrics.record(route, time.perf_counter() - start, status >= 400)
+
+    def _dispatch(self, method, parts, query):
+        if not parts:
+            if method != "GET":
+                raise HTTPError(405, "Method not allowed")
+            return self._send_json(200, {"resources": sorted(RESOURCES)})
+        if parts == ["metrics"]:
+            if method != "GET":
+                raise HTTPError(405, "Method not allowed")
+            return self._send_json(200, {
+                "requests": self.server.metrics.report(),
+                "database": self.server.database.statistics(),
+            })
+        if parts[0] not in RESOURCES or len(parts) > 2:
+            raise HTTPError(404, f"Unknown resource: /{'/'.join(parts)}")
+
+        resource = parts[0]
+        cls, update_method = RESOURCES[resource]
+        repository = getattr(self.server.database, cls.__name__)
+        record_id = None
+        if len(parts) == 2:
+            try:
+                record_id = int(parts[1])
+            except ValueError:
+                raise HTTPError(404, f"Invalid record ID: {parts[1]}")
+
+        if method == "GET" and record_id is None:
+            if resource in LOOKUP_RESOURCES:
+                return self._send_cached(resource, repository, query)
+            return self._send_page(repository, query)
+        if method == "GET":
+            if resource in LOOKUP_RESOURCES:
+                return self._send_cached(resource, repository, query, record_id)
+            return self._send_json(200, self._record(repository, record_id))
+        if method == "POST" and record_id is None:
+            new_id = repository.create(**self._read_body())
+            if new_id is None:
+                raise HTTPError(400, "Could not create the record")
+            return self._send_json(201, self._record(repository, new_id))
+        if method == "PUT" and record_id is not None:
+            self._record(repository, record_id)
+            if not getattr(repository, update_method)(record_id, **self._read_body()):
+                raise HTTPError(400, "Could not update the record")
+            return self._send_json(200, self._record(repository, record_id))
+        if method == "DELETE" and record_id is not None:
+            if not repository.delete(record_id):
+                raise HTTPError(404, f"Record {record_id} not found")
+            return self._send_json(200, {"deleted": record_id})
+        raise HTTPError(405, "Method not allowed")
+
+    @staticmethod
+    def _as_dict(repository, row):
+        return dict(zip((column[0] for column in repository._columns), row))
+
+    def _record(self, repository, record_id):
+        """Read one record as a dict, raising 404 if it does not exist."""
+        key = repository._columns[0][0]
+        row = next(iter(repository.find(**{key: record_id})), None)
+        if row is None:
+            raise HTTPError(404, f"Record {record_id} not found")
+        return self._as_dict(repository, row)
+
+    def _read_body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except json.JSONDecodeError as e:
+            raise HTTPError(400, f"Invalid JSON: {e}")
+        if not isinstance(body, dict):
+            raise HTTPError(400, "Request body must be a JSON object")
+        return body
+
+    def _page_query(self, repository, query):
+        """Split a list request into find() arguments."""
+        query = dict(query)
+        try:
+            limit = int(query.pop("limit", DEFAULT_PAGE_SIZE))
+            after = query.pop("after", None)
+            after = int(after) if after is not None else None
+        except ValueError:
+            raise HTTPError(400, "limit and after must be integers")
+        if not 0 < limit <= MAX_PAGE_SIZE:
+            raise HTTPError(400, f"limit must be between 1 and {MAX_PAGE_SIZE}")
+        key = repository._columns[0][0]
+        filters = _filters(query)
+        if after is not None:
+            filters[f"{key}__gt"] = after
+        return key, limit, filters
+
+    def _send_page(self, repository, query):
+        """Stream one page of records with chunked transfer encoding."""
+        key, limit, filters = self._page_query(repository, query)
+        rows = repository.find(order_by=key, limit=limit, **filters)
+        # Fetch the first row before the headers, so query errors still get a status
+        first = next(rows, None)
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            self._write_chunk(b'{"items": [')
+            count = 0
+            last_id = None
+            batch = []
+            row = first
+            while row is not None:
+                batch.append(json.dumps(self._as_dict(repository, row)))
+                count += 1
+                last_id = row[0]
+                if len(batch) == 100:
+                    self._write_chunk((", " if count > len(batch) else "").encode() + ", ".join(batch).encode())
+                    batch = []
+                row = next(rows, None)
+            if batch:
+                self._write_chunk((", " if count > len(batch) else "").encode() + ", ".join(batch).encode())
+            next_after = last_id if count == limit else None
+            self._write_chunk(f'], "next": {json.dumps(next_after)}}}'.encode())
+            self._write_chunk(b"")
+        except Exception as e:
+            # The status line is already sent: end the stream without its last chunk,
+            # so the client sees a truncated response instead of a second one
+            self.log_error("List stream aborted after the headers: %r", e)
+            self.close_connection = True
+            return 500
+        finally:
+            rows.close()
+        return 200
+
+    def _send_cached(self, resource, repository, query, record_id=None):
+        """Answer a lookup table request from the cache, honoring If-None-Match."""
+        if record_id is None:
+            key, limit, filters = self._page_query(repository, query)
+
+            def compute():
+                items = [self._as_dict(repository, row)
+                         for row in repository.find(order_by=key, limit=limit, **filters)]
+                next_after = items[-1][key] if len(items) == limit else None
+                return {"items": items, "next": next_after}
+        else:
+            def compute():
+                return self._record(repository, record_id)
+
+        def encode():
+            body = json.dumps(compute()).encode()
+            return body, f'"{hashlib.sha1(body).hexdigest()[:20]}"'
+
+        cache_key = ("service", resource, record_id, tuple(sorted(query.items())))
+        body, etag = self.server.database.cached(cache_key, (RESOURCES[resource][0].__name__,), encode)
+
+        if_none_match = self.headers.get("If-None-Match", "")
+        if etag in (tag.strip() for tag in if_none_match.split(",")) or if_none_match.strip() == "*":
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return 304
+        return self._send_body(200, body, {"ETag": etag, "Cache-Control": "no-cache"})
+
+    def _send_json(self, status, payload):
+        return self._send_body(status, json.dumps(payload).encode())
+
+    def _send_body(self, status, body, headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+        return status
+
+    def _write_chunk(self, data):
+        self.wfile.write(f"{len(data):X}\r\n".encode() + data + b"\r\n")
+
+
+class ZooServer(ThreadingHTTPServer):
+    """HTTP server sharing one ZooDatabase and its connection pool between request threads"""
+
+    daemon_threads = True
+
+    def __init__(self, address=("127.0.0.1", 8080), database=None, quiet=False):
+        """
+        Create the server; call serve_forever() to start answering requests.
+
+        Args:
+            address (tuple): (host, port) to listen on; port 0 picks a free port
+            database (crud.ZooDatabase, optional): Database to serve, defaults to the default database
+            quiet (bool): Do not log every request to stderr
+        """
+        super().__init__(address, ZooRequestHandler)
+        self.database = database or crud.get_database()
+        self.metrics = LatencyMetrics()
+        self.quiet = quiet
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Serve the zoo database over HTTP/JSON")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--pool-size", type=int, default=8, help="Pooled database connections")
+    parser.add_argument("--quiet", action="store_true", help="Do not log every request")
+    args = parser.parse_args()
+
+    server = ZooServer((args.host, args.port), crud.ZooDatabase(pool_size=args.pool_size), args.quiet)
+    print(f"Serving on http://{args.host}:{server.server_address[1]}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        server.database.close()
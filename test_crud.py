@@ -1,140 +1,86 @@
 import unittest
+import unittest.mock
 import sqlite3
 import os
 import datetime
+import glob
+import time
+import threading
+import json
+import http.client
+import socket
+import contextlib
+import csv
+import io
+import tempfile
 
 # Import the module to test
+import crud
 from crud import (
     Species, Animals, FoodTypes, FoodInventory,
-    Roles, Staff, Feeding, get_connection
+    Roles, Staff, Feeding, AnimalCare, ChangeLog, ZooDatabase, get_connection, snapshot, restore
 )
+import archive
+import backup
+import bench
+import cli
+import compression
+import create_database_if_not_exist
+import loadtest
+import memory_engine
+import profiling
+import service
+from create_database_if_not_exist import initialize_database
+
+# The planner and the forecast need NumPy, an optional dependency
+try:
+    import numpy
+except ImportError:
+    numpy = None
+else:
+    import forecast
+    import planner
+
+class ZooSchemaTestCase(unittest.TestCase):
+    """
+    Base class for tests running against a shared in-memory database with the full schema
+    """
 
-class TestZooManagementSystem(unittest.TestCase):
     @classmethod
     def setUpClass(cls):
         """
-        Set up test database before running tests
+        Create the in-memory test database and snapshot it while empty
         """
-        # Use a separate test database
-        cls.test_db_name = "test_zoo.db"
-        os.environ['DB_NAME'] = cls.test_db_name
-
-        # Create test database and tables
-        cls._create_test_database()
-
-    @classmethod
-    def _create_test_database(cls):
-        """
-        Create test database with necessary tables
-        """
-        conn = sqlite3.connect(cls.test_db_name)
-        cursor = conn.cursor()
-
-        # Create Species table
-        cursor.execute('''
-        CREATE TABLE Species (
-            speciesID INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            habitat TEXT,
-            diet TEXT
-        )''')
-
-        # Create Animals table
-        cursor.execute('''
-        CREATE TABLE Animals (
-            animalID INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            speciesID INTEGER,
-            gender TEXT,
-            birthdate TEXT,
-            health_status TEXT,
-            FOREIGN KEY(speciesID) REFERENCES Species(speciesID)
-        )''')
-
-        # Create FoodTypes table
-        cursor.execute('''
-        CREATE TABLE FoodTypes (
-            foodTypeID INTEGER PRIMARY KEY,
-            name TEXT NOT NULL,
-            unit TEXT,
-            storage_requirements TEXT
-        )''')
-
-        # Create FoodInventory table
-        cursor.execute('''
-        CREATE TABLE FoodInventory (
-            inventoryID INTEGER PRIMARY KEY,
-            foodTypeID INTEGER,
-            quantity REAL,
-            expiration_date TEXT,
-            last_updated TEXT,
-            FOREIGN KEY(foodTypeID) REFERENCES FoodTypes(foodTypeID)
-        )''')
-
-        # Create Roles table
-        cursor.execute('''
-        CREATE TABLE Roles (
-            roleID INTEGER PRIMARY KEY,
-            title TEXT NOT NULL,
-            department TEXT,
-            description TEXT
-        )''')
-
-        # Create Staff table
-        cursor.execute('''
-        CREATE TABLE Staff (
-            staffID INTEGER PRIMARY KEY,
-            firstName TEXT NOT NULL,
-            lastName TEXT NOT NULL,
-            roleID INTEGER,
-            country TEXT,
-            hire_date TEXT,
-            salary REAL,
-            FOREIGN KEY(roleID) REFERENCES Roles(roleID)
-        )''')
-
-        # Create Feeding table
-        cursor.execute('''
-        CREATE TABLE Feeding (
-            feedingID INTEGER PRIMARY KEY,
-            animalID INTEGER,
-            foodTypeID INTEGER,
-            staffID INTEGER,
-            quantity REAL,
-            notes TEXT,
-            feeding_date TEXT,
-            FOREIGN KEY(animalID) REFERENCES Animals(animalID),
-            FOREIGN KEY(foodTypeID) REFERENCES FoodTypes(foodTypeID),
-            FOREIGN KEY(staffID) REFERENCES Staff(staffID)
-        )''')
-
-        conn.commit()
-        conn.close()
+        crud.use_memory_database(cls.__name__)
+        cls.empty_snapshot = snapshot()
 
     @classmethod
     def tearDownClass(cls):
         """
-        Clean up test database after tests
+        Discard the in-memory test database
         """
-        # Remove test database file
-        if os.path.exists(cls.test_db_name):
-            os.remove(cls.test_db_name)
+        cls.empty_snapshot.close()
+        crud.close_memory_database()
 
     def setUp(self):
         """
-        Reset the necessary tables before each test
+        Reset every table to the empty snapshot before each test
         """
-        conn = get_connection()
-        cursor = conn.cursor()
+        restore(self.empty_snapshot)
 
-        # Clear tables
-        tables = ['Species', 'Animals', 'FoodTypes', 'FoodInventory', 'Roles', 'Staff', 'Feeding']
-        for table in tables:
-            cursor.execute(f'DELETE FROM {table}')
+    def create_feeding_fixture(self):
+        """
+        Create one species, animal, food type, role and staff member
+        """
+        species_id = Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = Animals.create("Leo", species_id, "Male", "2015-01-01")
+        food_type_id = FoodTypes.create("Meat", "kg")
+        role_id = Roles.create("Zookeeper", "Animal Care")
+        staff_id = Staff.create("John", "Doe", role_id, "USA", 50000, "2020-01-01")
+        return species_id, animal_id, food_type_id, role_id, staff_id
 
-        conn.commit()
-        conn.close()
 
+class TestZooManagementSystem(ZooSchemaTestCase):
     def test_species_crud(self):
         """
         Test CRUD operations for Species class
@@ -351,5 +297,1191 @@ class TestZooManagementSystem(unittest.TestCase):
         deleted_feeding = Feeding.read(feeding_id)
         self.assertIsNone(deleted_feeding)
 
+    def test_animal_care_crud(self):
+        """
+        Test CRUD operations for AnimalCare class
+        """
+        _, animal_id, _, _, staff_id = self.create_feeding_fixture()
+
+        # Create
+        care_id = AnimalCare.create(animal_id, staff_id, "Checkup", "Healthy weight", "2024-03-01")
+        self.assertIsNotNone(care_id)
+
+        # Read
+        care = AnimalCare.read(care_id)
+        self.assertEqual(care, (care_id, animal_id, "Leo", staff_id, "John Doe", "2024-03-01", "Checkup", "Healthy weight"))
+
+        # Update
+        self.assertTrue(AnimalCare.update(care_id, animal_id, staff_id, "Vaccination"))
+        updated_care = AnimalCare.read(care_id)
+        self.assertEqual(updated_care[5], "2024-03-01")
+        self.assertEqual(updated_care[6], "Vaccination")
+        self.assertIsNone(updated_care[7])
+
+        # Read All
+        self.assertEqual(AnimalCare.read_all(), [updated_care])
+
+        # Delete
+        self.assertTrue(AnimalCare.delete(care_id))
+        self.assertIsNone(AnimalCare.read(care_id))
+
+
+class TestFind(ZooSchemaTestCase):
+    def test_find_filters_orders_and_limits(self):
+        """
+        Test equality, range and IN filters on find()
+        """
+        species_id, animal_id, food_type_id, _, staff_id = self.create_feeding_fixture()
+        sick_id = Animals.create("Kiara", species_id, "Female", health_status="Sick")
+        other_species_id = Species.create("Tiger", "Forest", "Carnivore")
+        Animals.create("Shere Khan", other_species_id, "Male", health_status="Sick")
+
+        self.assertEqual(
+            list(Animals.find(speciesID=species_id, health_status="Sick")),
+            [Animals.read(sick_id)]
+        )
+        self.assertEqual(
+            [row[1] for row in Animals.find(health_status__in=["Sick", "Good"], order_by="-name", limit=2)],
+            ["Shere Khan", "Leo"]
+        )
+        self.assertEqual([row[1] for row in Animals.find(species_name="Tiger")], ["Shere Khan"])
+        self.assertEqual(list(Animals.find(gender__isnull=True)), [])
+
+        for day in range(1, 6):
+            Feeding.create(animal_id, food_type_id, staff_id, float(day), feeding_date=f"2024-03-0{day}")
+        feedings = Feeding.find(staffID=staff_id, feeding_date__between=("2024-03-02", "2024-03-04"),
+                                order_by="feeding_date")
+        self.assertEqual([row[7] for row in feedings], [2.0, 3.0, 4.0])
+        self.assertEqual(len(list(Feeding.find(quantity__gte=4, animalID__in=[]))), 0)
+
+        # Date ranges compare whole days through the day-number columns
+        Feeding.create(animal_id, food_type_id, staff_id, 9.0, feeding_date="2024-03-04 18:30:00")
+        self.assertEqual(Feeding.count(feeding_date__lte="2024-03-04"), 5)
+        self.assertEqual(Feeding.count(feeding_date__gt=datetime.date(2024, 3, 4)), 1)
+        self.assertEqual(crud.day_number("2000-01-01"), 2451545)
+
+        with self.assertRaises(ValueError):
+            Animals.find(weight__gt=10)
+        with self.assertRaises(ValueError):
+            Animals.find(name__matches="Leo")
+
+    def test_projection_skips_unneeded_joins(self):
+        """
+        Test that columns= only joins what it needs and include= resolves names from the dimension cache
+        """
+        _, animal_id, food_type_id, _, staff_id = self.create_feeding_fixture()
+        for quantity in (1.0, 2.0):
+            Feeding.create(animal_id, food_type_id, staff_id, quantity, feeding_date="2024-03-01")
+
+        with unittest.mock.patch.object(ZooDatabase, "stream", autospec=True, side_effect=ZooDatabase.stream) as stream:
+            rows = list(Feeding.find(columns=["feedingID", "quantity"], quantity__gt=1))
+            self.assertNotIn("JOIN", stream.call_args[0][1])
+            self.assertEqual([row[1] for row in rows], [2.0])
+
+            calls = stream.call_count
+            rows = list(Feeding.find(include=["animal_name", "food_type", "staff_name"], order_by="quantity"))
+            self.assertEqual(rows, Feeding.read_all())
+            self.assertNotIn("JOIN", stream.call_args_list[calls][0][1])
+
+            rows = list(Feeding.find(columns=["quantity", "food_type"], food_type="Meat"))
+            self.assertIn("JOIN FoodTypes", stream.call_args[0][1])
+            self.assertNotIn("JOIN Animals", stream.call_args[0][1])
+            self.assertEqual(rows, [(1.0, "Meat"), (2.0, "Meat")])
+
+        # Writes through the database invalidate the dimension cache
+        FoodTypes.update(food_type_id, "Fish", "kg")
+        self.assertEqual(list(Feeding.find(columns=["quantity"], include=["food_type"]))[0], (1.0, "Fish"))
+        self.assertEqual(list(Staff.find(columns=["lastName"], include=["role_title"])), [("Doe", "Zookeeper")])
+        with self.assertRaises(ValueError):
+            Feeding.find(include=["quantity"])
+        with self.assertRaises(ValueError):
+            Feeding.find(columns=["weight"])
+
+    def test_read_many_keeps_order_and_reports_missing(self):
+        """
+        Test batch reads by ID with IN lists and with the json_each join for large sets
+        """
+        species_id, animal_id, food_type_id, role_id, staff_id = self.create_feeding_fixture()
+        other_id = Animals.create("Nala", species_id, "Female")
+        feeding_id = Feeding.create(animal_id, food_type_id, staff_id, 2.0, feeding_date="2024-03-01")
+
+        records, missing = Animals.read_many([other_id, 999, animal_id, other_id])
+        self.assertEqual(records, [Animals.read(other_id), Animals.read(animal_id), Animals.read(other_id)])
+        self.assertEqual(missing, [999])
+        for cls, record_id in ((Species, species_id), (FoodTypes, food_type_id), (Roles, role_id),
+                               (Staff, staff_id), (Feeding, feeding_id)):
+            self.assertEqual(cls.read_many([record_id]), ([cls.read(record_id)], []))
+        self.assertEqual(Animals.read_many([]), ([], []))
+
+        records, missing = Animals.read_many([other_id, 999], columns=["name"], include=["species_name"])
+        self.assertEqual((records, missing), ([("Nala", "Lion")], [999]))
+
+        many_ids = list(range(crud.READ_MANY_IN_LIMIT + 100, 0, -1))
+        records, missing = Animals.read_many(many_ids)
+        self.assertEqual([row[0] for row in records], [other_id, animal_id])
+        self.assertEqual(len(missing), len(many_ids) - 2)
+
+
+class TestAggregates(ZooSchemaTestCase):
+    def test_count_exists_and_aggregates(self):
+        """
+        Test that counts and aggregates are computed in SQL
+        """
+        _, animal_id, food_type_id, _, staff_id = self.create_feeding_fixture()
+        for quantity in (2.0, 3.5, 4.5):
+            Feeding.create(animal_id, food_type_id, staff_id, quantity, feeding_date="2024-03-01")
+
+        self.assertEqual(Feeding.count(), 3)
+        self.assertEqual(Feeding.count(quantity__gt=3), 2)
+        self.assertEqual(Feeding.sum("quantity"), 10.0)
+        self.assertEqual(Feeding.min("quantity", animal_name="Leo"), 2.0)
+        self.assertEqual(Feeding.max("quantity", staffID=staff_id), 4.5)
+        self.assertEqual(Feeding.sum("quantity", staffID=-1), 0.0)
+        self.assertIsNone(Feeding.max("quantity", staffID=-1))
+        self.assertTrue(Animals.exists(animal_id))
+        self.assertFalse(Animals.exists(animal_id + 1))
+        with self.assertRaises(ValueError):
+            Feeding.aggregate("MEDIAN", "quantity")
+
+    def test_lookup_counts_are_cached(self):
+        """
+        Test that lookup table counts are cached until the table is written
+        """
+        Roles.create("Zookeeper", "Animal Care")
+        self.assertEqual(Roles.count(), 1)
+        calls = crud.get_database().statistics()["Roles.count"]["calls"]
+        self.assertEqual(Roles.count(), 1)
+        self.assertEqual(crud.get_database().statistics()["Roles.count"]["calls"], calls)
+
+        Roles.create("Veterinarian", "Medical")
+        self.assertEqual(Roles.count(), 2)
+        self.assertEqual(Roles.count(department="Medical"), 1)
+
+    def test_payroll_rollups(self):
+        """
+        Test payroll totals, medians and tenure per group, cached until Staff or Roles change
+        """
+        keeper_id = Roles.create("Zookeeper", "Animal Care")
+        vet_id = Roles.create("Veterinarian", "Medical")
+        Staff.create("John", "Doe", keeper_id, "USA", 40000, "2020-01-01")
+        Staff.create("Jane", "Roe", keeper_id, "USA", 50000, "2022-01-01")
+        Staff.create("Ann", "Lee", keeper_id, "Canada", 90000, "2021-01-01")
+        Staff.create("Max", "Kay", vet_id, "USA", 80000, "2024-01-01")
+
+        self.assertEqual(Staff.payroll(as_of="2025-01-01"), [
+            ("Animal Care", 3, 180000.0, 60000.0, 50000.0, 4384 / 3 / 365.25),
+            ("Medical", 1, 80000.0, 80000.0, 80000.0, 366 / 365.25),
+        ])
+        by_country = Staff.payroll(("department", "country"), "2025-01-01")
+        self.assertEqual([row[:5] for row in by_country], [
+            ("Animal Care", "Canada", 1, 90000.0, 90000.0),
+            ("Animal Care", "USA", 2, 90000.0, 45000.0),
+            ("Medical", "USA", 1, 80000.0, 80000.0),
+        ])
+        self.assertEqual([row[:5] for row in Staff.payroll(("role",), "2025-01-01")], [
+            ("Veterinarian", 1, 80000.0, 80000.0, 80000.0),
+            ("Zookeeper", 3, 180000.0, 60000.0, 50000.0),
+        ])
+        self.assertEqual([row[:6] for row in Staff.payroll(("role", "country"), "2025-01-01")], [
+            ("Veterinarian", "USA", 1, 80000.0, 80000.0, 80000.0),
+            ("Zookeeper", "Canada", 1, 90000.0, 90000.0, 90000.0),
+            ("Zookeeper", "USA", 2, 90000.0, 45000.0, 45000.0),
+        ])
+        self.assertEqual(Staff.payroll((), "2025-01-01")[0][:4], (4, 260000.0, 65000.0, 65000.0))
+        with self.assertRaises(ValueError):
+            Staff.payroll(("salary",))
+
+        calls = crud.get_database().statistics()["Staff.payroll"]["calls"]
+        Staff.payroll(as_of="2025-01-01")
+        self.assertEqual(crud.get_database().statistics()["Staff.payroll"]["calls"], calls)
+        Roles.update(vet_id, "Veterinarian", "Animal Care")
+        self.assertEqual(Staff.payroll(as_of="2025-01-01")[0][1:4], (4, 260000.0, 65000.0))
+
+
+class TestArchive(unittest.TestCase):
+    test_db_name = "test_zoo_hot.db"
+    archive_db_name = "test_zoo_cold.db"
+
+    def setUp(self):
+        initialize_database(self.test_db_name, force_new=True)
+        self.database = ZooDatabase(self.test_db_name, archive_path=self.archive_db_name)
+
+    def tearDown(self):
+        self.database.close()
+        for name in (self.test_db_name, self.archive_db_name):
+            if os.path.exists(name):
+                os.remove(name)
+
+    def test_old_rows_move_to_archive(self):
+        """
+        Test that old feedings and care events are archived and still visible in history queries
+        """
+        db = self.database
+        species_id = db.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = db.Animals.create("Leo", species_id)
+        food_type_id = db.FoodTypes.create("Meat", "kg")
+        staff_id = db.Staff.create("John", "Doe", db.Roles.create("Zookeeper", "Animal Care"), "USA", 50000)
+        for day in range(1, 10):
+            db.Feeding.create(animal_id, food_type_id, staff_id, 1.0, "x" * 2000, f"2023-01-0{day}")
+        db.Feeding.create(animal_id, food_type_id, staff_id, 1.0, feeding_date="2024-06-01")
+        db.AnimalCare.create(animal_id, staff_id, "Checkup", care_date="2023-01-05")
+
+        result = archive.archive_records("2024-01-01", database=db, chunk_size=4)
+        self.assertEqual((result["Feeding"], result["AnimalCare"]), (9, 1))
+        self.assertGreater(result["pages_reclaimed"], 0)
+
+        self.assertEqual(db.Feeding.count(), 1)
+        self.assertEqual(len(db.Feeding.history(animal_id)), 1)
+        self.assertEqual(len(db.Feeding.history(animal_id, include_archive=True)), 10)
+        self.assertEqual(len(db.AnimalCare.history(animal_id, include_archive=True)), 1)
+        self.assertEqual(
+            db.Staff.workload("2023-01-01", "2024-12-31", "month", include_archive=True),
+            [(staff_id, "2023-01-01", 9, 1), (staff_id, "2024-06-01", 1, 0)]
+        )
+        self.assertEqual(db.Animals.status(animal_id)[5], "2024-06-01")
+        with self.assertRaises(ValueError):
+            Feeding.history(animal_id, include_archive=True)
+
+    def test_archival_is_logged_and_keeps_status(self):
+        """
+        Test that archived rows are logged as moves and the latest dates of an animal are kept
+        """
+        db = self.database
+        species_id = db.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = db.Animals.create("Leo", species_id)
+        food_type_id = db.FoodTypes.create("Meat", "kg")
+        staff_id = db.Staff.create("John", "Doe", db.Roles.create("Zookeeper", "Animal Care"), "USA", 50000)
+        feeding_id = db.Feeding.create(animal_id, food_type_id, staff_id, 1.0, feeding_date="2023-01-05")
+        care_id = db.AnimalCare.create(animal_id, staff_id, "Checkup", care_date="2023-01-06")
+        seq = db.ChangeLog.latest_seq()
+
+        archive.archive_records("2024-01-01", database=db)
+        self.assertEqual(
+            [change[1:4] for change in db.ChangeLog.changes_since(seq)],
+            [("Feeding", feeding_id, "A"), ("AnimalCare", care_id, "A")]
+        )
+        self.assertEqual(db.Animals.status(animal_id)[5:], ("2023-01-05", "2023-01-06", "Checkup"))
+
+    def test_failed_archival_rolls_back(self):
+        """
+        Test that a failing chunk leaves both databases and the pooled connection untouched
+        """
+        db = self.database
+        species_id = db.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = db.Animals.create("Leo", species_id)
+        staff_id = db.Staff.create("John", "Doe", db.Roles.create("Zookeeper", "Animal Care"), "USA", 50000)
+        care_id = db.AnimalCare.create(animal_id, staff_id, "Checkup", care_date="2023-01-05")
+        conn = db.acquire()
+        try:
+            conn.execute(
+                "INSERT INTO archive.AnimalCare (careID, animalID, staffID, care_date, care_type) VALUES (?, ?, ?, ?, ?)",
+                (care_id, animal_id, staff_id, "2022-01-01", "Other")
+            )
+            conn.commit()
+        finally:
+            db.release(conn)
+
+        with self.assertRaises(sqlite3.IntegrityError):
+            archive.archive_records("2024-01-01", database=db)
+        self.assertEqual(db.AnimalCare.count(), 1)
+        self.assertEqual(len(db.AnimalCare.history(animal_id, include_archive=True)), 2)
+        # The connection went back to the pool without a transaction holding the write lock
+        self.assertTrue(db.AnimalCare.create(animal_id, staff_id, "Vaccination", care_date="2024-02-01"))
+
+    def test_archived_ids_are_never_reused(self):
+        """
+        Test that IDs of archived rows are not handed out again and never overwrite the archive
+        """
+        db = self.database
+        species_id = db.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = db.Animals.create("Leo", species_id)
+        staff_id = db.Staff.create("John", "Doe", db.Roles.create("Zookeeper", "Animal Care"), "USA", 50000)
+        old_id = db.AnimalCare.create(animal_id, staff_id, "Checkup", "first", care_date="2023-01-05")
+        archive.archive_records("2024-01-01", database=db)
+
+        new_id = db.AnimalCare.create(animal_id, staff_id, "Vaccination", "second", care_date="2023-02-01")
+        self.assertGreater(new_id, old_id)
+        self.assertEqual(archive.archive_records("2024-01-01", database=db)["AnimalCare"], 1)
+        notes = sorted(row[3] for row in db.AnimalCare.history(animal_id, include_archive=True))
+        self.assertEqual(notes, ["first", "second"])
+
+    def test_memory_engine_skips_archived_ids(self):
+        """
+        Test that records created in memory after an archival run get IDs never used before
+        """
+        db = self.database
+        species_id = db.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = db.Animals.create("Leo", species_id)
+        food_type_id = db.FoodTypes.create("Meat", "kg")
+        staff_id = db.Staff.create("John", "Doe", db.Roles.create("Zookeeper", "Animal Care"), "USA", 50000)
+        for day in range(1, 4):
+            db.Feeding.create(animal_id, food_type_id, staff_id, 1.0, feeding_date=f"2023-01-0{day}")
+        archive.archive_records("2024-01-01", database=db)
+
+        simulation = memory_engine.MemoryDatabase.load(db)
+        self.assertEqual(simulation.Feeding.create(animal_id, food_type_id, staff_id, 1.0, None, "2023-02-01"), 4)
+        simulation.flush(db)
+        self.assertEqual(archive.archive_records("2024-01-01", database=db)["Feeding"], 1)
+        self.assertEqual(len(db.Feeding.history(animal_id, include_archive=True)), 4)
+
+
+class TestBackup(ZooSchemaTestCase):
+    backup_dir = "test_zoo_backups"
+
+    def tearDown(self):
+        for path in glob.glob(os.path.join(self.backup_dir, "*")):
+            os.remove(path)
+        if os.path.isdir(self.backup_dir):
+            os.rmdir(self.backup_dir)
+
+    def test_backup_copies_and_verifies(self):
+        """
+        Test that an online backup copies every row and passes the integrity check
+        """
+        for index in range(200):
+            Species.create(f"Species {index}", "Savanna " * 20, "Herbivore")
+        steps = []
+        os.makedirs(self.backup_dir)
+        destination = os.path.join(self.backup_dir, "zoo.db")
+
+        report = backup.backup_database(destination, pages=2, pause=0, progress=steps.append)
+        self.assertEqual(report["integrity"], "ok")
+        self.assertGreater(len(steps), 1)
+        self.assertEqual(steps[-1]["copied_pages"], report["pages"])
+        copy = sqlite3.connect(destination)
+        self.assertEqual(copy.execute("SELECT COUNT(*) FROM Species").fetchone()[0], 200)
+        copy.close()
+
+    def test_scheduler_keeps_recent_backups(self):
+        """
+        Test that scheduled backups run in the background and old files are pruned
+        """
+        scheduler = backup.BackupScheduler(
+            os.path.join(self.backup_dir, "zoo-%Y%m%d-%H%M%S-%f.db"), interval=0.01, keep=2
+        )
+        scheduler.start()
+        deadline = time.time() + 5
+        while len(glob.glob(os.path.join(self.backup_dir, "*.db"))) < 2 and time.time() < deadline:
+            time.sleep(0.01)
+        time.sleep(0.05)
+        scheduler.stop()
+        self.assertIsNone(scheduler.last_error)
+        self.assertEqual(scheduler.last_report["integrity"], "ok")
+        self.assertEqual(len(glob.glob(os.path.join(self.backup_dir, "*.db"))), 2)
+
+    def test_scheduler_reports_errors_through_on_error(self):
+        """
+        Test that a failed scheduled backup is kept in last_error and passed to the database's on_error
+        """
+        errors = []
+        database = ZooDatabase(crud.MEMORY_DB_URI.format("backup_errors"), on_error=errors.append)
+        self.addCleanup(database.close)
+        scheduler = backup.BackupScheduler(os.path.join(self.backup_dir, "zoo-%f.db"), interval=10, database=database)
+        with unittest.mock.patch.object(backup, "backup_database", side_effect=OSError("disk full")):
+            scheduler.start()
+            deadline = time.time() + 5
+            while not errors and time.time() < deadline:
+                time.sleep(0.01)
+            scheduler.stop()
+        self.assertEqual([str(error) for error in errors], ["disk full"])
+        self.assertIs(scheduler.last_error, errors[0])
+
+    def test_prune_only_removes_own_backups(self):
+        """
+        Test that a pattern starting with a strftime code leaves unrelated files alone
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            cwd = os.getcwd()
+            os.chdir(directory)
+            self.addCleanup(os.chdir, cwd)
+            for name in ("a_important.txt", "b_notes.md", "20200101-zoo.db"):
+                with open(name, "w") as file:
+                    file.write("keep")
+            scheduler = backup.BackupScheduler("%Y%m%d-%H%M%S-%f-zoo.db", interval=1, keep=1)
+            scheduler.run_once()
+            latest = scheduler.run_once()["destination"]
+            self.assertEqual(scheduler.backups(), [latest])
+            self.assertEqual(sorted(os.listdir(".")), sorted(["a_important.txt", "b_notes.md", "20200101-zoo.db", latest]))
+
+
+@unittest.skipUnless(numpy, "NumPy is not installed")
+class TestNutritionPlanner(ZooSchemaTestCase):
+    def test_plan_uses_history_then_species_then_diet(self):
+        """
+        Test that requirements come from feeding history with species and diet fallbacks
+        """
+        species_id, leo_id, meat_id, _, staff_id = self.create_feeding_fixture()
+        nala_id = Animals.create("Nala", species_id, "Female")
+        tiger_id = Animals.create("Shere Khan", Species.create("Tiger", "Forest", "Carnivore"))
+        hay_id = FoodTypes.create("Hay", "kg")
+        for day in range(1, 11):
+            Feeding.create(leo_id, meat_id, staff_id, 6.0, feeding_date=f"2024-03-{day:02d}")
+        Feeding.create(leo_id, hay_id, staff_id, 2.0, feeding_date="2024-03-05")
+        Feeding.create(leo_id, meat_id, staff_id, 50.0, feeding_date="2024-01-01")
+
+        summary = planner.create_plan("2024-03-11", days=10, margin=0.5)
+        self.assertEqual(summary["animals"], 3)
+        self.assertEqual(summary["rows"], 6)
+        plan = {(row[0], row[1]): row[2] for row in planner.read_plan("2024-03-11")}
+        for animal_id in (leo_id, nala_id, tiger_id):
+            self.assertAlmostEqual(plan[(animal_id, meat_id)], 9.0)
+            self.assertAlmostEqual(plan[(animal_id, hay_id)], 0.3)
+        self.assertAlmostEqual(summary["totals"][meat_id], 27.0)
+
+        # Planning the same date again replaces the stored plan
+        planner.create_plan("2024-03-11", days=10)
+        plan = {(row[0], row[1]): row[2] for row in planner.read_plan("2024-03-11")}
+        self.assertAlmostEqual(plan[(leo_id, meat_id)], 6.0)
+
+
+@unittest.skipUnless(numpy, "NumPy is not installed")
+class TestStockForecast(ZooSchemaTestCase):
+    def test_forecast_follows_feedings_incrementally(self):
+        """
+        Test stock-out days from consumption and expiration, updated from new feedings
+        """
+        _, animal_id, meat_id, _, staff_id = self.create_feeding_fixture()
+        hay_id = FoodTypes.create("Hay", "kg")
+        for day in range(2, 12):
+            Feeding.create(animal_id, meat_id, staff_id, 6.0, feeding_date=f"2024-03-{day:02d}")
+        hay_feeding_id = Feeding.create(animal_id, hay_id, staff_id, 2.0, feeding_date="2024-03-10")
+        FoodInventory.create(meat_id, 120.0, "2024-04-30")
+        FoodInventory.create(hay_id, 10.0, "2024-03-14")
+        FoodInventory.create(hay_id, 99.0, "2024-03-01")
+
+        forecaster = forecast.StockForecaster(window=10, short_window=5)
+        self.assertEqual(forecaster.refresh("2024-03-11"), "full")
+        self.assertEqual(forecaster.forecast("2024-03-11"), [
+            (hay_id, 10.0, 0.4, 3.0, "expiration"),
+            (meat_id, 120.0, 6.0, 20.0, "consumption"),
+        ])
+
+        # New feedings are added without reloading the window
+        Feeding.create(animal_id, meat_id, staff_id, 30.0, feeding_date="2024-03-11")
+        self.assertEqual(forecaster.refresh("2024-03-11"), "incremental")
+        self.assertEqual(forecaster.refresh("2024-03-11"), "unchanged")
+        self.assertEqual(forecaster.forecast("2024-03-11")[1], (meat_id, 120.0, 12.0, 10.0, "consumption"))
+
+        # Deleting a feeding forces a full reload
+        Feeding.delete(hay_feeding_id)
+        self.assertEqual(forecaster.refresh("2024-03-11"), "full")
+        self.assertEqual(forecaster.forecast("2024-03-11")[0], (hay_id, 10.0, 0.0, 3.0, "expiration"))
+
+        # A second forecaster has its own consumer, so it does not acknowledge the first one's changes
+        other = forecast.StockForecaster(window=10, short_window=5)
+        self.assertNotEqual(other.consumer, forecaster.consumer)
+        self.assertEqual(other.refresh("2024-03-11"), "full")
+        Feeding.create(animal_id, meat_id, staff_id, 6.0, feeding_date="2024-03-11")
+        self.assertEqual(other.refresh("2024-03-11"), "incremental")
+        self.assertEqual(forecaster.refresh("2024-03-11"), "incremental")
+        other.close()
+        forecaster.close()
+
+    def test_forecast_uses_lots_in_expiration_order(self):
+        """
+        Test that stock expiring before it can be eaten is lost, whatever expires last
+        """
+        _, animal_id, meat_id, _, staff_id = self.create_feeding_fixture()
+        for day in range(2, 12):
+            Feeding.create(animal_id, meat_id, staff_id, 10.0, feeding_date=f"2024-03-{day:02d}")
+        FoodInventory.create(meat_id, 50.0, "2024-04-30")
+        FoodInventory.create(meat_id, 40.0, "2024-03-13")
+
+        forecaster = forecast.StockForecaster(window=10, short_window=5)
+        # 20 of the 40 expiring on day 2 are eaten, the other 50 last 5 more days
+        self.assertEqual(forecaster.forecast("2024-03-11"), [(meat_id, 90.0, 10.0, 7.0, "consumption")])
+        # A lot expiring on day 9 is used next and only 70 of its 100 are eaten in time
+        FoodInventory.create(meat_id, 100.0, "2024-03-20")
+        self.assertEqual(forecaster.forecast("2024-03-11"), [(meat_id, 190.0, 10.0, 14.0, "consumption")])
+        forecaster.close()
+
+
+class TestChangeLog(ZooSchemaTestCase):
+    def test_changes_are_logged_and_pruned(self):
+        """
+        Test that triggers log changes and acknowledged changes can be pruned
+        """
+        _, animal_id, food_type_id, _, staff_id = self.create_feeding_fixture()
+        feeding_id = Feeding.create(animal_id, food_type_id, staff_id, 5.0)
+        Animals.update(animal_id, "Leo II", Animals.read(animal_id)[2])
+        Feeding.delete(feeding_id)
+
+        changes = ChangeLog.changes_since(0)
+        self.assertEqual(
+            [(c[1], c[2], c[3]) for c in changes],
+            [("Animals", animal_id, "I"), ("Staff", staff_id, "I"), ("Feeding", feeding_id, "I"),
+             ("Animals", animal_id, "U"), ("Feeding", feeding_id, "D")]
+        )
+
+        batch = ChangeLog.consume("warehouse", limit=2)
+        self.assertEqual(len(batch), 2)
+        ChangeLog.acknowledge("warehouse", batch[-1][0])
+        self.assertEqual(ChangeLog.prune(), 2)
+        self.assertEqual(ChangeLog.consume("warehouse")[0][0], changes[2][0])
+        self.assertEqual(ChangeLog.latest_seq(), changes[-1][0])
+
+
+
+class TestAnimalStatus(ZooSchemaTestCase):
+    def test_status_board_follows_writes(self):
+        """
+        Test that the materialized status table tracks animals, feedings and care events
+        """
+        species_id, animal_id, food_type_id, _, staff_id = self.create_feeding_fixture()
+        self.assertEqual(Animals.status(animal_id), (animal_id, "Leo", species_id, "Lion", "Good", None, None, None))
+
+        Feeding.create(animal_id, food_type_id, staff_id, 5.0, feeding_date="2024-03-01")
+        latest_id = Feeding.create(animal_id, food_type_id, staff_id, 5.0, feeding_date="2024-03-05")
+        AnimalCare.create(animal_id, staff_id, "Checkup", care_date="2024-03-02")
+        Animals.update(animal_id, "Leo", species_id, health_status="Sick")
+        Species.update(species_id, "African Lion", "Savanna", "Carnivore")
+
+        status = Animals.status(animal_id)
+        self.assertEqual(status[3:], ("African Lion", "Sick", "2024-03-05", "2024-03-02", "Checkup"))
+
+        Feeding.delete(latest_id)
+        self.assertEqual(Animals.status(animal_id)[5], "2024-03-01")
+        self.assertEqual(Animals.status_board(), [Animals.status(animal_id)])
+        self.assertEqual(Animals.rebuild_status_board(), 1)
+        self.assertEqual(Animals.status_board(), [status[:5] + ("2024-03-01",) + status[6:]])
+
+        Animals.delete(animal_id)
+        self.assertEqual(Animals.status_board(), [])
+
+    def test_needing_attention_and_signature(self):
+        """
+        Test the animals needing attention and the signature telling when they changed
+        """
+        species_id, animal_id, food_type_id, _, staff_id = self.create_feeding_fixture()
+        nala = Animals.create("Nala", species_id, health_status="Injured")
+        kiara = Animals.create("Kiara", species_id, health_status="Healthy")
+        AnimalCare.create(nala, staff_id, "Bandage", care_date="2024-03-02")
+        Animals.update(animal_id, "Leo", species_id, health_status="Sick")
+        self.assertEqual(Animals.needing_attention(), [
+            (animal_id, "Leo", species_id, "Lion", "Sick", None),
+            (nala, "Nala", species_id, "Lion", "Injured", "2024-03-02"),
+        ])
+
+        signature = Animals.attention_signature()
+        Feeding.create(nala, food_type_id, staff_id, 5.0)
+        Animals.update(kiara, "Kiara", species_id, health_status="Good")
+        self.assertEqual(Animals.attention_signature(), signature)
+        AnimalCare.create(animal_id, staff_id, "Checkup", care_date="2024-03-05")
+        self.assertNotEqual(Animals.attention_signature(), signature)
+        signature = Animals.attention_signature()
+        Animals.update(nala, "Nala", species_id, health_status="Good")
+        self.assertNotEqual(Animals.attention_signature(), signature)
+        self.assertEqual([animal[0] for animal in Animals.needing_attention()], [animal_id])
+
+        # Rescheduling a care event and renaming the species change the result too
+        signature = Animals.attention_signature()
+        care_id = AnimalCare.history(animal_id)[0][0]
+        AnimalCare.update(care_id, animal_id, staff_id, "Checkup", care_date="2024-03-07")
+        self.assertEqual(Animals.needing_attention()[0][5], "2024-03-07")
+        self.assertNotEqual(Animals.attention_signature(), signature)
+        signature = Animals.attention_signature()
+        Species.update(species_id, "African Lion", "Savanna", "Carnivore")
+        self.assertEqual(Animals.needing_attention()[0][3], "African Lion")
+        self.assertNotEqual(Animals.attention_signature(), signature)
+
+        conn = get_connection()
+        plan = " ".join(row[3] for row in conn.execute(
+            f"EXPLAIN QUERY PLAN SELECT animalID FROM Animals a WHERE a.{create_database_if_not_exist.ATTENTION_CONDITION}"))
+        conn.close()
+        self.assertIn("idx_animals_attention", plan)
+
+
+
+class TestStaffWorkload(ZooSchemaTestCase):
+    def test_workload_by_day_and_week(self):
+        """
+        Test that feedings and care events are counted per staff member and period
+        """
+        _, animal_id, food_type_id, role_id, staff_id = self.create_feeding_fixture()
+        other_id = Staff.create("Jane", "Roe", role_id, "Spain", 40000, "2021-01-01")
+        for feeding_date in ("2024-02-28", "2024-03-04", "2024-03-05", "2024-03-11"):
+            Feeding.create(animal_id, food_type_id, staff_id, 1.0, feeding_date=feeding_date)
+        Feeding.create(animal_id, food_type_id, other_id, 1.0, feeding_date="2024-03-10")
+        AnimalCare.create(animal_id, other_id, "Checkup", care_date="2024-03-10 09:00")
+
+        self.assertEqual(
+            Staff.workload("2024-03-01", "2024-03-10", "week"),
+            [(staff_id, "2024-03-04", 2, 0), (other_id, "2024-03-04", 1, 1)]
+        )
+        self.assertEqual(
+            Staff.workload("2024-03-01", "2024-03-10", "day", staff_ids=[other_id]),
+            [(other_id, "2024-03-10", 1, 1)]
+        )
+        with self.assertRaises(ValueError):
+            Staff.workload("2024-03-01", "2024-03-10", "hour")
+
+
+
+class TestSnapshotRestore(ZooSchemaTestCase):
+    def test_restore_discards_later_writes(self):
+        """
+        Test that restoring a snapshot brings back the seeded dataset
+        """
+        species_id = Species.create("Lion", "Savanna", "Carnivore")
+        seeded = snapshot()
+        Species.update(species_id, "Tiger", "Forest", "Carnivore")
+        Species.create("Penguin", "Antarctic", "Piscivore")
+
+        restore(seeded)
+        self.assertEqual(Species.read_all(), [(species_id, "Lion", "Savanna", "Carnivore")])
+        seeded.close()
+
+        restore(self.empty_snapshot)
+        self.assertEqual(Species.read_all(), [])
+
+
+class TestOptimisticConcurrency(ZooSchemaTestCase):
+    def test_stale_updates_conflict(self):
+        """
+        Test that updates with an outdated expected_version fail without writing
+        """
+        species_id, animal_id, food_type_id, role_id, staff_id = self.create_feeding_fixture()
+        inventory_id = FoodInventory.create(food_type_id, 50, "2030-01-01")
+        self.assertEqual(Animals.read(animal_id)[-1], 1)
+
+        self.assertTrue(Animals.update(animal_id, "Leo", species_id, health_status="Sick", expected_version=1))
+        self.assertEqual(Animals.read(animal_id)[-1], 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            with self.assertRaises(crud.ConflictError) as raised:
+                Animals.update(animal_id, "Leon", species_id, expected_version=1)
+            with self.assertRaises(crud.ConflictError):
+                Staff.update(staff_id, "John", "Doe", role_id, "USA", 60000, expected_version=5)
+        self.assertEqual(raised.exception.actual_version, 2)
+        self.assertEqual(Animals.read(animal_id)[1], "Leo")
+        self.assertEqual(Staff.read(staff_id)[7], 50000)
+
+        self.assertTrue(Staff.update(staff_id, "John", "Doe", role_id, "USA", 60000, expected_version=1))
+        self.assertTrue(FoodInventory.update_stock(inventory_id, 40))
+        self.assertTrue(FoodInventory.update_stock(inventory_id, 30, expected_version=2))
+        self.assertFalse(Animals.update(animal_id + 100, "Ghost", species_id, expected_version=1))
+        self.assertEqual(list(FoodInventory.find(columns=["quantity", "version"])), [(30, 3)])
+
+
+class TestMemoryEngine(ZooSchemaTestCase):
+    def test_flush_matches_sqlite_reads(self):
+        """
+        Test that in-memory records read like their flushed SQLite copies
+        """
+        simulation = memory_engine.MemoryDatabase()
+        species_id = simulation.Species.create("Lion", "Savanna", "Carnivore")
+        leo = simulation.Animals.create("Leo", species_id, "Male", "2015-01-01")
+        nala = simulation.Animals.create("Nala", species_id)
+        food_type_id = simulation.FoodTypes.create("Meat", "kg")
+        simulation.FoodInventory.create(food_type_id, 40, "2030-01-01")
+        staff_id = simulation.Staff.create("John", "Doe", simulation.Roles.create("Zookeeper", "Care"), "USA", 5e4)
+        for day in range(1, 6):
+            simulation.Feeding.create(leo, food_type_id, staff_id, day, f"Day {day}", f"2025-01-0{day}")
+        simulation.AnimalCare.create(nala, staff_id, "Checkup", care_date="2025-01-02")
+        simulation.Animals.update(nala, "Nala", species_id, health_status="Sick", expected_version=1)
+        simulation.Feeding.delete(3)
+
+        self.assertEqual(simulation.Feeding.count(animalID=leo), 4)
+        self.assertEqual([event[0] for event in simulation.Feeding.history(leo, "2025-01-02", "2025-01-04")], [2, 4])
+        with self.assertRaises(sqlite3.IntegrityError):
+            simulation.Species.create("Lion", "Forest", "Carnivore")
+        with self.assertRaises(crud.ConflictError):
+            simulation.Animals.update(nala, "Nala", species_id, expected_version=1)
+
+        self.assertEqual(simulation.flush()["Feeding"], (4, 0, 0))
+        for name in memory_engine.TABLES:
+            self.assertEqual(sorted(getattr(simulation, name).read_all()), sorted(getattr(crud, name).read_all()))
+        self.assertEqual(simulation.Feeding.history(leo), Feeding.history(leo))
+
+        queries = [
+            ("Feeding", {"quantity__gt": 2, "order_by": "-feeding_date", "limit": 2}),
+            ("Feeding", {"feeding_date__between": ("2025-01-02", "2025-01-04"), "columns": ["feedingID", "notes"]}),
+            ("Feeding", {"notes__like": "day _", "staffID__in": [staff_id], "order_by": ["staffID", "-quantity"]}),
+            ("Animals", {"health_status__ne": "Good", "birthdate__isnull": True, "include": ["species_name"]}),
+            ("Animals", {"species_name": "Lion", "gender": None, "order_by": "name"}),
+            ("Staff", {"hire_date__lte": "2999-01-01", "columns": ["staffID", "role_title"]}),
+        ]
+        for name, options in queries:
+            self.assertEqual(getattr(simulation, name).find(**options), list(getattr(crud, name).find(**options)))
+        filters = {"feeding_date__gte": "2025-01-03", "animal_name__not_in": ["Nala"]}
+        self.assertEqual(simulation.Feeding.count(**filters), Feeding.count(**filters))
+        with self.assertRaises(ValueError):
+            simulation.Feeding.find(quantity__near=2)
+
+        self.assertEqual(simulation.Feeding.read_many([4, 3, 1], columns=["feedingID", "quantity"]),
+                         Feeding.read_many([4, 3, 1], columns=["feedingID", "quantity"]))
+        for function in ("SUM", "MIN", "MAX", "AVG", "COUNT"):
+            self.assertEqual(simulation.Feeding.aggregate(function, "quantity", feeding_date__gt="2025-01-01"),
+                             Feeding.aggregate(function, "quantity", feeding_date__gt="2025-01-01"))
+        self.assertEqual(simulation.FoodInventory.max("expiration_date"), FoodInventory.max("expiration_date"))
+        self.assertEqual(simulation.Animals.status(leo), Animals.status(leo))
+        self.assertEqual(simulation.Animals.status(nala), Animals.status(nala))
+        with self.assertRaises(NotImplementedError):
+            simulation.Staff.payroll()
+
+    def test_flush_shifts_ids_taken_meanwhile(self):
+        """
+        Test that records created in memory get new IDs when the database grew since the load
+        """
+        species_id, animal_id, food_type_id, role_id, staff_id = self.create_feeding_fixture()
+        simulation = memory_engine.MemoryDatabase.load()
+        penguin_id = simulation.Species.create("Penguin", "Antarctic", "Piscivore")
+        pingu = simulation.Animals.create("Pingu", penguin_id)
+        simulation.Animals.delete(animal_id)
+        Species.create("Tiger", "Forest", "Carnivore")
+
+        self.assertEqual(simulation.flush()["Species"], (1, 0, 1))
+        self.assertEqual(Species.read(penguin_id)[1], "Tiger")
+        self.assertIsNone(Animals.read(animal_id))
+        self.assertEqual(Animals.read(pingu)[1:3], ("Pingu", penguin_id + 1))
+        self.assertEqual(simulation.Animals.read(pingu), Animals.read(pingu))
+        self.assertEqual(simulation.flush()["Animals"], (0, 0, 0))
+
+    def test_flush_rejects_records_changed_meanwhile(self):
+        """
+        Test that flush checks the versions of updated records against the database
+        """
+        species_id, animal_id, _, _, _ = self.create_feeding_fixture()
+        simulation = memory_engine.MemoryDatabase.load()
+        simulation.Animals.update(animal_id, "Leo", species_id, health_status="Sick")
+        simulation.Animals.update(animal_id, "Leo", species_id, health_status="Injured")
+        simulation.Species.create("Tiger", "Forest", "Carnivore")
+        Animals.update(animal_id, "Leo", species_id, health_status="Recovering")
+
+        with self.assertRaises(crud.ConflictError) as caught:
+            simulation.flush()
+        self.assertEqual((caught.exception.expected_version, caught.exception.actual_version), (1, 2))
+        self.assertEqual(Animals.read(animal_id)[5], "Recovering")
+        self.assertEqual(Species.count(), 1)
+
+        simulation = memory_engine.MemoryDatabase.load()
+        simulation.Animals.update(animal_id, "Leo", species_id, health_status="Sick")
+        simulation.Animals.update(animal_id, "Leo", species_id, health_status="Injured")
+        self.assertEqual(simulation.flush()["Animals"], (1, 0, 0))
+        self.assertEqual(Animals.read(animal_id), simulation.Animals.read(animal_id))
+        self.assertEqual(Animals.read(animal_id)[7], 4)
+
+
+class TestNotesCompression(unittest.TestCase):
+    def setUp(self):
+        self.database = ZooDatabase(crud.MEMORY_DB_URI.format("notes"), notes_threshold=32)
+        self.database.initialize()
+
+    def tearDown(self):
+        self.database.close()
+
+    def test_long_notes_are_stored_compressed(self):
+        """
+        Test that long notes are compressed on write, read back as text and compressed in bulk
+        """
+        db = self.database
+        species_id = db.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = db.Animals.create("Leo", species_id)
+        food_type_id = db.FoodTypes.create("Meat", "kg")
+        staff_id = db.Staff.create("John", "Doe", db.Roles.create("Zookeeper", "Care"), "USA", 50000)
+        long_note = "Ate well, normal appetite. Behavior normal, active and alert."
+        feeding_id = db.Feeding.create(animal_id, food_type_id, staff_id, 5.0, long_note)
+        db.Feeding.create(animal_id, food_type_id, staff_id, 5.0, "Short")
+        care_id = db.AnimalCare.create(animal_id, staff_id, "Checkup", "Veterinary checkup completed, no issues found.")
+
+        conn = db.connect()
+        self.assertEqual([row[0] for row in conn.execute("SELECT typeof(notes) FROM Feeding ORDER BY feedingID")],
+                         ["blob", "text"])
+        self.assertEqual(db.Feeding.read(feeding_id)[8], long_note)
+        self.assertEqual(db.AnimalCare.history(animal_id)[0][3], "Veterinary checkup completed, no issues found.")
+        self.assertEqual(list(db.Feeding.find(columns=["feedingID"], notes__like="%active%")), [(feeding_id,)])
+
+        plain = "Fed by keeper in the morning. Left some food, appetite reduced."
+        conn.execute("UPDATE AnimalCare SET notes = ? WHERE careID = ?", (plain, care_id))
+        conn.commit()
+        conn.close()
+        self.assertEqual(compression.compress_existing(db, threshold=32)["AnimalCare"]["rows"], 1)
+        report = compression.notes_report(db)
+        self.assertEqual((report["Feeding"]["compressed"], report["AnimalCare"]["compressed"]), (1, 1))
+        self.assertLess(report["AnimalCare"]["stored_bytes"], report["AnimalCare"]["text_bytes"])
+        self.assertEqual(db.AnimalCare.read(care_id)[7], plain)
+
+
+class TestService(ZooSchemaTestCase):
+    def setUp(self):
+        super().setUp()
+        self.server = service.ZooServer(("127.0.0.1", 0), quiet=True)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.client = http.client.HTTPConnection("127.0.0.1", self.server.server_address[1])
+
+    def tearDown(self):
+        self.client.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def request(self, method, path, body=None, headers=None):
+        self.client.request(method, path, json.dumps(body) if body is not None else None, headers or {})
+        response = self.client.getresponse()
+        data = response.read()
+        return response, json.loads(data) if data else None
+
+    def test_json_endpoints_on_one_connection(self):
+        """
+        Test CRUD endpoints, pagination, ETags and metrics over a single keep-alive connection
+        """
+        response, species = self.request("POST", "/species", {"name": "Lion", "habitat": "Savanna", "diet": "Carnivore"})
+        self.assertEqual(response.status, 201)
+        for name in ("Leo", "Nala", "Kiara"):
+            self.request("POST", "/animals", {"name": name, "species_id": species["speciesID"]})
+
+        response, page = self.request("GET", "/animals?limit=2")
+        self.assertEqual(response.getheader("Transfer-Encoding"), "chunked")
+        self.assertEqual([animal["name"] for animal in page["items"]], ["Leo", "Nala"])
+        _, page = self.request("GET", f"/animals?limit=2&after={page['next']}")
+        self.assertEqual(([animal["name"] for animal in page["items"]], page["next"]), (["Kiara"], None))
+        _, page = self.request("GET", "/animals?name__in=Leo,Kiara")
+        self.assertEqual(len(page["items"]), 2)
+
+        response, lookup = self.request("GET", "/species")
+        etag = response.getheader("ETag")
+        response, _ = self.request("GET", "/species", headers={"If-None-Match": etag})
+        self.assertEqual(response.status, 304)
+        response, updated = self.request("PUT", f"/species/{species['speciesID']}",
+                                         {"name": "Tiger", "habitat": "Forest", "diet": "Carnivore"})
+        self.assertEqual(updated["name"], "Tiger")
+        response, lookup = self.request("GET", "/species", headers={"If-None-Match": etag})
+        self.assertEqual((response.status, lookup["items"][0]["name"]), (200, "Tiger"))
+
+        body = {"name": "Leo", "species_id": species["speciesID"], "expected_version": 1}
+        self.assertEqual(self.request("PUT", "/animals/1", body)[1]["version"], 2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            response, conflict = self.request("PUT", "/animals/1", body)
+        self.assertEqual((response.status, conflict["version"]), (409, 2))
+
+        self.assertEqual(self.request("GET", "/animals/999")[0].status, 404)
+        self.assertEqual(self.request("GET", "/animals?weight=3")[0].status, 400)
+        self.assertEqual(self.request("DELETE", "/animals/1")[1], {"deleted": 1})
+
+        _, metrics = self.request("GET", "/metrics")
+        self.assertEqual(metrics["requests"]["POST /animals"]["requests"], 3)
+        self.assertEqual(metrics["requests"]["GET /animals/{id}"]["errors"], 1)
+        self.assertIn("p95_ms", metrics["requests"]["GET /species"])
+
+
+    def test_list_stream_error_aborts_response(self):
+        """
+        Test that an error after the chunked headers truncates the stream instead of sending a second response
+        """
+        response, species = self.request("POST", "/species", {"name": "Lion", "habitat": "Savanna", "diet": "Carnivore"})
+        self.request("POST", "/animals", {"name": "Leo", "species_id": species["speciesID"]})
+
+        with unittest.mock.patch.object(service.ZooRequestHandler, "_as_dict", side_effect=RuntimeError("boom")):
+            with socket.create_connection(self.server.server_address, timeout=5) as connection:
+                connection.sendall(b"GET /animals HTTP/1.1\r\nHost: localhost\r\n\r\n")
+                data = b"".join(iter(lambda: connection.recv(4096), b""))
+        # One status line, and the stream ends without its terminating chunk when the server closes
+        self.assertTrue(data.startswith(b"HTTP/1.1 200"))
+        self.assertEqual(data.count(b"HTTP/1.1"), 1)
+        self.assertFalse(data.endswith(b"0\r\n\r\n"))
+        _, metrics = self.request("GET", "/metrics")
+        self.assertEqual(metrics["requests"]["GET /animals"]["errors"], 1)
+
+class TestCli(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.directory.name, "source.db")
+        self.target = os.path.join(self.directory.name, "target.db")
+        initialize_database(self.source, force_new=True)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_export_import_round_trip(self):
+        """
+        Test that exported CSV files import into a new database with the same rows
+        """
+        db = ZooDatabase(self.source)
+        species_id = db.Species.create("Lion", "Savanna", "Carnivore")
+        animal_id = db.Animals.create("Leo", species_id, "Male", "2015-01-01")
+        food_type_id = db.FoodTypes.create("Meat", "kg")
+        staff_id = db.Staff.create("John", "Doe", db.Roles.create("Zookeeper", "Animal Care"), "USA", 50000)
+        for day in range(1, 8):
+            db.Feeding.create(animal_id, food_type_id, staff_id, 2.5, feeding_date=f"2024-03-0{day}")
+        db.close()
+
+        dump = os.path.join(self.directory.name, "dump")
+        with contextlib.redirect_stderr(io.StringIO()):
+            cli.main(["--db", self.source, "export", "--directory", dump, "--batch-size", "3"])
+            cli.main(["--db", self.target, "import", "--batch-size", "3",
+                      *glob.glob(os.path.join(dump, "*.csv"))])
+
+        source, target = ZooDatabase(self.source), ZooDatabase(self.target)
+        for table in cli.TABLES:
+            self.assertEqual(getattr(target, table).read_all(), getattr(source, table).read_all())
+        self.assertEqual(target.Feeding.count(feeding_date__gte="2024-03-05"), 3)
+        source.close()
+        target.close()
+
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output):
+            cli.main(["--db", self.target, "report"])
+            cli.main(["--db", self.target, "vacuum"])
+        self.assertIn("Animal Care", output.getvalue())
+        self.assertIn("pages", output.getvalue())
+        with self.assertRaises(ValueError):
+            cli.table_name("Visitors")
+
+    def test_import_reports_short_lines(self):
+        """
+        Test that blank lines are skipped and a short line fails with its line number
+        """
+        path = os.path.join(self.directory.name, "species.csv")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write("speciesID,name,habitat,diet\n1,Lion,Savanna,Carnivore\n\n,,,\n2,Tiger\n")
+        with self.assertRaises(ValueError) as raised:
+            cli.import_table(self.source, "Species", path, batch_size=1)
+        self.assertIn("line 5", str(raised.exception))
+        database = ZooDatabase(self.source)
+        self.addCleanup(database.close)
+        self.assertEqual([row[1] for row in database.Species.read_all()], ["Lion"])
+
+    def test_import_compresses_notes(self):
+        """
+        Test that imported notes are stored compressed like notes written through the CRUD classes
+        """
+        path = os.path.join(self.directory.name, "care.csv")
+        note = "Veterinary checkup completed, no issues found. Follow-up examination required."
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerows([["careID", "animalID", "staffID", "care_date", "care_type", "notes"],
+                                        [1, 1, 1, "2024-03-01", "Checkup", note],
+                                        [2, 1, 1, "2024-03-02", "Checkup", ""]])
+        with unittest.mock.patch.object(crud, "NOTES_THRESHOLD", 32):
+            cli.import_table(self.source, "AnimalCare", path)
+        conn = sqlite3.connect(self.source)
+        self.addCleanup(conn.close)
+        self.assertEqual([row[0] for row in conn.execute("SELECT typeof(notes) FROM AnimalCare ORDER BY careID")],
+                         ["blob", "null"])
+        self.assertEqual(compression.decompress_notes(conn.execute("SELECT notes FROM AnimalCare").fetchone()[0]), note)
+
+
+    def test_import_ignores_unknown_notes_column(self):
+        """
+        Test that a notes column is skipped for a table without notes
+        """
+        path = os.path.join(self.directory.name, "species.csv")
+        with open(path, "w", newline="", encoding="utf-8") as file:
+            csv.writer(file).writerows([["speciesID", "name", "habitat", "diet", "notes"],
+                                        [1, "Lion", "Savanna", "Carnivore", "Big cat"]])
+        self.assertEqual(cli.import_table(self.source, "Species", path)[:2], ("Species", 1))
+
+class TestLoadTest(unittest.TestCase):
+    def test_mixed_workload_report(self):
+        """
+        Test that a short mixed workload reports every operation and the totals
+        """
+        with tempfile.TemporaryDirectory() as directory:
+            db_name = bench.create_sample_database(os.path.join(directory, "load.db"), animals=20, feedings=100)
+            mix = loadtest.parse_mix("feeding_insert=2,animal_read=2,inventory_update=1,report=1")
+            report = loadtest.run(db_name, mix, loadtest.parse_phases("0.2:100,0.2:400"), threads=4)
+
+            self.assertEqual(set(report), {"feeding_insert", "animal_read", "inventory_update", "report", "total"})
+            total = report["total"]
+            self.assertEqual(total["requests"], sum(report[name]["requests"] for name in mix))
+            self.assertGreater(total["requests"], 20)
+            self.assertEqual(total["errors"], 0)
+            self.assertLessEqual(total["p50_ms"], total["p99_ms"])
+            database = ZooDatabase(db_name)
+            self.assertEqual(database.Feeding.count(notes="Load test"), report["feeding_insert"]["requests"])
+            database.close()
+        with self.assertRaises(ValueError):
+            loadtest.parse_mix("animal_delete=1")
+
+
+class TestZooDatabase(unittest.TestCase):
+    def setUp(self):
+        self.first = ZooDatabase(crud.MEMORY_DB_URI.format("first"))
+        self.second = ZooDatabase(crud.MEMORY_DB_URI.format("second"), profile="fast")
+        self.first.initialize()
+        self.second.initialize()
+
+    def tearDown(self):
+        self.first.close()
+        self.second.close()
+
+    def test_handles_are_independent(self):
+        """
+        Test that bound CRUD classes only see their own database
+        """
+        species_id = self.first.Species.create("Lion", "Savanna", "Carnivore")
+        self.assertEqual(self.first.Species.read(species_id)[1], "Lion")
+        self.assertIsNone(self.second.Species.read(species_id))
+        self.assertEqual(self.second.Species.read_all(), [])
+
+        stats = self.first.statistics()
+        self.assertEqual(stats["Species.create"]["calls"], 1)
+        self.assertEqual(stats["Species.read"]["calls"], 1)
+        self.assertNotIn("Species.create", self.second.statistics())
+
+    def test_failed_transactions_go_to_on_error(self):
+        """
+        Test that failed transactions are reported through the handle's on_error hook
+        """
+        errors = []
+        database = ZooDatabase(crud.MEMORY_DB_URI.format("errors"), on_error=errors.append)
+        database.initialize()
+        self.addCleanup(database.close)
+        database.Species.create("Lion", "Savanna", "Carnivore")
+        output = io.StringIO()
+        with contextlib.redirect_stdout(output), self.assertRaises(sqlite3.IntegrityError):
+            database.Species.create("Lion", "Savanna", "Carnivore")
+        self.assertEqual([type(error) for error in errors], [sqlite3.IntegrityError])
+        self.assertEqual(output.getvalue(), "")
+
+    def test_cache_is_invalidated_by_writes(self):
+        """
+        Test that cached values are recomputed after a write to their tables
+        """
+        count = lambda: len(self.first.Roles.read_all())
+        self.assertEqual(self.first.cached("roles", ("Roles",), count), 0)
+        self.first.Species.create("Lion", "Savanna", "Carnivore")
+        self.first.Roles.read_all()
+        self.assertEqual(self.first.cached("roles", ("Roles",), lambda: -1), 0)
+        self.first.Roles.create("Zookeeper", "Animal Care")
+        self.assertEqual(self.first.cached("roles", ("Roles",), count), 1)
+
+    def test_profiling_attributes_sampled_calls(self):
+        """
+        Test that profiled CRUD calls are aggregated per method and can be dumped
+        """
+        profiling.enable(sample_rate=1.0, memory=True)
+        self.addCleanup(profiling.disable)
+        species_id = self.first.Species.create("Lion", "Savanna", "Carnivore")
+        self.first.Species.read(species_id)
+        self.first.Species.read(species_id)
+
+        summary = profiling.summary()
+        self.assertEqual(summary["Species.create"]["samples"], 1)
+        self.assertEqual(summary["Species.read"]["samples"], 2)
+        self.assertGreater(summary["Species.read"]["seconds"], 0)
+        self.assertIn("Species.read", profiling.report())
+        with tempfile.TemporaryDirectory() as directory:
+            paths = profiling.dump(directory)
+            self.assertIn(os.path.join(directory, "Species.read.prof"), paths)
+            self.assertTrue(all(os.path.exists(path) for path in paths))
+
+        profiling.enable(sample_rate=0.0)
+        self.first.Species.read(species_id)
+        self.assertEqual(profiling.summary(), {})
+
+    def test_profiling_skips_busy_or_failing_profiler(self):
+        """
+        Test that calls run unprofiled while another call is profiled or cProfile cannot start
+        """
+        profiler = profiling.Profiler()
+        with profiler._profiling:
+            self.assertEqual(profiler.call("busy", sum, [1, 2]), 3)
+
+        class FailingProfile:
+            def enable(self):
+                raise ValueError("Another profiling tool is already active")
+
+        with unittest.mock.patch.object(profiling.cProfile, "Profile", FailingProfile):
+            self.assertEqual(profiler.call("failing", sum, [1, 2]), 3)
+        self.assertEqual(profiler.call("free", sum, [1, 2]), 3)
+        self.assertEqual(list(profiler.summary()), ["free"])
+
+
+    def test_profiling_signal_dump_does_not_wait_for_lock(self):
+        """
+        Test that the SIGUSR1 dump returns while the profiler lock is held and dumps once it is free
+        """
+        profiler = profiling.enable()
+        self.addCleanup(profiling.disable)
+        profiler.call("free", sum, [1, 2])
+        with tempfile.TemporaryDirectory() as directory:
+            with profiler._lock:
+                profiling._dump_in_background(directory)
+                dumper = next(thread for thread in threading.enumerate() if thread.name == "profile-dump")
+                self.assertFalse(os.path.exists(os.path.join(directory, "free.prof")))
+            dumper.join(5)
+            self.assertTrue(os.path.exists(os.path.join(directory, "free.prof")))
+            self.assertIn("=== free ===", open(os.path.join(directory, "report.txt"), encoding="utf-8").read())
+
+class TestSchemaMigrations(unittest.TestCase):
+    test_db_name = "test_zoo_migrations.db"
+
+    def tearDown(self):
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(self.test_db_name + suffix):
+                os.remove(self.test_db_name + suffix)
+
+    def test_migrations_apply_in_order(self):
+        """
+        Test that migrations run once, in order, and record the schema version
+        """
+        conn = sqlite3.connect(self.test_db_name, isolation_level=None)
+        self.assertEqual(create_database_if_not_exist.migrate(conn, target_version=1), [1])
+        self.assertEqual(create_database_if_not_exist.get_schema_version(conn), 1)
+        conn.close()
+
+        initialize_database(self.test_db_name)
+        conn = sqlite3.connect(self.test_db_name, isolation_level=None)
+        self.assertEqual(
+            create_database_if_not_exist.get_schema_version(conn),
+            create_database_if_not_exist.SCHEMA_VERSION
+        )
+        self.assertEqual(create_database_if_not_exist.migrate(conn), [])
+
+        # The fast path only reads the version
+        statements = []
+        conn.close()
+        conn = sqlite3.connect(self.test_db_name, isolation_level=None)
+        conn.set_trace_callback(statements.append)
+        if create_database_if_not_exist.get_schema_version(conn) != create_database_if_not_exist.SCHEMA_VERSION:
+            create_database_if_not_exist.migrate(conn)
+        self.assertEqual(statements, ["PRAGMA user_version"])
+        conn.close()
+
+    def test_page_size_is_rebuilt(self):
+        """
+        Test that page_size applies to new databases and rebuilds existing ones
+        """
+        initialize_database(self.test_db_name, page_size=8192)
+        database = ZooDatabase(self.test_db_name, pragmas={"journal_mode": "WAL", "mmap_size": 1 << 20})
+        database.Species.create("Lion", "Savanna", "Carnivore")
+        conn = database.connect(cache_size=-4096)
+        self.assertEqual(conn.execute("PRAGMA page_size").fetchone()[0], 8192)
+        self.assertEqual(conn.execute("PRAGMA cache_size").fetchone()[0], -4096)
+        self.assertEqual(conn.execute("PRAGMA mmap_size").fetchone()[0], 1 << 20)
+        conn.close()
+        database.close()
+
+        initialize_database(self.test_db_name, page_size=16384)
+        conn = sqlite3.connect(self.test_db_name)
+        self.assertEqual(conn.execute("PRAGMA page_size").fetchone()[0], 16384)
+        self.assertEqual(conn.execute("PRAGMA journal_mode").fetchone()[0], "wal")
+        self.assertEqual(conn.execute("SELECT name FROM Species").fetchall(), [("Lion",)])
+        conn.close()
+
+        with self.assertRaises(ValueError):
+            ZooDatabase(self.test_db_name, pragmas={"page_size": 1024})
+
+    def test_failed_migration_rolls_back(self):
+        """
+        Test that a failing migration step leaves the schema and version untouched
+        """
+        initialize_database(self.test_db_name)
+
+        def broken_step(cursor):
+            cursor.execute("CREATE TABLE Broken (id INTEGER PRIMARY KEY)")
+            raise sqlite3.OperationalError("broken migration")
+
+        migrations = create_database_if_not_exist.MIGRATIONS + [(99, broken_step)]
+        conn = sqlite3.connect(self.test_db_name, isolation_level=None)
+        with unittest.mock.patch.object(create_database_if_not_exist, "MIGRATIONS", migrations):
+            with self.assertRaises(sqlite3.OperationalError):
+                create_database_if_not_exist.migrate(conn, target_version=99)
+        self.assertEqual(
+            create_database_if_not_exist.get_schema_version(conn),
+            create_database_if_not_exist.SCHEMA_VERSION
+        )
+        self.assertIsNone(conn.execute("SELECT name FROM sqlite_master WHERE name = 'Broken'").fetchone())
+        conn.close()
+
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file